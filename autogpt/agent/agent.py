@@ -8,6 +8,7 @@ from autogpt.json_utils.utilities import LLM_DEFAULT_RESPONSE_FORMAT, validate_j
 from autogpt.llm import chat_with_ai, create_chat_completion, create_chat_message
 from autogpt.llm.token_counter import count_string_tokens
 from autogpt.logs import logger, print_assistant_thoughts
+from autogpt.memory_management.summary_memory import BackgroundSummaryUpdater
 from autogpt.speech import say_text
 from autogpt.spinner import Spinner
 from autogpt.utils import clean_input
@@ -62,6 +63,7 @@ class Agent:
             "I was created."  # Initial memory necessary to avoid hilucination
         )
         self.last_memory_index = 0
+        self.summary_updater = BackgroundSummaryUpdater()
         self.full_message_history = full_message_history
         self.next_action_count = next_action_count
         self.command_registry = command_registry
@@ -1,32 +1,77 @@
 """File operations for AutoGPT"""
+
 from __future__ import annotations
 
+import atexit
+import codecs
+import fnmatch
+import functools
 import hashlib
+import itertools
+import json
+import mmap
 import os
 import os.path
-from typing import Dict, Generator, Literal, Tuple
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
 import charset_normalizer
 import requests
+import tiktoken
 from colorama import Back, Fore
 from requests.adapters import HTTPAdapter, Retry
 
 from autogpt.commands.command import command
 from autogpt.config import Config
+from autogpt.llm.llm_utils import batched
 from autogpt.logs import logger
 from autogpt.spinner import Spinner
 from autogpt.utils import readable_file_size
+from autogpt.workspace.file_index import get_workspace_file_index
 
 CFG = Config()
 
 Operation = Literal["write", "append", "delete"]
 
+# Number of logged operations between two snapshots of an operations index
+INDEX_SNAPSHOT_INTERVAL = 100
+# Number of log bytes before the indexed offset that must match for the index to
+# be used, so that a rewritten log is parsed again
+INDEX_FINGERPRINT_SIZE = 256
+# Number of bytes read at once when hashing a file
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+# Number of bytes at the start of a file used to detect its encoding
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# Number of files whose detected encoding is remembered, by size and mtime
+ENCODING_CACHE_SIZE = 128
+# Number of characters yielded at once when streaming a file
+STREAM_BLOCK_SIZE = 64 * 1024
+
 
 def text_checksum(text: str) -> str:
     """Get the hex checksum for the given text."""
     return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 
+def file_stat(filename: str | Path) -> Optional[Tuple[int, int]]:
+    """Get the size and modification time of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
 def operations_from_log(log_path: str) -> Generator[Tuple[Operation, str, str | None]]:
     """Parse the file operations log and return a tuple containing the log entries"""
     try:
@@ -35,23 +80,35 @@ def operations_from_log(log_path: str) -> Generator[Tuple[Operation, str, str |
         return
 
     for line in log:
-        line = line.replace("File Operation Logger", "").strip()
-        if not line:
-            continue
-        operation, tail = line.split(": ", maxsplit=1)
-        operation = operation.strip()
-        if operation in ("write", "append"):
-            try:
-                path, checksum = (x.strip() for x in tail.rsplit(" #", maxsplit=1))
-            except ValueError:
-                path, checksum = tail.strip(), None
-            yield (operation, path, checksum)
-        elif operation == "delete":
-            yield (operation, tail.strip(), None)
+        if entry := parse_operation(line):
+            yield entry
 
     log.close()
 
 
+def parse_operation(line: str) -> Tuple[Operation, str, str | None] | None:
+    """Parse a line of the file operations log.
+
+    Returns:
+        The operation, the file path and the checksum, or None if the line is not
+        a file operation.
+    """
+    line = line.replace("File Operation Logger", "").strip()
+    if not line:
+        return None
+    operation, tail = line.split(": ", maxsplit=1)
+    operation = operation.strip()
+    if operation in ("write", "append"):
+        try:
+            path, checksum = (x.strip() for x in tail.rsplit(" #", maxsplit=1))
+        except ValueError:
+            path, checksum = tail.strip(), None
+        return (operation, path, checksum)
+    elif operation == "delete":
+        return (operation, tail.strip(), None)
+    return None
+
+
 def file_operations_state(log_path: str) -> Dict:
     """Iterates over the operations log and returns the expected state.
 
@@ -75,6 +132,176 @@ def file_operations_state(log_path: str) -> Dict:
     return state
 
 
+class FileOperationsIndex:
+    """The expected state of the files, indexed from the file operations log.
+
+    The index is loaded once, from its snapshot (a hidden ".index" file next to
+    the log) and the operations logged after the snapshot, then updated in place
+    by log_operation. The log is only read again when it changed on disk:
+    operations appended by someone else are applied, and a log that was truncated
+    or rewritten is parsed from the start. The snapshot is saved every
+    INDEX_SNAPSHOT_INTERVAL operations and at exit.
+
+    The index also keeps the hash state of the files that were appended to, so
+    that the checksum of the next append only hashes the appended bytes. Hash
+    states cannot be serialized, so they are not part of the snapshot: the first
+    append to a file after a restart hashes the whole file.
+    """
+
+    def __init__(self, log_path: str | Path) -> None:
+        self.log_path = Path(log_path)
+        self.snapshot_path = self.log_path.with_name(f".{self.log_path.name}.index")
+        self.state: Dict[str, str | None] = {}
+        # The number of log bytes the state covers
+        self.offset = 0
+        self.fingerprint = ""
+        self._log_stat: Optional[Tuple[int, int]] = None
+        # The hash state of each file, with the size and mtime of the file it hashed
+        self._file_hashes: Dict[str, Tuple["hashlib._Hash", Tuple[int, int]]] = {}
+        self._unsaved_operations = 0
+        self._load_snapshot()
+        self.sync()
+
+    def get_state(self) -> Dict[str, str | None]:
+        """Get the state, mapping each file path to its checksum."""
+        self.sync()
+        return self.state
+
+    def sync(self) -> None:
+        """Apply the changes made to the log on disk since it was last indexed."""
+        log_stat = self._stat_log()
+        if log_stat is not None and log_stat == self._log_stat:
+            return
+        if (
+            log_stat is None
+            or log_stat[0] < self.offset
+            or self._fingerprint() != self.fingerprint
+        ):
+            self.state = {}
+            self.offset = 0
+        if log_stat is not None:
+            self._apply_log()
+        self._log_stat = log_stat
+
+    def record(
+        self, operation: str, filename: str, checksum: str | None, entry_size: int
+    ) -> None:
+        """Apply an operation that was just appended to the log.
+
+        Args:
+            entry_size: The size of the log entry, in bytes
+        """
+        self._apply(operation, str(filename), checksum)
+        self.offset += entry_size
+        self.fingerprint = self._fingerprint()
+        log_stat = self._stat_log()
+        # If the log does not end with the entry, check it on the next sync
+        self._log_stat = log_stat if log_stat and log_stat[0] == self.offset else None
+        self._unsaved_operations += 1
+        if self._unsaved_operations >= INDEX_SNAPSHOT_INTERVAL:
+            self.save()
+
+    def append_checksum(
+        self, filename: str | Path, previous_stat: Optional[Tuple[int, int]]
+    ) -> str:
+        """Get the checksum of a file that was just appended to.
+
+        Only the appended bytes are hashed if the file was last hashed when it had
+        the given size and mtime, otherwise the whole file is hashed again. The
+        file is read in blocks of CHECKSUM_BLOCK_SIZE bytes.
+
+        Args:
+            filename: The file
+            previous_stat: The size and mtime of the file before the append
+        """
+        hash_state = self._file_hashes.get(str(filename))
+        if hash_state is not None and hash_state[1] == previous_stat:
+            digest, (start, _) = hash_state
+        else:
+            digest, start = hashlib.md5(), 0
+        with open(filename, "rb") as f:
+            f.seek(start)
+            while block := f.read(CHECKSUM_BLOCK_SIZE):
+                digest.update(block)
+            stat = os.fstat(f.fileno())
+        self._file_hashes[str(filename)] = (digest, (stat.st_size, stat.st_mtime_ns))
+        return digest.hexdigest()
+
+    def save(self) -> None:
+        """Save a snapshot of the index."""
+        if not self._unsaved_operations:
+            return
+        snapshot = {
+            "offset": self.offset,
+            "fingerprint": self.fingerprint,
+            "state": self.state,
+        }
+        tmp_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.debug(f"Failed to save the file operations index: {e}")
+            return
+        self._unsaved_operations = 0
+
+    def _load_snapshot(self) -> None:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.state = dict(snapshot["state"])
+            self.offset = int(snapshot["offset"])
+            self.fingerprint = str(snapshot["fingerprint"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warn(f"Ignoring invalid file operations index: {e}")
+            self.state, self.offset, self.fingerprint = {}, 0, ""
+
+    def _apply_log(self) -> None:
+        """Apply the complete lines of the log after the indexed offset."""
+        with open(self.log_path, "rb") as log:
+            log.seek(self.offset)
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                self._unsaved_operations += 1
+                if entry := parse_operation(line.decode("utf-8", errors="replace")):
+                    self._apply(*entry)
+        self.fingerprint = self._fingerprint()
+
+    def _apply(self, operation: str, filename: str, checksum: str | None) -> None:
+        if operation in ("write", "append"):
+            self.state[filename] = checksum
+        elif operation == "delete":
+            self.state.pop(filename, None)
+        if operation != "append":
+            self._file_hashes.pop(filename, None)
+
+    def _stat_log(self) -> Optional[Tuple[int, int]]:
+        return file_stat(self.log_path)
+
+    def _fingerprint(self) -> str:
+        """Get the checksum of the log bytes just before the indexed offset."""
+        start = max(self.offset - INDEX_FINGERPRINT_SIZE, 0)
+        try:
+            with open(self.log_path, "rb") as log:
+                log.seek(start)
+                return hashlib.md5(log.read(self.offset - start)).hexdigest()
+        except FileNotFoundError:
+            return ""
+
+
+@functools.lru_cache(maxsize=None)
+def get_file_operations_index(log_path: str | Path) -> FileOperationsIndex:
+    """Get the index of a file operations log, loading it on first use."""
+    index = FileOperationsIndex(log_path)
+    atexit.register(index.save)
+    return index
+
+
 def is_duplicate_operation(
     operation: Operation, filename: str, checksum: str | None = None
 ) -> bool:
@@ -88,7 +315,7 @@ def is_duplicate_operation(
     Returns:
         True if the operation has already been performed on the file
     """
-    state = file_operations_state(CFG.file_logger_path)
+    state = get_file_operations_index(CFG.file_logger_path).get_state()
     if operation == "delete" and filename not in state:
         return True
     if operation == "write" and state.get(filename) == checksum:
@@ -108,7 +335,10 @@ def log_operation(operation: str, filename: str, checksum: str | None = None) ->
     if checksum is not None:
         log_entry += f" #{checksum}"
     logger.debug(f"Logging file operation: {log_entry}")
+    index = get_file_operations_index(CFG.file_logger_path)
+    index.sync()
     append_to_file(CFG.file_logger_path, f"{log_entry}\n", should_log=False)
+    index.record(operation, filename, checksum, len(f"{log_entry}\n".encode("utf-8")))
 
 
 def split_file(
@@ -143,59 +373,360 @@ def split_file(
         start += max_length - overlap
 
 
-@command("read_file", "读文件", '"filename": "<filename>"')
-def read_file(filename: str) -> str:
+def split_file_by_tokens(
+    content: str | Iterable[str],
+    max_tokens: int = 1000,
+    overlap: int = 0,
+    encoding: Optional[tiktoken.Encoding] = None,
+) -> Iterator[str]:
+    """
+    Split text into chunks of at most a number of tokens, with a number of
+    overlapping tokens between chunks.
+
+    The text can be given as blocks, such as those of stream_file, which are
+    tokenized as they come, so only about one chunk of tokens is held at a time.
+    Chunks end on character boundaries, so they may be a few tokens shorter.
+
+    :param content: The input text, or an iterable of blocks of text
+    :param max_tokens: The maximum number of tokens of each chunk, default is 1000
+    :param overlap: The number of overlapping tokens between chunks,
+        default is no overlap
+    :param encoding: The tokenizer, default is the embedding tokenizer
+    :return: A generator yielding chunks of text
+    """
+    if not 0 <= overlap < max_tokens:
+        raise ValueError("The overlap must be smaller than the chunk size")
+    if encoding is None:
+        encoding = tiktoken.get_encoding(CFG.embedding_tokenizer)
+    blocks = [content] if isinstance(content, str) else content
+
+    tokens: list[int] = []
+    # Number of tokens at the start of `tokens` already in the previous chunk
+    covered = 0
+    pending = ""
+    for block in itertools.chain(blocks, [None]):
+        if block is None:
+            settled, pending = pending, ""
+        else:
+            pending += block
+            cut = _token_safe_cut(pending)
+            settled, pending = pending[:cut], pending[cut:]
+        tokens.extend(encoding.encode(settled, disallowed_special=()))
+
+        while len(tokens) >= max_tokens or (block is None and len(tokens) > covered):
+            end = _character_start(encoding, tokens, min(max_tokens, len(tokens)))
+            if end == 0:
+                end = _character_start(encoding, tokens, max_tokens, forward=True)
+            yield encoding.decode_bytes(tokens[:end]).decode("utf-8")
+
+            start = _character_start(
+                encoding, tokens, max(end - overlap, 1), forward=True
+            )
+            del tokens[:start]
+            covered = end - start
+
+
+def _token_safe_cut(text: str) -> int:
+    """Find where text can be cut without changing how the start is tokenized.
+
+    Tokens do not span line breaks, so the text is cut after its last line
+    break. A text without one is cut after its last punctuation or space, at the
+    cost of an extra token, so that a file with very long lines is not held whole.
+    """
+    newline = text.rfind("\n")
+    if newline >= 0:
+        return newline + 1
+    for i in range(len(text) - 1, -1, -1):
+        if not text[i].isalnum():
+            return i + 1
+    return len(text)
+
+
+def _character_start(
+    encoding: tiktoken.Encoding, tokens: list[int], index: int, forward=False
+) -> int:
+    """Move a token index to the nearest token that starts a UTF-8 character."""
+    step = 1 if forward else -1
+    while 0 < index < len(tokens):
+        first_byte = encoding.decode_single_token_bytes(tokens[index])[0]
+        if first_byte & 0xC0 != 0x80:
+            break
+        index += step
+    return index
+
+
+def detect_encoding(filename: str | Path, whole_file: bool = False) -> str:
+    """Detect the encoding of a file from its first ENCODING_SAMPLE_SIZE bytes
+
+    UTF-8 is preferred whenever the sample decodes with it, since a sample that
+    is ASCII may be followed by other UTF-8 characters.
+
+    Args:
+        filename (str): The name of the file
+        whole_file (bool): Detect the encoding from the whole file instead, when
+            the file does not decode with the encoding of its sample
+
+    Returns:
+        str: The encoding of the file
+
+    Raises:
+        ValueError: If the file does not look like text
+    """
+    stat = os.stat(filename)
+    return _detect_encoding(
+        os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, whole_file
+    )
+
+
+@functools.lru_cache(maxsize=ENCODING_CACHE_SIZE)
+def _detect_encoding(path: str, size: int, mtime_ns: int, whole_file: bool) -> str:
+    if whole_file:
+        charset_match = charset_normalizer.from_path(path).best()
+    else:
+        with open(path, "rb") as f:
+            sample = f.read(ENCODING_SAMPLE_SIZE)
+        utf_8 = "utf_8_sig" if sample.startswith(codecs.BOM_UTF8) else "utf_8"
+        try:
+            # Not final, so that a character cut by the end of the sample is
+            # left undecoded
+            codecs.getincrementaldecoder(utf_8)().decode(sample)
+            return utf_8
+        except UnicodeDecodeError:
+            pass
+        if len(sample) == ENCODING_SAMPLE_SIZE and b"\n" in sample:
+            # Do not let a character cut at the end of the sample skew the detection
+            sample = sample[: sample.rindex(b"\n") + 1]
+        charset_match = charset_normalizer.from_bytes(sample).best()
+    if charset_match is None:
+        raise ValueError(f"Unable to detect the encoding of '{path}'")
+    return charset_match.encoding
+
+
+def _decode_file(
+    filename: str | Path, read: Callable[[TextIO, int], Iterator[str]]
+) -> Iterator[str]:
+    """Decode a file with the encoding of its sample, through a read function
+
+    If a character does not decode with that encoding, the encoding is detected
+    again from the whole file, and the file is read again after the pieces
+    already yielded, replacing the characters that still do not decode.
+
+    Args:
+        filename (str): The name of the file
+        read (Callable): Reads pieces of text from the open file, skipping the
+            given number of pieces first
+
+    Yields:
+        str: The next piece of text
+    """
+    encoding = detect_encoding(filename)
+    logger.debug(f"Read file '{filename}' with encoding '{encoding}'")
+    num_pieces = 0
+    try:
+        with open(filename, "r", encoding=encoding, newline="") as f:
+            for piece in read(f, 0):
+                yield piece
+                num_pieces += 1
+    except UnicodeDecodeError as e:
+        encoding = detect_encoding(filename, whole_file=True)
+        logger.debug(f"{e}, read file '{filename}' with encoding '{encoding}'")
+        with open(filename, "r", encoding=encoding, errors="replace", newline="") as f:
+            yield from read(f, num_pieces)
+
+
+def read_lines(
+    filename: str | Path, offset: int = 0, limit: Optional[int] = None
+) -> Iterator[str]:
+    """Stream a range of lines of a file, with their line endings
+
+    Args:
+        filename (str): The name of the file
+        offset (int): The number of lines to skip
+        limit (int, optional): The maximum number of lines to read
+
+    Yields:
+        str: The next line
+    """
+    stop = None if limit is None else offset + limit
+    return _decode_file(
+        filename, lambda f, skip: itertools.islice(f, offset + skip, stop)
+    )
+
+
+def read_bytes(
+    filename: str | Path, offset: int = 0, limit: Optional[int] = None
+) -> str:
+    """Read a range of bytes of a file, decoded as text, through a memory map
+
+    Characters cut by the ends of the range are dropped.
+
+    Args:
+        filename (str): The name of the file
+        offset (int): The number of bytes to skip
+        limit (int, optional): The maximum number of bytes to read
+
+    Returns:
+        str: The text in the range
+    """
+    encoding = detect_encoding(filename)
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            stop = None if limit is None else offset + limit
+            return mapped[offset:stop].decode(encoding, errors="ignore")
+
+
+def stream_file(
+    filename: str | Path, block_size: int = STREAM_BLOCK_SIZE
+) -> Iterator[str]:
+    """Stream the text of a file in blocks, without loading it whole
+
+    Args:
+        filename (str): The name of the file
+        block_size (int): The number of characters of each block
+
+    Yields:
+        str: The next block of text
+    """
+    return _decode_file(
+        filename,
+        lambda f, skip: itertools.islice(
+            iter(functools.partial(f.read, block_size), ""), skip, None
+        ),
+    )
+
+
+@command(
+    "read_file",
+    "读文件",
+    '"filename": "<filename>", "offset": "<first_line_or_byte_optional>",'
+    ' "limit": "<max_lines_or_bytes_optional>", "unit": "<lines_or_bytes_optional>"',
+)
+def read_file(
+    filename: str,
+    offset: int | str = 0,
+    limit: int | str | None = None,
+    unit: str = "lines",
+) -> str:
     """Read a file and return the contents
 
+    The encoding is detected from the start of the file, then the file is
+    streamed, or memory-mapped for a range of bytes, so that a range of a large
+    file can be read without loading all of it.
+
     Args:
         filename (str): The name of the file to read
+        offset (int, optional): The number of lines or bytes to skip. Defaults
+            to 0.
+        limit (int, optional): The maximum number of lines or bytes to read.
+            Defaults to the rest of the file.
+        unit (str, optional): "lines" or "bytes", the unit of offset and limit.
+            Defaults to "lines".
 
     Returns:
         str: The contents of the file
     """
     try:
-        charset_match = charset_normalizer.from_path(filename).best()
-        encoding = charset_match.encoding
-        logger.debug(f"Read file '{filename}' with encoding '{encoding}'")
-        return str(charset_match)
+        offset = _optional_int(offset) or 0
+        limit = _optional_int(limit)
+        unit = unit.strip().lower() if unit else "lines"
+        if unit == "bytes":
+            return read_bytes(filename, offset, limit)
+        if unit != "lines":
+            raise ValueError(f"Expected lines or bytes as unit, got '{unit}'")
+        return "".join(read_lines(filename, offset, limit))
     except Exception as err:
         return f"Error: {err}"
 
 
+def _optional_int(value: int | str | None) -> Optional[int]:
+    """Parse an optional integer argument, which may be an empty string."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError(f"Expected a non-negative number, got {value}")
+    return value
+
+
+def file_memories(
+    filename: str,
+    content: str | Iterable[str],
+    max_length: int = 1000,
+    overlap: int = 50,
+) -> list[str]:
+    """
+    Split the content of a file into chunks with a specified maximum number of
+    tokens and overlap, and format them as memories.
+
+    :param filename: The name of the file
+    :param content: The content of the file, or an iterable of blocks of it
+    :param max_length: The maximum number of tokens of each chunk, default is 1000
+    :param overlap: The number of overlapping tokens between chunks, default is 50
+    :return: The memories to add for the file
+    """
+    encoding = tiktoken.get_encoding(CFG.embedding_tokenizer)
+    max_tokens = _memory_token_limit(encoding, filename, max_length)
+    chunks = list(split_file_by_tokens(content, max_tokens, overlap, encoding))
+    num_chunks = len(chunks)
+    return [
+        f"Filename: {filename}\n" f"Content part#{i + 1}/{num_chunks}: {chunk}"
+        for i, chunk in enumerate(chunks)
+    ]
+
+
 def ingest_file(
-    filename: str, memory, max_length: int = 4000, overlap: int = 200
+    filename: str, memory, max_length: int = 1000, overlap: int = 50
 ) -> None:
     """
-    Ingest a file by reading its content, splitting it into chunks with a specified
-    maximum length and overlap, and adding the chunks to the memory storage.
+    Ingest a file by streaming its content, splitting it into chunks with a
+    specified maximum number of tokens and overlap, and adding the chunks to the
+    memory storage in batches.
+
+    The number of chunks is not known until the whole file is read, so the
+    memories are numbered without a total.
 
     :param filename: The name of the file to ingest
-    :param memory: An object with an add() method to store the chunks in memory
-    :param max_length: The maximum length of each chunk, default is 4000
-    :param overlap: The number of overlapping characters between chunks, default is 200
+    :param memory: An object with an add_many() method to store the chunks in memory
+    :param max_length: The maximum number of tokens of each chunk, default is 1000
+    :param overlap: The number of overlapping tokens between chunks, default is 50
     """
     try:
         logger.info(f"Working with file {filename}")
-        content = read_file(filename)
-        content_length = len(content)
-        logger.info(f"File length: {content_length} characters")
-
-        chunks = list(split_file(content, max_length=max_length, overlap=overlap))
-
-        num_chunks = len(chunks)
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Ingesting chunk {i + 1} / {num_chunks} into memory")
-            memory_to_add = (
-                f"Filename: {filename}\n" f"Content part#{i + 1}/{num_chunks}: {chunk}"
-            )
-
-            memory.add(memory_to_add)
+        logger.info(f"File size: {readable_file_size(os.path.getsize(filename))}")
+
+        encoding = tiktoken.get_encoding(CFG.embedding_tokenizer)
+        max_tokens = _memory_token_limit(encoding, filename, max_length)
+        chunks = split_file_by_tokens(
+            stream_file(filename), max_tokens, overlap, encoding
+        )
+        memories = (
+            f"Filename: {filename}\n" f"Content part#{i + 1}: {chunk}"
+            for i, chunk in enumerate(chunks)
+        )
+
+        num_chunks = 0
+        for batch in batched(memories, CFG.embedding_batch_max_items):
+            memory.add_many(list(batch))
+            num_chunks += len(batch)
+            logger.info(f"Ingested {num_chunks} chunks into memory")
 
         logger.info(f"Done ingesting {num_chunks} chunks from {filename}.")
     except Exception as err:
         logger.info(f"Error while ingesting file '{filename}': {err}")
 
 
+def _memory_token_limit(
+    encoding: tiktoken.Encoding, filename: str, max_length: int
+) -> int:
+    """The number of tokens of a chunk, such that its memory can be embedded
+    whole: the chunk and its header fit in the embedding token limit."""
+    header = f"Filename: {filename}\nContent part#000000/000000: "
+    header_tokens = len(encoding.encode(header, disallowed_special=()))
+    return max(1, min(max_length, CFG.embedding_token_limit - header_tokens))
+
+
 @command("write_to_file", "写入文件", '"filename": "<filename>", "text": "<text>"')
 def write_to_file(filename: str, text: str) -> str:
     """Write text to a file
@@ -238,12 +769,13 @@ def append_to_file(filename: str, text: str, should_log: bool = True) -> str:
     try:
         directory = os.path.dirname(filename)
         os.makedirs(directory, exist_ok=True)
+        previous_stat = file_stat(filename)
         with open(filename, "a", encoding="utf-8") as f:
             f.write(text)
 
         if should_log:
-            with open(filename, "r", encoding="utf-8") as f:
-                checksum = text_checksum(f.read())
+            index = get_file_operations_index(CFG.file_logger_path)
+            checksum = index.append_checksum(filename, previous_stat)
             log_operation("append", filename, checksum=checksum)
 
         return "Text appended successfully."
@@ -271,28 +803,81 @@ def delete_file(filename: str) -> str:
         return f"Error: {err}"
 
 
-@command("list_files", "列表目录中的文件", '"directory": "<directory>"')
-def list_files(directory: str) -> list[str]:
+@command(
+    "list_files",
+    "列表目录中的文件",
+    '"directory": "<directory>", "pattern": "<glob_optional>",'
+    ' "max_depth": "<depth_optional>", "offset": "<first_file_optional>",'
+    ' "limit": "<max_files_optional>"',
+)
+def list_files(
+    directory: str,
+    pattern: str = "",
+    max_depth: int | str | None = None,
+    offset: int | str = 0,
+    limit: int | str | None = None,
+) -> list[str]:
     """lists files in a directory recursively
 
+    Directories of the workspace are listed from its in-memory file index.
+
     Args:
         directory (str): The directory to search in
+        pattern (str, optional): A glob pattern the paths of the files relative to
+            the directory must match
+        max_depth (int, optional): The number of directory levels to list, 1 lists
+            only the files directly in the directory. Defaults to all the levels.
+        offset (int, optional): The number of files to skip. Defaults to 0.
+        limit (int, optional): The maximum number of files to list. Defaults to
+            all the files.
 
     Returns:
-        list[str]: A list of files found in the directory
+        list[str]: A sorted list of files found in the directory
     """
-    found_files = []
+    max_depth = _optional_int(max_depth)
+    offset = _optional_int(offset) or 0
+    limit = _optional_int(limit)
+
+    workspace_directory = _workspace_relative_path(directory)
+    if workspace_directory is not None:
+        index = get_workspace_file_index(Path(CFG.workspace_path).resolve())
+        found_files = index.list_files(workspace_directory, pattern, max_depth)
+    else:
+        found_files = sorted(_walk_files(directory, pattern, max_depth))
+
+    stop = None if limit is None else offset + limit
+    return found_files[offset:stop]
+
+
+def _workspace_relative_path(directory: str) -> Optional[str]:
+    """The path of a directory relative to the workspace, None if it is outside."""
+    if not directory or CFG.workspace_path is None:
+        return None
+    try:
+        path = Path(directory).resolve()
+        return str(path.relative_to(Path(CFG.workspace_path).resolve()))
+    except ValueError:
+        return None
+
 
-    for root, _, files in os.walk(directory):
+def _walk_files(
+    directory: str, pattern: str = "", max_depth: Optional[int] = None
+) -> Generator[str, None, None]:
+    """List the files of a directory outside the workspace by walking it."""
+    base_depth = os.path.normpath(directory).count(os.sep)
+    for root, dirs, files in os.walk(directory):
+        depth = os.path.normpath(root).count(os.sep) - base_depth + 1
+        if max_depth is not None and depth >= max_depth:
+            dirs.clear()
         for file in files:
             if file.startswith("."):
                 continue
-            relative_path = os.path.relpath(
-                os.path.join(root, file), CFG.workspace_path
-            )
-            found_files.append(relative_path)
-
-    return found_files
+            path = os.path.join(root, file)
+            if pattern and not fnmatch.fnmatch(
+                os.path.relpath(path, directory), pattern
+            ):
+                continue
+            yield os.path.relpath(path, CFG.workspace_path)
 
 
 @command(
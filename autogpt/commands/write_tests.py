@@ -34,4 +34,4 @@ def write_tests(code: str, focus: list[str]) -> str:
         " specific areas if required."
     )
 
-    return call_ai_function(function_string, args, description_string)
+    return call_ai_function(function_string, args, description_string, cache=True)
@@ -38,13 +38,36 @@ class Config(metaclass=Singleton):
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
         self.embedding_tokenizer = os.getenv("EMBEDDING_TOKENIZER", "cl100k_base")
         self.embedding_token_limit = int(os.getenv("EMBEDDING_TOKEN_LIMIT", 8191))
+        self.embedding_batch_max_items = int(
+            os.getenv("EMBEDDING_BATCH_MAX_ITEMS", 128)
+        )
+        self.embedding_batch_max_tokens = int(
+            os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 100000)
+        )
+        self.embedding_cache = os.getenv("EMBEDDING_CACHE", "True") == "True"
+        self.embedding_cache_max_entries = int(
+            os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 20000)
+        )
+        self.completion_cache = os.getenv("COMPLETION_CACHE", "False") == "True"
+        self.completion_cache_max_entries = int(
+            os.getenv("COMPLETION_CACHE_MAX_ENTRIES", 5000)
+        )
+        self.completion_cache_ttl = float(os.getenv("COMPLETION_CACHE_TTL", 604800))
         self.browse_chunk_max_length = int(os.getenv("BROWSE_CHUNK_MAX_LENGTH", 3000))
         self.browse_spacy_language_model = os.getenv(
             "BROWSE_SPACY_LANGUAGE_MODEL", "en_core_web_sm"
         )
+        self.browse_summary_concurrency = int(
+            os.getenv("BROWSE_SUMMARY_CONCURRENCY", 4)
+        )
 
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.temperature = float(os.getenv("TEMPERATURE", "0"))
+        # Rate limits of each model, 0 means unlimited until the API reports them
+        self.openai_requests_per_minute = int(
+            os.getenv("OPENAI_REQUESTS_PER_MINUTE", 0)
+        )
+        self.openai_tokens_per_minute = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 0))
         self.use_azure = os.getenv("USE_AZURE") == "True"
         self.execute_local_commands = (
             os.getenv("EXECUTE_LOCAL_COMMANDS", "False") == "True"
@@ -132,6 +155,13 @@ class Config(metaclass=Singleton):
         # Note that indexes must be created on db 0 in redis, this is not configurable.
 
         self.memory_backend = os.getenv("MEMORY_BACKEND", "local")
+        # IVF index settings for the local_ivf memory backend. 0 lists means
+        # sqrt(number of memories).
+        self.memory_ivf_nlist = int(os.getenv("MEMORY_IVF_NLIST", 0))
+        self.memory_ivf_nprobe = int(os.getenv("MEMORY_IVF_NPROBE", 8))
+        self.async_running_summary = (
+            os.getenv("ASYNC_RUNNING_SUMMARY", "False") == "True"
+        )
 
         self.plugins_dir = os.getenv("PLUGINS_DIR", "plugins")
         self.plugins: List[AutoGPTPluginTemplate] = []
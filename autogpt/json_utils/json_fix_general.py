@@ -5,7 +5,7 @@ from __future__ import annotations
 import contextlib
 import json
 import re
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from autogpt.config import Config
 from autogpt.json_utils.utilities import extract_char_position
@@ -119,3 +119,45 @@ def correct_json(json_to_load: str) -> str:
         if balanced_str := balance_braces(json_to_load):
             return balanced_str
     return json_to_load
+
+
+def find_outermost_braces(text: str) -> List[Tuple[int, int]]:
+    """
+    Find the outermost balanced pairs of braces in a text, the candidate JSON
+    objects of an LLM reply.
+
+    The text is scanned once, in linear time. Inside braces, braces within double
+    quoted strings are ignored. A brace that is never closed does not hide the
+    balanced pairs after it.
+
+    Args:
+        text (str): The text to scan.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end offsets of each candidate, such
+            that text[start:end] is the candidate, in order.
+    """
+    candidates: List[Tuple[int, int]] = []
+    open_braces: List[int] = []
+    in_string = False
+    position = 0
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if in_string:
+            if char == "\\":
+                position += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = bool(open_braces)
+        elif char == "{":
+            open_braces.append(position)
+        elif char == "}" and open_braces:
+            start = open_braces.pop()
+            # Drop the candidates nested in this pair
+            while candidates and candidates[-1][0] > start:
+                candidates.pop()
+            candidates.append((start, position + 1))
+        position += 1
+    return candidates
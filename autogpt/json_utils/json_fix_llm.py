@@ -4,13 +4,14 @@ from __future__ import annotations
 
 import contextlib
 import json
+from collections import Counter
 from typing import Any, Dict
 
 from colorama import Fore
-from regex import regex
 
 from autogpt.config import Config
-from autogpt.json_utils.json_fix_general import correct_json
+from autogpt.json_utils.json_fix_general import correct_json, find_outermost_braces
+from autogpt.json_utils.json_fix_tolerant import repair_json
 from autogpt.llm import call_ai_function
 from autogpt.logs import logger
 from autogpt.speech import say_text
@@ -36,6 +37,10 @@ JSON_SCHEMA = """
 
 CFG = Config()
 
+# How many replies each tier of fix_json_using_multiple_techniques has fixed
+JSON_FIX_TIERS = ("parse", "repair", "general", "brackets", "llm", "failed")
+json_fix_counts: Counter[str] = Counter()
+
 
 def auto_fix_json(json_string: str, schema: str) -> str:
     """Fix the given JSON string to make it parseable and fully compliant with
@@ -63,7 +68,7 @@ def auto_fix_json(json_string: str, schema: str) -> str:
     if not json_string.startswith("`"):
         json_string = "```json\n" + json_string + "\n```"
     result_string = call_ai_function(
-        function_string, args, description_string, model=CFG.fast_llm_model
+        function_string, args, description_string, model=CFG.fast_llm_model, cache=True
     )
     logger.debug("------------ JSON FIX ATTEMPT ---------------")
     logger.debug(f"Original JSON: {json_string}")
@@ -85,6 +90,11 @@ def auto_fix_json(json_string: str, schema: str) -> str:
 def fix_json_using_multiple_techniques(assistant_reply: str) -> Dict[Any, Any]:
     """Fix the given JSON string to make it parseable and fully compliant with two techniques.
 
+    The cheapest techniques are tried first: parsing the reply as is, repairing it
+    in a single pass, the general fixes, and parsing the outermost braces. The LLM
+    is only asked to fix the reply if they all fail. The number of replies fixed by
+    each tier is counted in `json_fix_counts`.
+
     Args:
         json_string (str): The JSON string to fix.
 
@@ -97,7 +107,7 @@ def fix_json_using_multiple_techniques(assistant_reply: str) -> Dict[Any, Any]:
     if assistant_reply.endswith("```"):
         assistant_reply = assistant_reply[:-3]
     try:
-        return json.loads(assistant_reply)  # just check the validity
+        return _fixed_by("parse", json.loads(assistant_reply))
     except json.JSONDecodeError:  # noqa: E722
         pass
 
@@ -105,21 +115,37 @@ def fix_json_using_multiple_techniques(assistant_reply: str) -> Dict[Any, Any]:
         assistant_reply = assistant_reply[5:]
         assistant_reply = assistant_reply.strip()
     try:
-        return json.loads(assistant_reply)  # just check the validity
-    except json.JSONDecodeError:  # noqa: E722
-        pass
+        return _fixed_by("parse", json.loads(assistant_reply))
+    except json.JSONDecodeError as e:  # noqa: E722
+        parse_error = e
+
+    repaired_reply = repair_json(assistant_reply)
+    if repaired_reply is not None:
+        with contextlib.suppress(json.JSONDecodeError):
+            assistant_reply_json = json.loads(repaired_reply)
+            # An empty object is what is left of a reply cut right after its brace
+            if isinstance(assistant_reply_json, dict) and assistant_reply_json:
+                return _fixed_by("repair", assistant_reply_json)
+
+    with contextlib.suppress(json.JSONDecodeError, ValueError):
+        assistant_reply_json = fix_and_parse_json(
+            assistant_reply, try_to_fix_with_gpt=False
+        )
+        if assistant_reply_json != {}:
+            return _fixed_by("general", assistant_reply_json)
 
-    # Parse and print Assistant response
-    assistant_reply_json = fix_and_parse_json(assistant_reply)
-    logger.debug("Assistant reply JSON: %s", str(assistant_reply_json))
-    if assistant_reply_json == {}:
+    with contextlib.suppress(json.JSONDecodeError, ValueError):
         assistant_reply_json = attempt_to_fix_json_by_finding_outermost_brackets(
-            assistant_reply
+            assistant_reply, try_to_fix_with_gpt=False
         )
+        if assistant_reply_json != {}:
+            return _fixed_by("brackets", assistant_reply_json)
 
-    logger.debug("Assistant reply JSON 2: %s", str(assistant_reply_json))
+    assistant_reply_json = try_ai_fix(True, parse_error, assistant_reply)
+    logger.debug("Assistant reply JSON: %s", str(assistant_reply_json))
     if assistant_reply_json != {}:
-        return assistant_reply_json
+        return _fixed_by("llm", assistant_reply_json)
+    json_fix_counts["failed"] += 1
 
     logger.error(
         "Error: The following AI output couldn't be converted to a JSON:\n",
@@ -131,6 +157,23 @@ def fix_json_using_multiple_techniques(assistant_reply: str) -> Dict[Any, Any]:
     return {}
 
 
+def _fixed_by(tier: str, reply_json: Any) -> Any:
+    """Count a reply fixed by a tier of fix_json_using_multiple_techniques."""
+    json_fix_counts[tier] += 1
+    logger.debug(f"Assistant reply JSON fixed by the '{tier}' tier")
+    return reply_json
+
+
+def get_json_fix_stats() -> Dict[str, int]:
+    """Get how many replies each tier of fix_json_using_multiple_techniques fixed.
+
+    Returns:
+        Dict[str, int]: The number of replies per tier, "failed" for the replies
+            no tier could fix.
+    """
+    return {tier: json_fix_counts[tier] for tier in JSON_FIX_TIERS}
+
+
 def fix_and_parse_json(
     json_to_load: str, try_to_fix_with_gpt: bool = True
 ) -> Dict[Any, Any]:
@@ -205,7 +248,9 @@ def try_ai_fix(
     return {}
 
 
-def attempt_to_fix_json_by_finding_outermost_brackets(json_string: str):
+def attempt_to_fix_json_by_finding_outermost_brackets(
+    json_string: str, try_to_fix_with_gpt: bool = True
+):
     if CFG.speak_mode and CFG.debug_mode:
         say_text(
             "I have received an invalid JSON response from the OpenAI API. "
@@ -214,12 +259,10 @@ def attempt_to_fix_json_by_finding_outermost_brackets(json_string: str):
         logger.error("Attempting to fix JSON by finding outermost brackets\n")
 
     try:
-        json_pattern = regex.compile(r"\{(?:[^{}]|(?R))*\}")
-        json_match = json_pattern.search(json_string)
-
-        if json_match:
+        if candidates := find_outermost_braces(json_string):
             # Extract the valid JSON object from the string
-            json_string = json_match.group(0)
+            start, end = candidates[0]
+            json_string = json_string[start:end]
             logger.typewriter_log(
                 title="Apparently json was fixed.", title_color=Fore.GREEN
             )
@@ -236,4 +279,4 @@ def attempt_to_fix_json_by_finding_outermost_brackets(json_string: str):
         logger.error("Error: Invalid JSON, setting it to empty JSON now.\n")
         json_string = {}
 
-    return fix_and_parse_json(json_string)
+    return fix_and_parse_json(json_string, try_to_fix_with_gpt)
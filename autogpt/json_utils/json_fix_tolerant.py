@@ -0,0 +1,202 @@
+"""This module contains a tolerant, single-pass JSON repairer for the replies of LLM models, which fixes the common
+mistakes of these replies without calling the model again."""
+from __future__ import annotations
+
+import json
+import re
+from typing import List, Optional
+
+CODE_FENCE = "```"
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][\w\-]*")
+LITERALS = {
+    "true": "true",
+    "false": "false",
+    "null": "null",
+    "True": "true",
+    "False": "false",
+    "None": "null",
+    "NaN": "null",
+}
+# Characters that can follow the closing quote of a string
+STRING_END_DELIMITERS = ",:}]"
+ESCAPABLE_CHARACTERS = '"\\/bfnrtu'
+CLOSERS = {"{": "}", "[": "]"}
+# Tokens after which a value does not need a comma before it
+VALUE_PREFIXES = {"{", "[", ",", ":"}
+
+
+class _Truncated(Exception):
+    """Raised when the input ends inside a token."""
+
+
+def repair_json(json_string: str) -> Optional[str]:
+    """Repair the JSON object in an LLM reply.
+
+    The reply is scanned once, token by token, and rewritten as valid JSON:
+    - text around the JSON, including code fences, is dropped; the JSON starts
+      at the first brace, so that brackets in the text before it are ignored
+    - single-quoted strings are double-quoted
+    - newlines and other control characters in strings are escaped, and so are
+      quotes that do not end their string
+    - unquoted property names are quoted, and Python literals are converted
+    - trailing commas are removed
+    - a truncated reply is closed, dropping the property it was cut in
+
+    Args:
+        json_string (str): The reply containing the JSON.
+
+    Returns:
+        str | None: The repaired JSON, or None if it could not be repaired.
+    """
+    text = _strip_code_fence(json_string)
+    position = text.find("{")
+    if position < 0:
+        return None
+
+    tokens: List[str] = []
+    stack: List[str] = []
+    length = len(text)
+    try:
+        while position < length:
+            char = text[position]
+            if char.isspace():
+                position += 1
+            elif char in "{[":
+                _append_value(tokens, char)
+                stack.append(CLOSERS[char])
+                position += 1
+            elif char in "}]":
+                position += 1
+                if char not in stack:
+                    continue
+                _drop_trailing_comma(tokens)
+                while stack:
+                    closer = stack.pop()
+                    tokens.append(closer)
+                    if closer == char:
+                        break
+                if not stack:
+                    break
+            elif char in ",:":
+                if tokens[-1] not in VALUE_PREFIXES:
+                    tokens.append(char)
+                position += 1
+            elif char in "\"'":
+                token, position = _read_string(text, position)
+                _append_value(tokens, token)
+            elif match := NUMBER_PATTERN.match(text, position):
+                _append_value(tokens, match.group())
+                position = match.end()
+            elif match := IDENTIFIER_PATTERN.match(text, position):
+                word = match.group()
+                _append_value(tokens, LITERALS.get(word) or json.dumps(word))
+                position = match.end()
+            else:
+                return None
+    except _Truncated as e:
+        _append_value(tokens, str(e))
+
+    if stack:
+        _close_truncated(tokens, stack)
+    return "".join(tokens)
+
+
+def _strip_code_fence(text: str) -> str:
+    """Get the content of the first code fence of a text, if there is one."""
+    fence_start = text.find(CODE_FENCE)
+    if fence_start < 0:
+        return text
+    content_start = text.find("\n", fence_start)
+    if content_start < 0:
+        return text[fence_start + len(CODE_FENCE) :]
+    fence_end = text.find(CODE_FENCE, content_start)
+    if fence_end < 0:
+        return text[content_start:]
+    return text[content_start:fence_end]
+
+
+def _read_string(text: str, position: int) -> tuple[str, int]:
+    """Read the string starting at a quote, and encode it as a JSON string.
+
+    A quote only ends the string if it is followed by a delimiter, so that quotes
+    the model forgot to escape are kept in the string.
+
+    Returns:
+        The JSON string and the position after its closing quote.
+
+    Raises:
+        _Truncated: If the text ends inside the string, with the string closed.
+    """
+    quote = text[position]
+    chars = ['"']
+    position += 1
+    length = len(text)
+    while position < length:
+        char = text[position]
+        if char == "\\":
+            escaped = text[position + 1 : position + 2]
+            if escaped and escaped in ESCAPABLE_CHARACTERS:
+                chars.append(char + escaped)
+            elif escaped == "'":
+                chars.append(escaped)
+            else:
+                chars.append("\\\\" + escaped)
+            position += 2
+            continue
+        if char == quote and _ends_string(text, position + 1, quote):
+            chars.append('"')
+            return "".join(chars), position + 1
+        if char == '"':
+            chars.append('\\"')
+        elif char < " ":
+            chars.append(json.dumps(char)[1:-1])
+        else:
+            chars.append(char)
+        position += 1
+
+    chars.append('"')
+    raise _Truncated("".join(chars))
+
+
+def _ends_string(text: str, position: int, quote: str) -> bool:
+    """Check whether the text after a quote is a delimiter, nothing, or another
+    string on the next line, which is missing the comma before it."""
+    rest = text[position : position + 64]
+    stripped = rest.lstrip()
+    if not stripped or stripped[0] in STRING_END_DELIMITERS:
+        return True
+    return stripped[0] == quote and "\n" in rest[: len(rest) - len(stripped)]
+
+
+def _append_value(tokens: List[str], token: str) -> None:
+    """Append a value, or a property name, adding the comma missing before it."""
+    if tokens and tokens[-1] not in VALUE_PREFIXES:
+        tokens.append(",")
+    tokens.append(token)
+
+
+def _drop_trailing_comma(tokens: List[str]) -> None:
+    if tokens[-1] == ",":
+        tokens.pop()
+
+
+def _close_truncated(tokens: List[str], stack: List[str]) -> None:
+    """Close the containers left open by a truncated reply.
+
+    The value of a property that was cut before its value is dropped with it.
+    """
+    while True:
+        if tokens[-1] == ",":
+            tokens.pop()
+        elif tokens[-1] == ":":
+            # The property name and its colon
+            del tokens[-2:]
+        elif (
+            stack[-1] == "}" and tokens[-1].startswith('"') and tokens[-2] in ("{", ",")
+        ):
+            # A property name without a colon
+            tokens.pop()
+        else:
+            break
+    tokens.extend(reversed(stack))
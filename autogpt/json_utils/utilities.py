@@ -1,9 +1,12 @@
 """Utilities for the json_fixes package."""
+import functools
 import json
 import os.path
 import re
+from typing import Any, Callable, List, Optional
 
 from jsonschema import Draft7Validator
+from jsonschema.exceptions import ValidationError
 
 from autogpt.config import Config
 from autogpt.logs import logger
@@ -11,6 +14,26 @@ from autogpt.logs import logger
 CFG = Config()
 LLM_DEFAULT_RESPONSE_FORMAT = "llm_response_format_1"
 
+# The Python types of the JSON schema types; booleans are not numbers
+SCHEMA_TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+# The keywords the structural check understands, other keywords disable it
+STRUCTURAL_KEYWORDS = {
+    "$schema",
+    "type",
+    "properties",
+    "required",
+    "additionalProperties",
+    "items",
+}
+
 
 def extract_char_position(error_message: str) -> int:
     """Extract the character position from the JSONDecodeError message.
@@ -30,18 +53,122 @@ def extract_char_position(error_message: str) -> int:
         raise ValueError("Character position not found in the error message.")
 
 
+class JSONSchema:
+    """A JSON schema, compiled once into a validator and a structural check.
+
+    The structural check only looks at the types, properties and required
+    properties of the JSON, which is all the response formats use. It is much
+    cheaper than the validator, which is only run to report the errors of JSON that
+    fails the check, or for schemas using other keywords.
+    """
+
+    def __init__(self, schema: dict) -> None:
+        Draft7Validator.check_schema(schema)
+        self.schema = schema
+        self.validator = Draft7Validator(schema)
+        self.check_structure = compile_structural_check(schema)
+
+    def iter_errors(self, json_object: object) -> List[ValidationError]:
+        """Get the validation errors of the JSON, sorted by path."""
+        if self.check_structure is not None and self.check_structure(json_object):
+            return []
+        return sorted(self.validator.iter_errors(json_object), key=lambda e: e.path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(schema_name: str) -> JSONSchema:
+    """Load and compile a schema of this package, once per process.
+
+    Args:
+        schema_name (str): The name of the schema file, without extension.
+
+    Returns:
+        JSONSchema: The compiled schema.
+    """
+    scheme_file = os.path.join(os.path.dirname(__file__), f"{schema_name}.json")
+    with open(scheme_file, "r") as f:
+        return JSONSchema(json.load(f))
+
+
+def compile_structural_check(schema: Any) -> Optional[Callable[[Any], bool]]:
+    """Compile a schema into a function checking whether JSON is valid against it.
+
+    Args:
+        schema: The schema, or a subschema.
+
+    Returns:
+        The check, or None if the schema uses keywords the check does not support.
+    """
+    if schema is True or schema == {}:
+        return lambda value: True
+    if not isinstance(schema, dict) or not STRUCTURAL_KEYWORDS.issuperset(schema):
+        return None
+
+    checks = []
+    if "type" in schema:
+        type_names = schema["type"]
+        if isinstance(type_names, str):
+            type_names = [type_names]
+        if not all(name in SCHEMA_TYPES for name in type_names):
+            return None
+        types = tuple(t for name in type_names for t in SCHEMA_TYPES[name])
+        is_boolean_allowed = "boolean" in type_names
+        checks.append(
+            lambda value: isinstance(value, types)
+            and (is_boolean_allowed or not isinstance(value, bool))
+        )
+
+    properties = {}
+    for name, subschema in schema.get("properties", {}).items():
+        properties[name] = compile_structural_check(subschema)
+        if properties[name] is None:
+            return None
+    required = schema.get("required", [])
+    additional_properties = schema.get("additionalProperties", True)
+    if not isinstance(additional_properties, bool):
+        return None
+    if properties or required or not additional_properties:
+        checks.append(
+            lambda value: not isinstance(value, dict)
+            or _check_properties(value, properties, required, additional_properties)
+        )
+
+    if "items" in schema:
+        check_item = compile_structural_check(schema["items"])
+        if check_item is None:
+            return None
+        checks.append(
+            lambda value: not isinstance(value, list) or all(map(check_item, value))
+        )
+
+    return lambda value: all(check(value) for check in checks)
+
+
+def _check_properties(
+    value: dict,
+    properties: dict,
+    required: List[str],
+    additional_properties: bool,
+) -> bool:
+    if not all(name in value for name in required):
+        return False
+    for name, item in value.items():
+        check = properties.get(name)
+        if check is None:
+            if not additional_properties:
+                return False
+        elif not check(item):
+            return False
+    return True
+
+
 def validate_json(json_object: object, schema_name: str) -> dict | None:
     """
     :type schema_name: object
     :param schema_name: str
     :type json_object: object
     """
-    scheme_file = os.path.join(os.path.dirname(__file__), f"{schema_name}.json")
-    with open(scheme_file, "r") as f:
-        schema = json.load(f)
-    validator = Draft7Validator(schema)
-
-    if errors := sorted(validator.iter_errors(json_object), key=lambda e: e.path):
+    if errors := load_schema(schema_name).iter_errors(json_object):
         logger.error("该JSON对象是无效的。")
         if CFG.debug_mode:
             logger.error(
@@ -10,10 +10,14 @@ from autogpt.llm.base import (
 )
 from autogpt.llm.chat import chat_with_ai, create_chat_message, generate_context
 from autogpt.llm.llm_utils import (
+    acreate_chat_completion,
+    acreate_embedding,
     call_ai_function,
     chunked_tokens,
     create_chat_completion,
     get_ada_embedding,
+    get_ada_embeddings,
+    openai_aiosession,
 )
 from autogpt.llm.modelsinfo import COSTS
 from autogpt.llm.token_counter import count_message_tokens, count_string_tokens
@@ -32,7 +36,11 @@ __all__ = [
     "chat_with_ai",
     "call_ai_function",
     "create_chat_completion",
+    "acreate_chat_completion",
+    "acreate_embedding",
+    "openai_aiosession",
     "get_ada_embedding",
+    "get_ada_embeddings",
     "chunked_tokens",
     "COSTS",
     "count_message_tokens",
@@ -5,6 +5,7 @@ import json
 import openai
 
 from autogpt.config import Config
+from autogpt.llm.completion_cache import get_completion_cache
 from autogpt.llm.modelsinfo import COSTS
 from autogpt.logs import logger
 from autogpt.singleton import Singleton
@@ -61,13 +62,52 @@ class ApiManager(metaclass=Singleton):
                 max_tokens=max_tokens,
                 api_key=cfg.openai_api_key,
             )
+        self._track_chat_completion(response, model)
+        return response
+
+    async def acreate_chat_completion(
+        self,
+        messages: list,  # type: ignore
+        model: str | None = None,
+        temperature: float = None,
+        max_tokens: int | None = None,
+        deployment_id=None,
+    ) -> str:
+        """
+        Create a chat completion without blocking the event loop and update the cost.
+        Args:
+        messages (list): The list of messages to send to the API.
+        model (str): The model to use for the API call.
+        temperature (float): The temperature to use for the API call.
+        max_tokens (int): The maximum number of tokens for the API call.
+        Returns:
+        str: The AI's response.
+        """
+        cfg = Config()
+        if temperature is None:
+            temperature = cfg.temperature
+        kwargs = {}
+        if deployment_id is not None:
+            kwargs["deployment_id"] = deployment_id
+        response = await openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=cfg.openai_api_key,
+            **kwargs,
+        )
+        self._track_chat_completion(response, model)
+        return response
+
+    def _track_chat_completion(self, response, model: str) -> None:
+        """Log a chat completion response and update the cost."""
         logger.debug(f"\r\nchatGPT 回复：")
         logger.debug(json.dumps(response, ensure_ascii=False))
         logger.debug('\r\n\r\n')
         prompt_tokens = response.usage.prompt_tokens
         completion_tokens = response.usage.completion_tokens
         self.update_cost(prompt_tokens, completion_tokens, model)
-        return response
 
     def update_cost(self, prompt_tokens, completion_tokens, model):
         """
@@ -130,3 +170,16 @@ class ApiManager(metaclass=Singleton):
         float: The total budget for API calls.
         """
         return self.total_budget
+
+    def get_completion_cache_stats(self):
+        """
+        Get the stats of the completion cache.
+
+        Returns:
+        dict | None: The number of entries, hits and misses of the cache and its
+            hit rate, or None if the cache is disabled.
+        """
+        completion_cache = get_completion_cache()
+        if completion_cache is None:
+            return None
+        return completion_cache.get_stats()
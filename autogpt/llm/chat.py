@@ -1,3 +1,4 @@
+import itertools
 import time
 from random import shuffle
 
@@ -7,7 +8,10 @@ from autogpt.config import Config
 from autogpt.llm.api_manager import ApiManager
 from autogpt.llm.base import Message
 from autogpt.llm.llm_utils import create_chat_completion
-from autogpt.llm.token_counter import count_message_tokens
+from autogpt.llm.token_counter import (
+    count_history_message_tokens,
+    count_message_tokens,
+)
 from autogpt.logs import logger
 from autogpt.memory_management.store_memory import (
     save_memory_trimmed_from_context_window,
@@ -59,6 +63,42 @@ def generate_context(prompt, relevant_memory, full_message_history, model):
     )
 
 
+def fit_message_history(full_message_history, model, token_budget) -> tuple[int, int]:
+    """
+    Find the longest run of most recent messages that fits in a token budget.
+
+    The token counts of the messages, newest first, are accumulated lazily into
+    running sums, and counting stops at the first message that does not fit, so
+    the older messages are never counted. The count of each message is memoized,
+    so only the messages added since the last call are tokenized.
+
+    Args:
+    full_message_history (list): The list of all messages sent between the user
+        and the AI.
+    model (str): The name of the model used to count tokens.
+    token_budget (int): The number of tokens available for the messages.
+
+    Returns:
+    int: The index of the first message of full_message_history that fits in the
+        context; len(full_message_history) if none does.
+    int: The number of tokens used by the messages that fit.
+    """
+    cumulative_tokens = list(
+        itertools.takewhile(
+            lambda tokens: tokens <= token_budget,
+            itertools.accumulate(
+                count_history_message_tokens(message, model)
+                for message in reversed(full_message_history)
+            ),
+        )
+    )
+    num_fitting_messages = len(cumulative_tokens)
+    tokens_used = (
+        cumulative_tokens[num_fitting_messages - 1] if num_fitting_messages else 0
+    )
+    return len(full_message_history) - num_fitting_messages, tokens_used
+
+
 # TODO: Change debug from hardcode to argument
 def chat_with_ai(
     agent, prompt, user_input, full_message_history, permanent_memory, token_limit
@@ -129,31 +169,15 @@ def chat_with_ai(
 
             current_tokens_used += 500  # Account for memory (appended later) TODO: The final memory may be less than 500 tokens
 
-            # Add Messages until the token limit is reached or there are no more messages to add.
-            while next_message_to_add_index >= 0:
-                # print (f"CURRENT TOKENS USED: {current_tokens_used}")
-                message_to_add = full_message_history[next_message_to_add_index]
-
-                tokens_to_add = count_message_tokens([message_to_add], model)
-                if current_tokens_used + tokens_to_add > send_token_limit:
-                    # save_memory_trimmed_from_context_window(
-                    #     full_message_history,
-                    #     next_message_to_add_index,
-                    #     permanent_memory,
-                    # )
-                    break
-
-                # Add the most recent message to the start of the current context,
-                #  after the two system prompts.
-                current_context.insert(
-                    insertion_index, full_message_history[next_message_to_add_index]
-                )
-
-                # Count the currently used tokens
-                current_tokens_used += tokens_to_add
-
-                # Move to the next most recent message in the full message history
-                next_message_to_add_index -= 1
+            # Add the most recent messages that fit in the token limit to the start
+            #  of the current context, after the two system prompts.
+            context_start_index, history_tokens_used = fit_message_history(
+                full_message_history, model, send_token_limit - current_tokens_used
+            )
+            current_context[insertion_index:insertion_index] = full_message_history[
+                context_start_index:
+            ]
+            current_tokens_used += history_tokens_used
 
             # Insert Memories
             if len(full_message_history) > 0:
@@ -162,13 +186,19 @@ def chat_with_ai(
                     agent.last_memory_index,
                 ) = get_newly_trimmed_messages(
                     full_message_history=full_message_history,
-                    current_context=current_context,
+                    context_start_index=context_start_index,
                     last_memory_index=agent.last_memory_index,
                 )
-                agent.summary_memory = update_running_summary(
-                    current_memory=agent.summary_memory,
-                    new_events=newly_trimmed_messages,
-                )
+                if cfg.async_running_summary:
+                    agent.summary_memory = agent.summary_updater.update(
+                        current_memory=agent.summary_memory,
+                        new_events=newly_trimmed_messages,
+                    )
+                else:
+                    agent.summary_memory = update_running_summary(
+                        current_memory=agent.summary_memory,
+                        new_events=newly_trimmed_messages,
+                    )
                 current_context.insert(insertion_index, agent.summary_memory)
 
             api_manager = ApiManager()
@@ -179,16 +209,17 @@ def chat_with_ai(
                 )
                 if remaining_budget < 0:
                     remaining_budget = 0
-                system_message = (
-                    f"您的剩余API预算为：${remaining_budget:.3f}"
-                    + (
-                        " 预算超支！关闭！\n\n"
-                        if remaining_budget == 0
-                        else " 预算几乎超支！优雅关闭！\n\n"
+                system_message = f"您的剩余API预算为：${remaining_budget:.3f}" + (
+                    " 预算超支！关闭！\n\n"
+                    if remaining_budget == 0
+                    else (
+                        " 预算几乎超支！优雅关闭！\n\n"
                         if remaining_budget < 0.005
-                        else " 预算快要超支了。结束。\n\n"
-                        if remaining_budget < 0.01
-                        else "\n\n"
+                        else (
+                            " 预算快要超支了。结束。\n\n"
+                            if remaining_budget < 0.01
+                            else "\n\n"
+                        )
                     )
                 )
                 logger.debug(system_message)
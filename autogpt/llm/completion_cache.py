@@ -0,0 +1,90 @@
+"""A persistent cache for deterministic chat completions."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import List
+
+from autogpt.config import Config
+from autogpt.llm.base import Message
+from autogpt.llm.sqlite_cache import SQLiteLRUCache, open_sqlite_cache
+
+COMPLETION_CACHE_FILE = "completion_cache.sqlite3"
+
+
+class CompletionCache(SQLiteLRUCache):
+    """A size-bounded LRU cache of chat completions, stored in an SQLite database.
+
+    Entries are keyed by a hash of the model, messages, temperature and max_tokens
+    of the request. Entries older than `ttl` seconds are treated as missing.
+    """
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Message],  # type: ignore
+        temperature: float,
+        max_tokens: int | None,
+    ) -> str:
+        """Get the cache key for a chat completion request."""
+        request = json.dumps(
+            [model, messages, temperature, max_tokens],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        model: str,
+        messages: List[Message],  # type: ignore
+        temperature: float,
+        max_tokens: int | None,
+    ) -> str | None:
+        """Get the cached completion of a request, or None if it is not cached."""
+        value = self._get(self.make_key(model, messages, temperature, max_tokens))
+        return None if value is None else value.decode("utf-8")
+
+    def put(
+        self,
+        model: str,
+        messages: List[Message],  # type: ignore
+        temperature: float,
+        max_tokens: int | None,
+        completion: str,
+    ) -> None:
+        """Store the completion of a request, evicting expired entries, then the
+        least recently used ones, if the cache is full."""
+        key = self.make_key(model, messages, temperature, max_tokens)
+        self._put(key, completion.encode("utf-8"))
+
+    def get_stats(self) -> dict:
+        """
+        Returns: The number of entries, hits and misses of the cache, and its hit
+            rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            **super().get_stats(),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_completion_cache() -> CompletionCache | None:
+    """Get the completion cache of the current workspace.
+
+    Returns:
+        The cache, or None if it is disabled or there is no workspace yet.
+    """
+    cfg = Config()
+    if not cfg.completion_cache or cfg.workspace_path is None:
+        return None
+    path = Path(cfg.workspace_path) / COMPLETION_CACHE_FILE
+    return open_sqlite_cache(
+        CompletionCache,
+        path,
+        cfg.completion_cache_max_entries,
+        cfg.completion_cache_ttl,
+    )
@@ -0,0 +1,61 @@
+"""A persistent, content-addressed cache for embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.llm.sqlite_cache import SQLiteLRUCache, open_sqlite_cache
+
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"
+
+
+class EmbeddingCache(SQLiteLRUCache):
+    """A size-bounded LRU cache of embeddings, stored in an SQLite database.
+
+    Entries are keyed by a hash of the embedding model and the text, so the same
+    text embedded with another model is a different entry.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int) -> None:
+        """
+        Args:
+            path: The path of the SQLite database file
+            max_entries: The maximum number of embeddings to keep
+        """
+        super().__init__(path, max_entries)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Get the cache key for a text embedded with the given model."""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> List[float] | None:
+        """Get the cached embedding of a text, or None if it is not cached."""
+        blob = self._get(self.make_key(model, text))
+        if blob is None:
+            return None
+        return np.frombuffer(blob, dtype=np.float32).tolist()
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        """Store the embedding of a text, evicting the least recently used entries
+        if the cache is full."""
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        self._put(self.make_key(model, text), blob)
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Get the embedding cache of the current workspace.
+
+    Returns:
+        The cache, or None if it is disabled or there is no workspace yet.
+    """
+    cfg = Config()
+    if not cfg.embedding_cache or cfg.workspace_path is None:
+        return None
+    path = Path(cfg.workspace_path) / EMBEDDING_CACHE_FILE
+    return open_sqlite_cache(EmbeddingCache, path, cfg.embedding_cache_max_entries)
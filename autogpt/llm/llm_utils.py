@@ -1,19 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import functools
+import itertools
+import random
 import time
-from itertools import islice
 from typing import List, Optional
 
+import aiohttp
 import numpy as np
 import openai
 import tiktoken
 from colorama import Fore, Style
-from openai.error import APIError, RateLimitError, Timeout
+from openai.error import APIError, RateLimitError
 
 from autogpt.config import Config
 from autogpt.llm.api_manager import ApiManager
 from autogpt.llm.base import Message
+from autogpt.llm.completion_cache import get_completion_cache
+from autogpt.llm.embedding_cache import get_embedding_cache
+from autogpt.llm.rate_limiter import Priority, RequestScheduler
+from autogpt.llm.token_counter import count_message_tokens
 from autogpt.logs import logger
 
 
@@ -39,30 +47,61 @@ def retry_openai_api(
         f"{Fore.RED}Error: API Bad gateway. Waiting {{backoff}} seconds...{Fore.RESET}"
     )
 
+    def _retry_delay(error: Exception, attempt: int, user_warned: bool) -> float:
+        """Log a failed attempt and get how long to wait before retrying it.
+
+        Returns:
+            The delay in seconds, or -1 if the attempt should not be retried.
+        """
+        num_attempts = num_retries + 1  # +1 for the first attempt
+        if isinstance(error, RateLimitError):
+            if attempt == num_attempts:
+                return -1
+
+            logger.debug(retry_limit_msg)
+            if not user_warned:
+                logger.double_check(api_key_error_msg)
+        elif (error.http_status != 502) or (attempt == num_attempts):
+            return -1
+
+        # Jitter the backoff so that concurrent requests don't retry in lockstep
+        backoff = backoff_base ** (attempt + 2) * random.uniform(0.5, 1)
+        logger.debug(backoff_msg.format(backoff=f"{backoff:.2f}"))
+        return backoff
+
     def _wrapper(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _async_wrapped(*args, **kwargs):
+                user_warned = not warn_user
+                for attempt in itertools.count(1):
+                    try:
+                        return await func(*args, **kwargs)
+
+                    except (RateLimitError, APIError) as e:
+                        backoff = _retry_delay(e, attempt, user_warned)
+                        if backoff < 0:
+                            raise
+                        user_warned = user_warned or isinstance(e, RateLimitError)
+
+                    await asyncio.sleep(backoff)
+
+            return _async_wrapped
+
         @functools.wraps(func)
         def _wrapped(*args, **kwargs):
             user_warned = not warn_user
-            num_attempts = num_retries + 1  # +1 for the first attempt
-            for attempt in range(1, num_attempts + 1):
+            for attempt in itertools.count(1):
                 try:
                     return func(*args, **kwargs)
 
-                except RateLimitError:
-                    if attempt == num_attempts:
-                        raise
-
-                    logger.debug(retry_limit_msg)
-                    if not user_warned:
-                        logger.double_check(api_key_error_msg)
-                        user_warned = True
-
-                except APIError as e:
-                    if (e.http_status != 502) or (attempt == num_attempts):
+                except (RateLimitError, APIError) as e:
+                    backoff = _retry_delay(e, attempt, user_warned)
+                    if backoff < 0:
                         raise
+                    user_warned = user_warned or isinstance(e, RateLimitError)
 
-                backoff = backoff_base ** (attempt + 2)
-                logger.debug(backoff_msg.format(backoff=backoff))
                 time.sleep(backoff)
 
         return _wrapped
@@ -71,7 +110,11 @@ def retry_openai_api(
 
 
 def call_ai_function(
-    function: str, args: list, description: str, model: str | None = None
+    function: str,
+    args: list,
+    description: str,
+    model: str | None = None,
+    cache: bool = False,
 ) -> str:
     """Call an AI function
 
@@ -83,6 +126,8 @@ def call_ai_function(
         args (list): The arguments to pass to the function
         description (str): The description of the function
         model (str, optional): The model to use. Defaults to None.
+        cache (bool, optional): Whether the response can be replayed from the
+            completion cache. Defaults to False.
 
     Returns:
         str: The response from the function
@@ -103,7 +148,9 @@ def call_ai_function(
         {"role": "user", "content": args},
     ]
 
-    return create_chat_completion(model=model, messages=messages, temperature=0)
+    return create_chat_completion(
+        model=model, messages=messages, temperature=0, cache=cache
+    )
 
 
 # Overly simple abstraction until we create something better
@@ -113,27 +160,201 @@ def create_chat_completion(
     model: Optional[str] = None,
     temperature: float = None,
     max_tokens: Optional[int] = None,
+    priority: Priority = Priority.AGENT,
+    cache: bool = False,
 ) -> str:
     """Create a chat completion using the OpenAI API
 
+    The request is scheduled within the rate limits of the model, and retried
+    with a jittered exponential backoff on rate limits and bad gateways. If the
+    completion cache is enabled and the caller opts in with `cache`, completions
+    with temperature 0 are replayed from it instead of being requested again.
+    The agent's own completions are never cached, so that a repeated prompt does
+    not replay a stale command.
+
+    Args:
+        messages (List[Message]): The messages to send to the chat completion
+        model (str, optional): The model to use. Defaults to None.
+        temperature (float, optional): The temperature to use. Defaults to 0.9.
+        max_tokens (int, optional): The max tokens to use. Defaults to None.
+        priority (Priority, optional): The scheduling priority of the request.
+            Defaults to Priority.AGENT.
+        cache (bool, optional): Whether the completion can be replayed from the
+            completion cache. Defaults to False.
+
+    Returns:
+        str: The response from the chat completion
+    """
+    cfg = Config()
+    if temperature is None:
+        temperature = cfg.temperature
+
+    logger.debug(
+        f"{Fore.GREEN}创建 {model} 模型对话完成, temperature {temperature}, max_tokens {max_tokens}{Fore.RESET}"
+    )
+    message = _plugin_chat_completion(messages, model, temperature, max_tokens)
+    if message is not None:
+        return message
+
+    # Only deterministic completions are worth replaying
+    completion_cache = get_completion_cache() if cache and temperature == 0 else None
+    if completion_cache is not None:
+        content = completion_cache.get(model, messages, temperature, max_tokens)
+        if content is not None:
+            logger.debug("Using a cached chat completion")
+            return _plugin_on_response(content)
+
+    deployment_id = None
+    if cfg.use_azure:
+        deployment_id = cfg.get_azure_deployment_id_for_model(model)
+    try:
+        response = _create_chat_completion_response(
+            priority,
+            deployment_id=deployment_id,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+    except RateLimitError:
+        logger.typewriter_log(
+            "FAILED TO GET RESPONSE FROM OPENAI",
+            Fore.RED,
+            "Auto-GPT has failed to get a response from OpenAI's services. "
+            + f"Try running Auto-GPT again, and if the problem the persists try running it with `{Fore.CYAN}--debug{Fore.RESET}`.",
+        )
+        logger.double_check()
+        if cfg.debug_mode:
+            raise RuntimeError("Failed to get response after retries")
+        else:
+            quit(1)
+    content = response.choices[0].message["content"]
+    if completion_cache is not None:
+        completion_cache.put(model, messages, temperature, max_tokens, content)
+    return _plugin_on_response(content)
+
+
+async def acreate_chat_completion(
+    messages: List[Message],  # type: ignore
+    model: Optional[str] = None,
+    temperature: float = None,
+    max_tokens: Optional[int] = None,
+    priority: Priority = Priority.AGENT,
+    cache: bool = False,
+) -> str:
+    """Create a chat completion using the OpenAI API, without blocking the event loop
+
+    Like create_chat_completion, the plugins can handle the completion and the
+    response, opted-in completions with temperature 0 can be replayed from the
+    completion cache, and the cost is tracked by the ApiManager. Rate limits and bad
+    gateways are retried with an exponential backoff, and the call can be cancelled
+    at any point, including while backing off. Run it inside `openai_aiosession()`
+    to share a connection pool between concurrent calls.
+
     Args:
         messages (List[Message]): The messages to send to the chat completion
         model (str, optional): The model to use. Defaults to None.
         temperature (float, optional): The temperature to use. Defaults to 0.9.
         max_tokens (int, optional): The max tokens to use. Defaults to None.
+        priority (Priority, optional): The scheduling priority of the request.
+            Defaults to Priority.AGENT.
+        cache (bool, optional): Whether the completion can be replayed from the
+            completion cache. Defaults to False.
 
     Returns:
         str: The response from the chat completion
+
+    Raises:
+        RateLimitError, APIError: If the request still fails after the retries.
     """
     cfg = Config()
     if temperature is None:
         temperature = cfg.temperature
 
-    num_retries = 10
-    warned_user = False
     logger.debug(
         f"{Fore.GREEN}创建 {model} 模型对话完成, temperature {temperature}, max_tokens {max_tokens}{Fore.RESET}"
     )
+    message = _plugin_chat_completion(messages, model, temperature, max_tokens)
+    if message is not None:
+        return message
+
+    # Only deterministic completions are worth replaying
+    completion_cache = get_completion_cache() if cache and temperature == 0 else None
+    if completion_cache is not None:
+        content = completion_cache.get(model, messages, temperature, max_tokens)
+        if content is not None:
+            logger.debug("Using a cached chat completion")
+            return _plugin_on_response(content)
+
+    deployment_id = None
+    if cfg.use_azure:
+        deployment_id = cfg.get_azure_deployment_id_for_model(model)
+    response = await _acreate_chat_completion_response(
+        priority,
+        deployment_id=deployment_id,
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    content = response.choices[0].message["content"]
+    if completion_cache is not None:
+        completion_cache.put(model, messages, temperature, max_tokens, content)
+    return _plugin_on_response(content)
+
+
+@retry_openai_api()
+def _create_chat_completion_response(priority: Priority, **kwargs):
+    """Request a chat completion through the ApiManager, within the rate limits of
+    the model and retrying on failures."""
+    scheduler = RequestScheduler()
+    tokens = _estimate_chat_tokens(
+        kwargs["messages"], kwargs["model"], kwargs["max_tokens"]
+    )
+    with scheduler.reserve(kwargs["model"], tokens, priority) as reservation:
+        response = ApiManager().create_chat_completion(**kwargs)
+        reservation.settle(response.usage.total_tokens)
+    return response
+
+
+@retry_openai_api()
+async def _acreate_chat_completion_response(priority: Priority, **kwargs):
+    """Like _create_chat_completion_response, without blocking the event loop."""
+    scheduler = RequestScheduler()
+    tokens = _estimate_chat_tokens(
+        kwargs["messages"], kwargs["model"], kwargs["max_tokens"]
+    )
+    async with scheduler.areserve(kwargs["model"], tokens, priority) as reservation:
+        response = await ApiManager().acreate_chat_completion(**kwargs)
+        reservation.settle(response.usage.total_tokens)
+    return response
+
+
+def _estimate_chat_tokens(
+    messages: List[Message], model: str, max_tokens: Optional[int]  # type: ignore
+) -> int:
+    """Estimate the tokens a chat completion counts against the rate limit: the
+    prompt and the maximum length of the completion."""
+    try:
+        prompt_tokens = count_message_tokens(messages, model)
+    except NotImplementedError:
+        # About 4 characters per token for models without a known message format
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+    return prompt_tokens + (max_tokens or 0)
+
+
+def _plugin_chat_completion(
+    messages: List[Message],  # type: ignore
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int],
+) -> str | None:
+    """Let the first plugin that can handle the chat completion create it.
+
+    Returns:
+        str | None: The plugin's response, or None if no plugin handled it.
+    """
+    cfg = Config()
     for plugin in cfg.plugins:
         if plugin.can_handle_chat_completion(
             messages=messages,
@@ -149,60 +370,12 @@ def create_chat_completion(
             )
             if message is not None:
                 return message
-    api_manager = ApiManager()
-    response = None
-    for attempt in range(num_retries):
-        backoff = 2 ** (attempt + 2)
-        try:
-            if cfg.use_azure:
-                response = api_manager.create_chat_completion(
-                    deployment_id=cfg.get_azure_deployment_id_for_model(model),
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-            else:
-                response = api_manager.create_chat_completion(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
-            break
-        except RateLimitError:
-            logger.debug(
-                f"{Fore.RED}Error: ", f"Reached rate limit, passing...{Fore.RESET}"
-            )
-            if not warned_user:
-                logger.double_check(
-                    f"Please double check that you have setup a {Fore.CYAN + Style.BRIGHT}PAID{Style.RESET_ALL} OpenAI API Account. "
-                    + f"You can read more here: {Fore.CYAN}https://docs.agpt.co/setup/#getting-an-api-key{Fore.RESET}"
-                )
-                warned_user = True
-        except (APIError, Timeout) as e:
-            if e.http_status != 502:
-                raise
-            if attempt == num_retries - 1:
-                raise
-        logger.debug(
-            f"{Fore.RED}Error: ",
-            f"API Bad gateway. Waiting {backoff} seconds...{Fore.RESET}",
-        )
-        time.sleep(backoff)
-    if response is None:
-        logger.typewriter_log(
-            "FAILED TO GET RESPONSE FROM OPENAI",
-            Fore.RED,
-            "Auto-GPT has failed to get a response from OpenAI's services. "
-            + f"Try running Auto-GPT again, and if the problem the persists try running it with `{Fore.CYAN}--debug{Fore.RESET}`.",
-        )
-        logger.double_check()
-        if cfg.debug_mode:
-            raise RuntimeError(f"Failed to get response after {num_retries} retries")
-        else:
-            quit(1)
-    resp = response.choices[0].message["content"]
+    return None
+
+
+def _plugin_on_response(resp: str) -> str:
+    """Pass a chat completion response through the plugins' on_response hooks."""
+    cfg = Config()
     for plugin in cfg.plugins:
         if not plugin.can_handle_on_response():
             continue
@@ -210,13 +383,39 @@ def create_chat_completion(
     return resp
 
 
+@contextlib.asynccontextmanager
+async def openai_aiosession(limit: int = 100):
+    """Share a single aiohttp connection pool between the async OpenAI API calls
+    made inside the block, including in the tasks it starts.
+
+    Args:
+        limit (int): The maximum number of simultaneous connections.
+
+    Yields:
+        aiohttp.ClientSession: The session, or the enclosing one if there is one.
+    """
+    session = openai.aiosession.get()
+    if session is not None:
+        yield session
+        return
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=limit)
+    ) as session:
+        token = openai.aiosession.set(session)
+        try:
+            yield session
+        finally:
+            openai.aiosession.reset(token)
+
+
 def batched(iterable, n):
     """Batch data into tuples of length n. The last batch may be shorter."""
     # batched('ABCDEFG', 3) --> ABC DEF G
     if n < 1:
         raise ValueError("n must be at least one")
     it = iter(iterable)
-    while batch := tuple(islice(it, n)):
+    while batch := tuple(itertools.islice(it, n)):
         yield batch
 
 
@@ -230,6 +429,8 @@ def chunked_tokens(text, tokenizer_name, chunk_length):
 def get_ada_embedding(text: str) -> List[float]:
     """Get an embedding from the ada model.
 
+    Embeddings are looked up in the embedding cache first, if it is enabled.
+
     Args:
         text (str): The text to embed.
 
@@ -240,21 +441,71 @@ def get_ada_embedding(text: str) -> List[float]:
     model = cfg.embedding_model
     text = text.replace("\n", " ")
 
-    if cfg.use_azure:
-        kwargs = {"engine": cfg.get_azure_deployment_id_for_model(model)}
-    else:
-        kwargs = {"model": model}
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        embedding = embedding_cache.get(model, text)
+        if embedding is not None:
+            return embedding
 
-    embedding = create_embedding(text, **kwargs)
+    embedding = create_embedding(text, **_embedding_kwargs(model))
+    if embedding_cache is not None:
+        embedding_cache.put(model, text, embedding)
     return embedding
 
 
-@retry_openai_api()
+def get_ada_embeddings(
+    texts: List[str], priority: Priority = Priority.AGENT
+) -> List[List[float]]:
+    """Get the embeddings of several texts from the ada model, batching the texts
+    that are not in the embedding cache into as few requests as possible.
+
+    Args:
+        texts (List[str]): The texts to embed.
+        priority (Priority, optional): The scheduling priority of the requests.
+            Defaults to Priority.AGENT.
+
+    Returns:
+        List[List[float]]: The embeddings, in the same order as the texts.
+    """
+    cfg = Config()
+    model = cfg.embedding_model
+    texts = [text.replace("\n", " ") for text in texts]
+
+    embedding_cache = get_embedding_cache()
+    embeddings = {}
+    if embedding_cache is not None:
+        for text in texts:
+            if text not in embeddings:
+                embeddings[text] = embedding_cache.get(model, text)
+
+    missing_texts = list(
+        dict.fromkeys(text for text in texts if embeddings.get(text) is None)
+    )
+    if missing_texts:
+        new_embeddings = create_embeddings(
+            missing_texts, priority=priority, **_embedding_kwargs(model)
+        )
+        for text, embedding in zip(missing_texts, new_embeddings):
+            embeddings[text] = embedding
+            if embedding_cache is not None:
+                embedding_cache.put(model, text, embedding)
+
+    return [embeddings[text] for text in texts]
+
+
+def _embedding_kwargs(model: str) -> dict:
+    """Get the arguments selecting the embedding model in API calls."""
+    cfg = Config()
+    if cfg.use_azure:
+        return {"engine": cfg.get_azure_deployment_id_for_model(model)}
+    return {"model": model}
+
+
 def create_embedding(
     text: str,
     *_,
     **kwargs,
-) -> openai.Embedding:
+) -> List[float]:
     """Create an embedding using the OpenAI API
 
     Args:
@@ -262,34 +513,198 @@ def create_embedding(
         kwargs: Other arguments to pass to the OpenAI API embedding creation call.
 
     Returns:
-        openai.Embedding: The embedding object.
+        List[float]: The embedding.
     """
-    cfg = Config()
+    return create_embeddings([text], **kwargs)[0]
+
+
+def create_embeddings(
+    texts: List[str],
+    *_,
+    priority: Priority = Priority.AGENT,
+    **kwargs,
+) -> List[List[float]]:
+    """Create embeddings for several texts using the OpenAI API
+
+    Texts longer than the embedding token limit are split into chunks. The chunks
+    of all the texts are sent together, in requests of at most
+    `embedding_batch_max_items` chunks and `embedding_batch_max_tokens` tokens. The
+    embedding of each text is the average of its chunk embeddings, weighted by the
+    chunk lengths.
+
+    Args:
+        texts (List[str]): The texts to embed.
+        priority (Priority, optional): The scheduling priority of the requests.
+            Defaults to Priority.AGENT.
+        kwargs: Other arguments to pass to the OpenAI API embedding creation call.
+
+    Returns:
+        List[List[float]]: The embeddings, in the same order as the texts.
+    """
+    chunks, text_chunk_indices = _chunk_texts(texts)
     chunk_embeddings = []
-    chunk_lengths = []
-    for chunk in chunked_tokens(
-        text,
-        tokenizer_name=cfg.embedding_tokenizer,
-        chunk_length=cfg.embedding_token_limit,
-    ):
+    for batch in _embedding_batches(chunks):
+        chunk_embeddings.extend(_create_chunk_embeddings(batch, priority, **kwargs))
+    return _combine_chunk_embeddings(chunks, text_chunk_indices, chunk_embeddings)
+
+
+async def acreate_embedding(
+    text: str,
+    *_,
+    **kwargs,
+) -> List[float]:
+    """Create an embedding using the OpenAI API, without blocking the event loop
+
+    Args:
+        text (str): The text to embed.
+        kwargs: Other arguments to pass to the OpenAI API embedding creation call.
+
+    Returns:
+        List[float]: The embedding.
+    """
+    return (await acreate_embeddings([text], **kwargs))[0]
+
+
+async def acreate_embeddings(
+    texts: List[str],
+    *_,
+    priority: Priority = Priority.AGENT,
+    **kwargs,
+) -> List[List[float]]:
+    """Create embeddings for several texts using the OpenAI API, without blocking
+    the event loop
+
+    The texts are chunked and batched like in create_embeddings, but the batches are
+    requested concurrently.
+
+    Args:
+        texts (List[str]): The texts to embed.
+        priority (Priority, optional): The scheduling priority of the requests.
+            Defaults to Priority.AGENT.
+        kwargs: Other arguments to pass to the OpenAI API embedding creation call.
+
+    Returns:
+        List[List[float]]: The embeddings, in the same order as the texts.
+    """
+    chunks, text_chunk_indices = _chunk_texts(texts)
+    batch_embeddings = await asyncio.gather(
+        *(
+            _acreate_chunk_embeddings(batch, priority, **kwargs)
+            for batch in _embedding_batches(chunks)
+        )
+    )
+    chunk_embeddings = list(itertools.chain.from_iterable(batch_embeddings))
+    return _combine_chunk_embeddings(chunks, text_chunk_indices, chunk_embeddings)
+
+
+def _chunk_texts(texts: List[str]) -> tuple[list, List[range]]:
+    """Split texts into chunks of at most `embedding_token_limit` tokens.
+
+    Returns:
+        The chunks of all the texts, and the indices of the chunks of each text.
+    """
+    cfg = Config()
+    chunks = []
+    text_chunk_indices = []
+    for text in texts:
+        start = len(chunks)
+        chunks.extend(
+            chunked_tokens(
+                text,
+                tokenizer_name=cfg.embedding_tokenizer,
+                chunk_length=cfg.embedding_token_limit,
+            )
+        )
+        text_chunk_indices.append(range(start, len(chunks)))
+    return chunks, text_chunk_indices
+
+
+def _embedding_batches(chunks):
+    """Batch chunks into embedding requests within the configured budget."""
+    cfg = Config()
+    return batched_by_budget(
+        chunks,
+        max_items=cfg.embedding_batch_max_items,
+        max_tokens=cfg.embedding_batch_max_tokens,
+    )
+
+
+def _combine_chunk_embeddings(
+    chunks, text_chunk_indices: List[range], chunk_embeddings: List[List[float]]
+) -> List[List[float]]:
+    """Average the chunk embeddings of each text, weighted by the chunk lengths."""
+    embeddings = []
+    for indices in text_chunk_indices:
+        # do weighted avg
+        embedding = np.average(
+            [chunk_embeddings[i] for i in indices],
+            axis=0,
+            weights=[len(chunks[i]) for i in indices],
+        )
+        # normalize the length to one
+        embedding = embedding / np.linalg.norm(embedding)
+        embeddings.append(embedding.tolist())
+    return embeddings
+
+
+def batched_by_budget(chunks, max_items: int, max_tokens: int):
+    """Batch token chunks into lists of at most max_items chunks and max_tokens
+    tokens. A chunk longer than max_tokens gets a batch of its own."""
+    batch = []
+    batch_tokens = 0
+    for chunk in chunks:
+        if batch and (
+            len(batch) >= max_items or batch_tokens + len(chunk) > max_tokens
+        ):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(chunk)
+        batch_tokens += len(chunk)
+    if batch:
+        yield batch
+
+
+@retry_openai_api()
+def _create_chunk_embeddings(
+    chunks, priority: Priority = Priority.AGENT, **kwargs
+) -> List[List[float]]:
+    """Embed a batch of token chunks with a single OpenAI API request."""
+    cfg = Config()
+    tokens = sum(len(chunk) for chunk in chunks)
+    with RequestScheduler().reserve(cfg.embedding_model, tokens, priority):
         embedding = openai.Embedding.create(
-            input=[chunk],
+            input=list(chunks),
             api_key=cfg.openai_api_key,
             **kwargs,
         )
-        api_manager = ApiManager()
-        api_manager.update_cost(
-            prompt_tokens=embedding.usage.prompt_tokens,
-            completion_tokens=0,
-            model=cfg.embedding_model,
+    return _chunk_embeddings_from_response(embedding)
+
+
+@retry_openai_api()
+async def _acreate_chunk_embeddings(
+    chunks, priority: Priority = Priority.AGENT, **kwargs
+) -> List[List[float]]:
+    """Embed a batch of token chunks with a single async OpenAI API request."""
+    cfg = Config()
+    tokens = sum(len(chunk) for chunk in chunks)
+    async with RequestScheduler().areserve(cfg.embedding_model, tokens, priority):
+        embedding = await openai.Embedding.acreate(
+            input=list(chunks),
+            api_key=cfg.openai_api_key,
+            **kwargs,
         )
-        chunk_embeddings.append(embedding["data"][0]["embedding"])
-        chunk_lengths.append(len(chunk))
-
-    # do weighted avg
-    chunk_embeddings = np.average(chunk_embeddings, axis=0, weights=chunk_lengths)
-    chunk_embeddings = chunk_embeddings / np.linalg.norm(
-        chunk_embeddings
-    )  # normalize the length to one
-    chunk_embeddings = chunk_embeddings.tolist()
-    return chunk_embeddings
+    return _chunk_embeddings_from_response(embedding)
+
+
+def _chunk_embeddings_from_response(embedding) -> List[List[float]]:
+    """Track the cost of an embedding response and get its embeddings in order."""
+    cfg = Config()
+    api_manager = ApiManager()
+    api_manager.update_cost(
+        prompt_tokens=embedding.usage.prompt_tokens,
+        completion_tokens=0,
+        model=cfg.embedding_model,
+    )
+    data = sorted(embedding["data"], key=lambda x: x["index"])
+    return [item["embedding"] for item in data]
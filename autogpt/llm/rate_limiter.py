@@ -0,0 +1,264 @@
+"""Scheduling of OpenAI API requests within the rate limits of each model."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import re
+import threading
+import time
+from enum import IntEnum
+from typing import Iterator, Mapping
+
+from autogpt.config import Config
+from autogpt.logs import logger
+from autogpt.singleton import Singleton
+
+# How often a request that is not first in the queue checks whether it is its turn
+POLL_INTERVAL = 0.05
+
+DURATION_PART_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class Priority(IntEnum):
+    """The priority of a request, the lowest value is scheduled first."""
+
+    AGENT = 0
+    BACKGROUND = 10
+
+
+def parse_duration(value: str) -> float | None:
+    """Parse a duration from a rate limit header, like "20ms", "6m0s" or "1.5".
+
+    Returns:
+        The duration in seconds, or None if it cannot be parsed.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """A bucket refilled continuously at `per_minute` units per minute, holding at
+    most one minute's worth. A limit of 0 means unlimited."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.per_minute:
+            refill = (now - self.updated) * self.per_minute / 60
+            self.level = min(float(self.per_minute), self.level + refill)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Get how long to wait before `amount` units are available.
+
+        A request larger than the bucket only waits for the bucket to be full.
+        """
+        self._refill(now)
+        if not self.per_minute:
+            return 0.0
+        missing = min(amount, self.per_minute) - self.level
+        return max(missing, 0) * 60 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        """Remove units from the bucket. Its level may become negative."""
+        if self.per_minute:
+            self.level -= amount
+
+    def set_limit(self, per_minute: float, now: float) -> None:
+        """Change the limit, keeping the units already used this minute."""
+        self._refill(now)
+        used = self.per_minute - self.level if self.per_minute else 0
+        self.per_minute = per_minute
+        self.level = per_minute - used
+
+    def set_remaining(self, remaining: float, now: float) -> None:
+        """Lower the level to the number of units the API says are left."""
+        self._refill(now)
+        if self.per_minute:
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Keeps the requests to a model within its requests and tokens per minute.
+
+    Requests wait in a queue ordered by priority, then by arrival. Only the first
+    request of the queue may take capacity from the buckets, so a large request is
+    not starved by smaller ones and background requests never overtake the agent's.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, int]] = []
+        self._counter = itertools.count()
+
+    def _enqueue(self, priority: Priority) -> tuple[int, int]:
+        ticket = (int(priority), next(self._counter))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _try_acquire(self, ticket: tuple[int, int], tokens: float) -> float:
+        """Take capacity for a queued request if it is its turn.
+
+        Returns:
+            0 if the capacity was taken, otherwise how long to wait before retrying.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._queue[0] != ticket:
+                return POLL_INTERVAL
+            wait = max(
+                self.blocked_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(tokens, now),
+            )
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            return 0.0
+
+    def _dequeue(self, ticket: tuple[int, int]) -> None:
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+
+    def acquire(self, tokens: float, priority: Priority = Priority.AGENT) -> None:
+        """Wait until a request of `tokens` tokens can be sent."""
+        ticket = self._enqueue(priority)
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                time.sleep(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def aacquire(
+        self, tokens: float, priority: Priority = Priority.AGENT
+    ) -> None:
+        """Wait without blocking the event loop until a request of `tokens` tokens
+        can be sent. Cancelling the wait removes the request from the queue."""
+        ticket = self._enqueue(priority)
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    def settle(self, reserved_tokens: float, used_tokens: float) -> None:
+        """Correct the tokens taken for a request with the tokens it actually used."""
+        with self._lock:
+            self.tokens.take(used_tokens - reserved_tokens)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adjust the limits to the rate limit headers of an API response."""
+        headers = {key.lower(): value for key, value in headers.items()}
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = _float_header(headers, f"x-ratelimit-limit-{name}")
+                if limit:
+                    bucket.set_limit(limit, now)
+                remaining = _float_header(headers, f"x-ratelimit-remaining-{name}")
+                if remaining is not None:
+                    bucket.set_remaining(remaining, now)
+
+            retry_after = parse_duration(headers.get("retry-after", ""))
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+def _float_header(headers: Mapping[str, str], name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class Reservation:
+    """The capacity reserved for a request, to be settled with its actual usage."""
+
+    def __init__(self, limiter: RateLimiter, tokens: float) -> None:
+        self.limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, used_tokens: float) -> None:
+        """Give back the reserved tokens the request did not use, or take more."""
+        self.limiter.settle(self.tokens, used_tokens)
+        self.tokens = used_tokens
+
+
+class RequestScheduler(metaclass=Singleton):
+    """Schedules the OpenAI API requests with a rate limiter per model.
+
+    The limits start at OPENAI_REQUESTS_PER_MINUTE and OPENAI_TOKENS_PER_MINUTE
+    (unlimited by default) and are updated from the rate limit headers of the
+    API's rate limit errors.
+    """
+
+    def __init__(self) -> None:
+        self._limiters: dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get_limiter(self, model: str) -> RateLimiter:
+        """Get the rate limiter of a model."""
+        with self._lock:
+            if model not in self._limiters:
+                cfg = Config()
+                self._limiters[model] = RateLimiter(
+                    cfg.openai_requests_per_minute, cfg.openai_tokens_per_minute
+                )
+            return self._limiters[model]
+
+    @contextlib.contextmanager
+    def reserve(
+        self, model: str, tokens: float, priority: Priority = Priority.AGENT
+    ) -> Iterator[Reservation]:
+        """Wait for the capacity to send a request, then send it in the block.
+
+        If the request fails with rate limit headers, the limits are updated.
+        """
+        limiter = self.get_limiter(model)
+        limiter.acquire(tokens, priority)
+        with self._learning_from_errors(limiter):
+            yield Reservation(limiter, tokens)
+
+    @contextlib.asynccontextmanager
+    async def areserve(
+        self, model: str, tokens: float, priority: Priority = Priority.AGENT
+    ):
+        """Like reserve(), without blocking the event loop while waiting."""
+        limiter = self.get_limiter(model)
+        await limiter.aacquire(tokens, priority)
+        with self._learning_from_errors(limiter):
+            yield Reservation(limiter, tokens)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _learning_from_errors(limiter: RateLimiter) -> Iterator[None]:
+        try:
+            yield
+        except Exception as e:
+            headers = getattr(e, "headers", None)
+            if headers:
+                logger.debug(f"Updating rate limits from headers: {dict(headers)}")
+                limiter.update_from_headers(headers)
+            raise
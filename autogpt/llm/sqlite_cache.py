@@ -0,0 +1,137 @@
+"""A persistent, size-bounded LRU cache stored in an SQLite database."""
+
+from __future__ import annotations
+
+import functools
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Fraction of the cache evicted at once when it is full, to amortize evictions
+EVICTION_FRACTION = 0.1
+
+
+class SQLiteLRUCache:
+    """A size-bounded LRU cache of bytes, stored in an SQLite database.
+
+    Subclasses encode their keys and values, and expose typed `get` and `put`
+    methods over `_get` and `_put`. Entries older than `ttl` seconds are treated
+    as missing, and are evicted first when the cache is full.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int, ttl: float = 0) -> None:
+        """
+        Args:
+            path: The path of the SQLite database file
+            max_entries: The maximum number of entries to keep
+            ttl: The number of seconds an entry is kept, 0 to keep it forever
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+            )
+        self._num_entries, self._clock = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM entries"
+        ).fetchone()
+
+    def _get(self, key: str) -> bytes | None:
+        """Get the value of a key, or None if it is missing or expired."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._is_expired(row[1]):
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM entries WHERE key = ?", (key,)
+                    )
+                self._num_entries -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._clock += 1
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    (self._clock, key),
+                )
+        return row[0]
+
+    def _put(self, key: str, value: bytes) -> None:
+        """Store the value of a key, evicting expired entries, then the least
+        recently used ones, if the cache is full."""
+        now = time.time()
+        with self._lock:
+            self._clock += 1
+            with self._connection:
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, value, now, self._clock),
+                )
+                if cursor.rowcount == 0:
+                    self._connection.execute(
+                        "UPDATE entries SET value = ?, created = ?, last_used = ?"
+                        " WHERE key = ?",
+                        (value, now, self._clock, key),
+                    )
+                    return
+                self._num_entries += 1
+                if self._num_entries > self.max_entries:
+                    self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl:
+            cursor = self._connection.execute(
+                "DELETE FROM entries WHERE created < ?", (now - self.ttl,)
+            )
+            self._num_entries -= cursor.rowcount
+        if self._num_entries > self.max_entries:
+            num_evicted = self._num_entries - self.max_entries
+            num_evicted += int(self.max_entries * EVICTION_FRACTION)
+            cursor = self._connection.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                (num_evicted,),
+            )
+            self._num_entries -= cursor.rowcount
+
+    def _is_expired(self, created: float) -> bool:
+        return bool(self.ttl) and time.time() - created > self.ttl
+
+    def clear(self) -> None:
+        """Remove all the entries from the cache."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM entries")
+            self._num_entries = 0
+
+    def __len__(self) -> int:
+        return self._num_entries
+
+    def get_stats(self) -> dict:
+        """
+        Returns: The number of entries, hits and misses of the cache.
+        """
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+
+@functools.lru_cache(maxsize=None)
+def open_sqlite_cache(cache_class: type, path: Path, *args) -> SQLiteLRUCache:
+    """Open a cache once per class, path and arguments."""
+    return cache_class(path, *args)
@@ -1,13 +1,36 @@
 """Functions for counting the number of tokens in a message or string."""
 from __future__ import annotations
 
-from typing import List
+import functools
+from typing import Dict, List, Tuple
 
 import tiktoken
 
 from autogpt.llm.base import Message
 from autogpt.logs import logger
 
+# The token counts of the history messages, by model and message content. The
+# history is counted again on every cycle and kept whole, so this is not bounded.
+_history_token_counts: Dict[Tuple, int] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Returns the tiktoken encoding for a model, loading it only once per model.
+
+    Args:
+        model (str): The name of the model, falls back to cl100k_base if unknown.
+
+    Returns:
+        tiktoken.Encoding: The encoding used by the model.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warn("警告：找不到模型。使用cl100k_base编码。")
+        return tiktoken.get_encoding("cl100k_base")
+
 
 def count_message_tokens(
     messages: List[Message], model: str = "gpt-3.5-turbo-0301"
@@ -24,11 +47,7 @@ def count_message_tokens(
     Returns:
         int: The number of tokens used by the list of messages.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warn("警告：找不到模型。使用cl100k_base编码。")
-        encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = get_encoding(model)
     if model == "gpt-3.5-turbo":
         # !Note: gpt-3.5-turbo may change over time.
         # Returning num tokens assuming gpt-3.5-turbo-0301.")
@@ -61,6 +80,28 @@ def count_message_tokens(
     return num_tokens
 
 
+def count_history_message_tokens(message: Message, model: str) -> int:
+    """
+    Returns the number of tokens used by a message of the history on its own.
+
+    The count is memoized by model and message content, so each history message is
+    only tokenized once, however often the context is rebuilt.
+
+    Args:
+        message (dict): The message, with its role and content.
+        model (str): The name of the model to use for tokenization.
+
+    Returns:
+        int: The number of tokens used by the message alone.
+    """
+    key = (model, *message.items())
+    num_tokens = _history_token_counts.get(key)
+    if num_tokens is None:
+        num_tokens = count_message_tokens([message], model)
+        _history_token_counts[key] = num_tokens
+    return num_tokens
+
+
 def count_string_tokens(string: str, model_name: str) -> int:
     """
     Returns the number of tokens in a text string.
@@ -72,5 +113,5 @@ def count_string_tokens(string: str, model_name: str) -> int:
     Returns:
         int: The number of tokens in the text string.
     """
-    encoding = tiktoken.encoding_for_model(model_name)
+    encoding = get_encoding(model_name)
     return len(encoding.encode(string))
@@ -1,10 +1,11 @@
 from autogpt.logs import logger
 from autogpt.memory.local import LocalCache
+from autogpt.memory.local_ivf import LocalIVFCache
 from autogpt.memory.no_memory import NoMemory
 
 # List of supported memory backends
 # Add a backend to this list if the import attempt is successful
-supported_memory = ["local", "no_memory"]
+supported_memory = ["local", "local_ivf", "no_memory"]
 
 try:
     from autogpt.memory.redismem import RedisMemory
@@ -71,6 +72,10 @@ def get_memory(cfg, init=False):
             )
         else:
             memory = MilvusMemory(cfg)
+    elif cfg.memory_backend == "local_ivf":
+        memory = LocalIVFCache(cfg)
+        if init:
+            memory.clear()
     elif cfg.memory_backend == "no_memory":
         memory = NoMemory(cfg)
 
@@ -88,6 +93,7 @@ def get_supported_memory_backends():
 __all__ = [
     "get_memory",
     "LocalCache",
+    "LocalIVFCache",
     "RedisMemory",
     "PineconeMemory",
     "NoMemory",
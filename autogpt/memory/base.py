@@ -10,6 +10,11 @@ class MemoryProviderSingleton(AbstractSingleton):
         """Adds to memory"""
         pass
 
+    def add_many(self, texts, embeddings=None):
+        """Adds several texts to memory, optionally with their precomputed
+        embeddings"""
+        return [self.add(text) for text in texts]
+
     @abc.abstractmethod
     def get(self, data):
         """Gets from memory"""
@@ -25,6 +30,10 @@ class MemoryProviderSingleton(AbstractSingleton):
         """Gets relevant memory for"""
         pass
 
+    def get_relevant_many(self, texts, num_relevant=5):
+        """Gets relevant memory for each of the given texts"""
+        return [self.get_relevant(text, num_relevant) for text in texts]
+
     @abc.abstractmethod
     def get_stats(self):
         """Get stats from memory"""
@@ -1,17 +1,24 @@
 from __future__ import annotations
 
 import dataclasses
+import os
 from pathlib import Path
 from typing import Any, List
 
 import numpy as np
 import orjson
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
+from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
 EMBED_DIM = 1536
 SAVE_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS
+VECTOR_DTYPE = np.float32
+VECTOR_ROW_BYTES = EMBED_DIM * np.dtype(VECTOR_DTYPE).itemsize
+
+
+MIN_EMBEDDINGS_CAPACITY = 16
 
 
 def create_default_embeddings():
@@ -20,14 +27,76 @@ def create_default_embeddings():
 
 @dataclasses.dataclass
 class CacheContent:
+    """The texts and their embeddings.
+
+    Embeddings live in a preallocated buffer whose capacity doubles when it is full,
+    so appending rows is amortized O(1). Only the first `num_embeddings` rows of the
+    buffer are populated.
+    """
+
     texts: List[str] = dataclasses.field(default_factory=list)
-    embeddings: np.ndarray = dataclasses.field(
+    embeddings_buffer: np.ndarray = dataclasses.field(
         default_factory=create_default_embeddings
     )
+    num_embeddings: int = 0
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """A view of the populated rows of the embeddings buffer."""
+        return self.embeddings_buffer[: self.num_embeddings]
+
+    def append_embeddings(self, vectors: np.ndarray) -> None:
+        """Append rows to the embeddings, growing the buffer if needed.
+
+        Args:
+            vectors: An array of shape (n, EMBED_DIM)
+        """
+        required = self.num_embeddings + len(vectors)
+        capacity = len(self.embeddings_buffer)
+        if required > capacity:
+            new_capacity = max(required, 2 * capacity, MIN_EMBEDDINGS_CAPACITY)
+            buffer = np.empty((new_capacity, EMBED_DIM), dtype=VECTOR_DTYPE)
+            buffer[: self.num_embeddings] = self.embeddings
+            self.embeddings_buffer = buffer
+        self.embeddings_buffer[self.num_embeddings : required] = vectors
+        self.num_embeddings = required
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Get the indices of the k highest scores along the last axis, best first.
+
+    Only the k winners are sorted; they are selected with np.argpartition, which is
+    O(N) instead of the O(N log N) of a full sort.
+
+    Args:
+        scores: An array of shape (..., N)
+        k: The number of indices to return per row
+
+    Returns: An array of shape (..., min(k, N))
+    """
+    num_scores = scores.shape[-1]
+    k = max(min(k, num_scores), 0)
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k < num_scores:
+        candidates = np.argpartition(scores, num_scores - k, axis=-1)
+        candidates = candidates[..., num_scores - k :]
+    else:
+        candidates = np.broadcast_to(np.arange(num_scores), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
 
 
 class LocalCache(MemoryProviderSingleton):
-    """A class that stores the memory in a local file"""
+    """A class that stores the memory in local append-only files
+
+    Embeddings are stored as raw float32 rows in `{memory_index}.vectors` and the
+    texts as one JSON string per line in `{memory_index}.texts`, so adding a memory
+    only appends to both files. A text line is written after its vector, which makes
+    it the commit record: on startup, rows without a matching text (or a truncated
+    last line) are dropped and the files are compacted.
+    """
 
     def __init__(self, cfg) -> None:
         """Initialize a class instance
@@ -40,14 +109,109 @@ class LocalCache(MemoryProviderSingleton):
         """
         workspace_path = Path(cfg.workspace_path)
         self.filename = workspace_path / f"{cfg.memory_index}.json"
+        self.vectors_filename = workspace_path / f"{cfg.memory_index}.vectors"
+        self.texts_filename = workspace_path / f"{cfg.memory_index}.texts"
 
         self.filename.touch(exist_ok=True)
+        self.vectors_filename.touch(exist_ok=True)
+        self.texts_filename.touch(exist_ok=True)
 
-        file_content = b"{}"
-        with self.filename.open("w+b") as f:
-            f.write(file_content)
+        self.data, needs_compaction = self._load()
 
-        self.data = CacheContent()
+        legacy_data = self._load_legacy_json()
+        if legacy_data.texts:
+            self.data.texts.extend(legacy_data.texts)
+            self.data.append_embeddings(legacy_data.embeddings)
+            needs_compaction = True
+
+        if needs_compaction:
+            self.compact()
+
+        # The JSON file only remains as a marker for the memory index; its content
+        # has been migrated to the append-only files above.
+        with self.filename.open("wb") as f:
+            f.write(b"{}")
+
+    def _load(self) -> tuple[CacheContent, bool]:
+        """Read back the memories persisted by earlier runs.
+
+        Returns:
+            The loaded cache content and whether the files need to be compacted
+            because they contain a torn tail.
+        """
+        texts = []
+        torn = False
+        with self.texts_filename.open("rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    torn = True
+                    break
+                try:
+                    texts.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    torn = True
+                    break
+
+        vectors_size = self.vectors_filename.stat().st_size
+        num_rows = vectors_size // VECTOR_ROW_BYTES
+        num_entries = min(len(texts), num_rows)
+        if vectors_size != num_entries * VECTOR_ROW_BYTES or len(texts) != num_entries:
+            torn = True
+
+        content = CacheContent(texts=texts[:num_entries])
+        if num_entries:
+            content.append_embeddings(
+                np.memmap(
+                    self.vectors_filename,
+                    dtype=VECTOR_DTYPE,
+                    mode="r",
+                    shape=(num_entries, EMBED_DIM),
+                )
+            )
+
+        if torn:
+            logger.warn(
+                f"Local memory files for '{self.filename.stem}' are inconsistent, "
+                f"keeping the first {num_entries} entries."
+            )
+        return content, torn
+
+    def _load_legacy_json(self) -> CacheContent:
+        """Read memories stored in the JSON format used by earlier versions."""
+        try:
+            raw_data = orjson.loads(self.filename.read_bytes())
+        except orjson.JSONDecodeError:
+            return CacheContent()
+        if not isinstance(raw_data, dict):
+            return CacheContent()
+
+        texts = raw_data.get("texts", [])
+        embeddings = np.array(
+            raw_data.get("embeddings", []), dtype=VECTOR_DTYPE
+        ).reshape(-1, EMBED_DIM)
+        if len(texts) != len(embeddings):
+            logger.warn(
+                f"Ignoring '{self.filename}': it contains {len(texts)} texts but "
+                f"{len(embeddings)} embeddings."
+            )
+            return CacheContent()
+        content = CacheContent(texts=texts)
+        content.append_embeddings(embeddings)
+        return content
+
+    def compact(self) -> None:
+        """Rewrite the backing files so that they only contain the current data."""
+        vectors_tmp = self.vectors_filename.with_suffix(".vectors.tmp")
+        texts_tmp = self.texts_filename.with_suffix(".texts.tmp")
+
+        with vectors_tmp.open("wb") as f:
+            f.write(self.data.embeddings.astype(VECTOR_DTYPE).tobytes())
+        with texts_tmp.open("wb") as f:
+            for text in self.data.texts:
+                f.write(orjson.dumps(text) + b"\n")
+
+        os.replace(vectors_tmp, self.vectors_filename)
+        os.replace(texts_tmp, self.texts_filename)
 
     def add(self, text: str):
         """
@@ -61,32 +225,58 @@ class LocalCache(MemoryProviderSingleton):
         """
         if "Command Error:" in text:
             return ""
-        self.data.texts.append(text)
-
         embedding = get_ada_embedding(text)
-
-        vector = np.array(embedding).astype(np.float32)
-        vector = vector[np.newaxis, :]
-        self.data.embeddings = np.concatenate(
-            [
-                self.data.embeddings,
-                vector,
-            ],
-            axis=0,
-        )
-
-        with open(self.filename, "wb") as f:
-            out = orjson.dumps(self.data, option=SAVE_OPTIONS)
-            f.write(out)
+        self._append([text], np.array([embedding], dtype=VECTOR_DTYPE))
         return text
 
+    def add_many(
+        self, texts: list[str], embeddings: list[list[float]] | None = None
+    ) -> list[str]:
+        """
+        Add several texts at once: their embeddings are requested in batches and
+            appended to the embeddings-matrix, and to the backing files, together.
+
+        Args:
+            texts: List[str]
+            embeddings: List[List[float]], the embeddings of the texts, if they
+                have already been computed
+
+        Returns: List[str], the added texts ("" for the texts that were skipped)
+        """
+        if embeddings is None:
+            embeddings = [None] * len(texts)
+        added = [
+            (text, embedding)
+            for text, embedding in zip(texts, embeddings)
+            if "Command Error:" not in text
+        ]
+        if added:
+            added_texts = [text for text, _ in added]
+            if added[0][1] is None:
+                vectors = get_ada_embeddings(added_texts)
+            else:
+                vectors = [embedding for _, embedding in added]
+            self._append(added_texts, np.array(vectors, dtype=VECTOR_DTYPE))
+        return ["" if "Command Error:" in text else text for text in texts]
+
+    def _append(self, texts: list[str], vectors: np.ndarray) -> None:
+        """Append texts and their embeddings to the memory and the backing files."""
+        self.data.texts.extend(texts)
+        self.data.append_embeddings(vectors)
+
+        with self.vectors_filename.open("ab") as f:
+            f.write(vectors.tobytes())
+        with self.texts_filename.open("ab") as f:
+            f.write(b"".join(orjson.dumps(text) + b"\n" for text in texts))
+
     def clear(self) -> str:
         """
-        Clears the data in memory.
+        Clears the data in memory and in the backing files.
 
         Returns: A message indicating that the memory has been cleared.
         """
         self.data = CacheContent()
+        self.compact()
         return "Obliviated"
 
     def get(self, data: str) -> list[Any] | None:
@@ -111,13 +301,41 @@ class LocalCache(MemoryProviderSingleton):
 
         Returns: List[str]
         """
-        embedding = get_ada_embedding(text)
+        query = np.array([get_ada_embedding(text)], dtype=VECTOR_DTYPE)
+        return [self.data.texts[i] for i in self._search(query, k)[0]]
+
+    def get_relevant_many(self, texts: list[str], k: int) -> list[list[Any]]:
+        """
+        Like get_relevant, for several texts at once: the queries are embedded in
+        batches, and the scores for all of them are computed with a single
+        matrix-matrix product.
 
-        scores = np.dot(self.data.embeddings, embedding)
+        Args:
+            texts: List[str]
+            k: int
+
+        Returns: List[List[str]], the relevant texts for each of the given texts
+        """
+        if not texts:
+            return []
+        queries = np.array(get_ada_embeddings(texts), dtype=VECTOR_DTYPE)
 
-        top_k_indices = np.argsort(scores)[-k:][::-1]
+        return [
+            [self.data.texts[i] for i in indices]
+            for indices in self._search(queries, k)
+        ]
 
-        return [self.data.texts[i] for i in top_k_indices]
+    def _search(self, queries: np.ndarray, k: int) -> list[np.ndarray]:
+        """Find the rows with the highest scores for each query.
+
+        Args:
+            queries: An array of shape (num_queries, EMBED_DIM)
+            k: The number of rows to return per query
+
+        Returns: The indices of the best rows for each query, best first
+        """
+        scores = queries @ self.data.embeddings.T
+        return list(top_k_indices(scores, k))
 
     def get_stats(self) -> tuple[int, tuple[int, ...]]:
         """
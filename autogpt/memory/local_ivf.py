@@ -0,0 +1,210 @@
+"""Local memory provider with an approximate nearest-neighbour (IVF) index."""
+
+from __future__ import annotations
+
+import itertools
+import os
+from typing import Any
+
+import numpy as np
+
+from autogpt.logs import logger
+from autogpt.memory.local import VECTOR_DTYPE, LocalCache, top_k_indices
+
+KMEANS_ITERATIONS = 10
+# Cap on the number of training vectors per centroid when running k-means
+KMEANS_SAMPLES_PER_CENTROID = 32
+# Number of rows assigned to centroids per matrix product, to bound memory usage
+ASSIGNMENT_BLOCK_SIZE = 4096
+
+
+def train_centroids(
+    vectors: np.ndarray, num_centroids: int, seed: int = 0
+) -> np.ndarray:
+    """Run spherical k-means on the given vectors.
+
+    Args:
+        vectors: An array of shape (n, dim) of normalized vectors
+        num_centroids: The number of centroids to find, at most n
+
+    Returns: The normalized centroids, an array of shape (num_centroids, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), num_centroids, replace=False)]
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = assign_to_centroids(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        clusters, starts = np.unique(assignments[order], return_index=True)
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their previous centroid
+        centroids = centroids.copy()
+        centroids[clusters] = sums / np.maximum(norms, np.finfo(VECTOR_DTYPE).tiny)
+    return centroids
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Get the index of the nearest centroid for each of the given vectors."""
+    assignments = np.empty(len(vectors), dtype=np.intp)
+    for start in range(0, len(vectors), ASSIGNMENT_BLOCK_SIZE):
+        block = vectors[start : start + ASSIGNMENT_BLOCK_SIZE]
+        assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+class LocalIVFCache(LocalCache):
+    """A LocalCache that searches an inverted file (IVF) index
+
+    The embeddings are clustered with k-means; each cluster keeps an inverted list
+    of the rows assigned to it. A query is only scored against the rows of the
+    `memory_ivf_nprobe` clusters whose centroids are closest to it: raising nprobe
+    improves recall at the cost of latency.
+
+    Until the memory holds `min_train_size` rows, queries are answered by brute
+    force. The index is retrained whenever the memory has doubled in size since the
+    last training; rows added in between are assigned to the nearest existing
+    centroid. Centroids and assignments are persisted in `{memory_index}.ivf.npz`.
+    """
+
+    min_train_size = 10_000
+
+    def __init__(self, cfg) -> None:
+        """Initialize a class instance
+
+        Args:
+            cfg: Config object
+
+        Returns:
+            None
+        """
+        self.nlist = cfg.memory_ivf_nlist
+        self.nprobe = cfg.memory_ivf_nprobe
+        super().__init__(cfg)
+        self.index_filename = self.filename.with_suffix(".ivf.npz")
+
+        self._reset_index()
+        self._load_index()
+        if self.centroids is None:
+            self._maybe_train()
+
+    def _reset_index(self) -> None:
+        self.centroids: np.ndarray | None = None
+        self.inverted_lists: list[list[int]] = []
+        self.num_trained = 0
+
+    def _load_index(self) -> None:
+        """Read back the persisted index, assigning rows it does not cover yet."""
+        if not self.index_filename.exists():
+            return
+        try:
+            with np.load(self.index_filename) as index:
+                centroids = index["centroids"]
+                assignments = index["assignments"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warn(f"Ignoring invalid IVF index '{self.index_filename}': {e}")
+            return
+
+        num_rows = self.data.num_embeddings
+        if centroids.shape[1:] != self.data.embeddings.shape[1:]:
+            logger.warn(f"Ignoring IVF index '{self.index_filename}': wrong dimension")
+            return
+        assignments = assignments[:num_rows]
+
+        self.centroids = centroids
+        self.num_trained = len(assignments)
+        self.inverted_lists = [[] for _ in range(len(centroids))]
+        for row, cluster in enumerate(assignments.tolist()):
+            self.inverted_lists[cluster].append(row)
+        self._assign_rows(len(assignments), num_rows)
+
+    def _save_index(self) -> None:
+        assignments = np.empty(self.data.num_embeddings, dtype=np.int32)
+        for cluster, rows in enumerate(self.inverted_lists):
+            assignments[rows] = cluster
+
+        tmp_filename = self.index_filename.with_suffix(".tmp.npz")
+        np.savez(tmp_filename, centroids=self.centroids, assignments=assignments)
+        os.replace(tmp_filename, self.index_filename)
+
+    def _maybe_train(self) -> None:
+        """Train the index if the memory has grown enough since the last training."""
+        num_rows = self.data.num_embeddings
+        if num_rows < max(self.min_train_size, 2 * self.num_trained):
+            return
+
+        num_centroids = self.nlist or int(np.sqrt(num_rows))
+        num_centroids = max(1, min(num_centroids, num_rows))
+        logger.debug(
+            f"Training IVF index with {num_centroids} lists on {num_rows} rows"
+        )
+
+        sample_size = min(num_rows, num_centroids * KMEANS_SAMPLES_PER_CENTROID)
+        sample = self.data.embeddings[
+            np.random.default_rng(num_rows).choice(num_rows, sample_size, replace=False)
+        ]
+        self.centroids = train_centroids(sample, num_centroids)
+        self.inverted_lists = [[] for _ in range(num_centroids)]
+        self.num_trained = num_rows
+        self._assign_rows(0, num_rows)
+        self._save_index()
+
+    def _assign_rows(self, start: int, stop: int) -> None:
+        """Add the rows in [start, stop) to the inverted lists."""
+        if self.centroids is None or start >= stop:
+            return
+        assignments = assign_to_centroids(
+            self.data.embeddings[start:stop], self.centroids
+        )
+        for row, cluster in enumerate(assignments.tolist(), start=start):
+            self.inverted_lists[cluster].append(row)
+
+    def _append(self, texts: list[str], vectors: np.ndarray) -> None:
+        """Append texts and their embeddings, and add them to the IVF index."""
+        num_rows = self.data.num_embeddings
+        super()._append(texts, vectors)
+        self._assign_rows(num_rows, self.data.num_embeddings)
+        self._maybe_train()
+
+    def clear(self) -> str:
+        """
+        Clears the data in memory, the backing files and the index.
+
+        Returns: A message indicating that the memory has been cleared.
+        """
+        self._reset_index()
+        self.index_filename.unlink(missing_ok=True)
+        return super().clear()
+
+    def _search(self, queries: np.ndarray, k: int) -> list[np.ndarray]:
+        """Find the rows with the highest scores in the probed inverted lists."""
+        if self.centroids is None:
+            return super()._search(queries, k)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+        results = []
+        for query, clusters in zip(queries, probes):
+            candidates = np.fromiter(
+                itertools.chain.from_iterable(
+                    self.inverted_lists[cluster] for cluster in clusters
+                ),
+                dtype=np.intp,
+            )
+            if len(candidates) < k:
+                # Too few rows in the probed lists, fall back to an exact search
+                results.extend(super()._search(query[np.newaxis, :], k))
+                continue
+            scores = self.data.embeddings[candidates] @ query
+            results.append(candidates[top_k_indices(scores, k)])
+        return results
+
+    def get_index_stats(self) -> dict[str, Any]:
+        """
+        Returns: The stats of the IVF index.
+        """
+        return {
+            "trained": self.centroids is not None,
+            "lists": len(self.inverted_lists),
+            "nprobe": self.nprobe,
+            "trained_rows": self.num_trained,
+        }
@@ -4,7 +4,7 @@ import re
 from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, connections
 
 from autogpt.config import Config
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.memory.base import MemoryProviderSingleton
 
 
@@ -107,6 +107,27 @@ class MilvusMemory(MemoryProviderSingleton):
         )
         return _text
 
+    def add_many(self, texts, embeddings=None) -> list[str]:
+        """Add the embeddings of several texts into memory, with a single insert.
+
+        Args:
+            texts (list[str]): The raw texts to construct embedding indexes.
+            embeddings (list[list[float]], optional): The embeddings of the texts,
+                if they have already been computed.
+
+        Returns:
+            list[str]: logs.
+        """
+        if not texts:
+            return []
+        if embeddings is None:
+            embeddings = get_ada_embeddings(texts)
+        result = self.collection.insert([embeddings, texts])
+        return [
+            f"Inserting data into memory at primary key: {primary_key}:\n data: {data}"
+            for primary_key, data in zip(result.primary_keys, texts)
+        ]
+
     def get(self, data):
         """Return the most relevant data in memory.
         Args:
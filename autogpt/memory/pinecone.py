@@ -1,10 +1,13 @@
 import pinecone
 from colorama import Fore, Style
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
+# Pinecone recommends upserting at most 100 vectors per request
+UPSERT_BATCH_SIZE = 100
+
 
 class PineconeMemory(MemoryProviderSingleton):
     def __init__(self, cfg):
@@ -54,6 +57,29 @@ class PineconeMemory(MemoryProviderSingleton):
         self.vec_num += 1
         return _text
 
+    def add_many(self, texts, embeddings=None):
+        """
+        Adds several data points to the memory, with batched upserts.
+
+        Args:
+            texts: The data to add.
+            embeddings: The embeddings of the data, if already computed.
+
+        Returns: Messages indicating that the data has been added.
+        """
+        vectors = embeddings if embeddings is not None else get_ada_embeddings(texts)
+        items = []
+        messages = []
+        for data, vector in zip(texts, vectors):
+            items.append((str(self.vec_num), vector, {"raw_text": data}))
+            messages.append(
+                f"Inserting data into memory at index: {self.vec_num}:\n data: {data}"
+            )
+            self.vec_num += 1
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            self.index.upsert(items[start : start + UPSERT_BATCH_SIZE])
+        return messages
+
     def get(self, data):
         return self.get_relevant(data, 1)
 
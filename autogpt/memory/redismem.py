@@ -10,7 +10,7 @@ from redis.commands.search.field import TextField, VectorField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
@@ -101,6 +101,48 @@ class RedisMemory(MemoryProviderSingleton):
         pipe.execute()
         return _text
 
+    def add_many(
+        self, texts: list[str], embeddings: list[list[float]] | None = None
+    ) -> list[str]:
+        """
+        Adds several data points to the memory, with a single pipeline.
+
+        Args:
+            texts: The data to add.
+            embeddings: The embeddings of the data, if already computed.
+
+        Returns: Messages indicating that the data has been added.
+        """
+        added_texts = [data for data in texts if "Command Error:" not in data]
+        if embeddings is None:
+            embeddings = get_ada_embeddings(added_texts) if added_texts else []
+        else:
+            embeddings = [
+                embedding
+                for data, embedding in zip(texts, embeddings)
+                if "Command Error:" not in data
+            ]
+        vectors = iter(embeddings)
+
+        messages = []
+        pipe = self.redis.pipeline()
+        for data in texts:
+            if "Command Error:" in data:
+                messages.append("")
+                continue
+            vector = np.array(next(vectors)).astype(np.float32).tobytes()
+            data_dict = {b"data": data, "embedding": vector}
+            pipe.hset(f"{self.cfg.memory_index}:{self.vec_num}", mapping=data_dict)
+            messages.append(
+                f"Inserting data into memory at index: {self.vec_num}:\n"
+                f"data: {data}"
+            )
+            self.vec_num += 1
+        if added_texts:
+            pipe.set(f"{self.cfg.memory_index}-vec_num", self.vec_num)
+            pipe.execute()
+        return messages
+
     def get(self, data: str) -> list[Any] | None:
         """
         Gets the data from the memory that is most relevant to the given data.
@@ -3,7 +3,7 @@ from weaviate import Client
 from weaviate.embedded import EmbeddedOptions
 from weaviate.util import generate_uuid5
 
-from autogpt.llm import get_ada_embedding
+from autogpt.llm import get_ada_embedding, get_ada_embeddings
 from autogpt.logs import logger
 from autogpt.memory.base import MemoryProviderSingleton
 
@@ -86,6 +86,34 @@ class WeaviateMemory(MemoryProviderSingleton):
 
         return f"Inserting data into memory at uuid: {doc_uuid}:\n data: {data}"
 
+    def add_many(self, texts, embeddings=None):
+        """
+        Adds several data points to the memory, with a single batch.
+
+        Args:
+            texts: The data to add.
+            embeddings: The embeddings of the data, if already computed.
+
+        Returns: Messages indicating that the data has been added.
+        """
+        vectors = embeddings if embeddings is not None else get_ada_embeddings(texts)
+        messages = []
+
+        with self.client.batch as batch:
+            for data, vector in zip(texts, vectors):
+                doc_uuid = generate_uuid5(data, self.index)
+                batch.add_data_object(
+                    uuid=doc_uuid,
+                    data_object={"raw_text": data},
+                    class_name=self.index,
+                    vector=vector,
+                )
+                messages.append(
+                    f"Inserting data into memory at uuid: {doc_uuid}:\n data: {data}"
+                )
+
+        return messages
+
     def get(self, data):
         return self.get_relevant(data, 1)
 
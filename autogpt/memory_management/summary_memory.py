@@ -1,52 +1,57 @@
+from __future__ import annotations
+
+import atexit
 import copy
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Tuple
 
 from autogpt.config import Config
 from autogpt.llm.llm_utils import create_chat_completion
+from autogpt.llm.rate_limiter import Priority
+from autogpt.logs import logger
 
 cfg = Config()
 
 
 def get_newly_trimmed_messages(
     full_message_history: List[Dict[str, str]],
-    current_context: List[Dict[str, str]],
+    context_start_index: int,
     last_memory_index: int,
 ) -> Tuple[List[Dict[str, str]], int]:
     """
     This function returns a list of dictionaries contained in full_message_history
-    with an index higher than prev_index that are absent from current_context.
+    with an index higher than prev_index that have been trimmed from the current
+    context.
+
+    The current context holds the messages of full_message_history from
+    context_start_index onwards, so the trimmed messages are the ones in between.
 
     Args:
         full_message_history (list): A list of dictionaries representing the full message history.
-        current_context (list): A list of dictionaries representing the current context.
+        context_start_index (int): The index of the first message of full_message_history in the current context.
         last_memory_index (int): An integer representing the previous index.
 
     Returns:
         list: A list of dictionaries that are in full_message_history with an index higher than last_memory_index and absent from current_context.
         int: The new index value for use in the next loop.
     """
-    # Select messages in full_message_history with an index higher than last_memory_index
-    new_messages = [
-        msg for i, msg in enumerate(full_message_history) if i > last_memory_index
-    ]
-
-    # Remove messages that are already present in current_context
-    new_messages_not_in_context = [
-        msg for msg in new_messages if msg not in current_context
+    new_messages_not_in_context = full_message_history[
+        last_memory_index + 1 : context_start_index
     ]
 
     # Find the index of the last message processed
     new_index = last_memory_index
     if new_messages_not_in_context:
-        last_message = new_messages_not_in_context[-1]
-        new_index = full_message_history.index(last_message)
+        new_index = context_start_index - 1
 
     return new_messages_not_in_context, new_index
 
 
 def update_running_summary(
-    current_memory: str, new_events: List[Dict[str, str]]
+    current_memory: str,
+    new_events: List[Dict[str, str]],
+    priority: Priority = Priority.AGENT,
 ) -> str:
     """
     This function takes a list of dictionaries representing new events and combines them with the current summary,
@@ -55,6 +60,7 @@ def update_running_summary(
 
     Args:
         new_events (List[Dict]): A list of dictionaries containing the latest events to be added to the summary.
+        priority (Priority): The scheduling priority of the completion request.
 
     Returns:
         str: A message containing the updated summary of actions, formatted in the 1st person past tense.
@@ -111,11 +117,90 @@ Latest Development:
         }
     ]
 
-    current_memory = create_chat_completion(messages, cfg.fast_llm_model)
+    current_memory = create_chat_completion(
+        messages, cfg.fast_llm_model, priority=priority, cache=True
+    )
+
+    return create_summary_message(current_memory)
+
+
+def create_summary_message(summary: str | Dict[str, str]) -> Dict[str, str]:
+    """
+    Wrap a summary in the message that is inserted in the context.
+
+    Args:
+        summary: The summary, or an already wrapped summary message.
 
-    message_to_return = {
+    Returns:
+        dict: The summary message.
+    """
+    if isinstance(summary, dict):
+        return summary
+    return {
         "role": "system",
-        "content": f"This reminds you of these events from your past: \n{current_memory}",
+        "content": f"This reminds you of these events from your past: \n{summary}",
     }
 
-    return message_to_return
+
+class BackgroundSummaryUpdater:
+    """Updates the running summary on a background thread.
+
+    Instead of waiting for update_running_summary() before each step, the context
+    uses the last summary that has been completed, and the new events are folded
+    into it in the background. Events trimmed while an update is running are
+    queued for the next one, so none are lost, but the summary lags behind the
+    context by up to one update.
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="summary-memory"
+        )
+        self._future: Future | None = None
+        self._pending_events: List[Dict[str, str]] = []
+        self._running_events: List[Dict[str, str]] = []
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        """Stop the background thread, without waiting for the update in progress."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def update(
+        self, current_memory: str | Dict[str, str], new_events: List[Dict[str, str]]
+    ) -> Dict[str, str]:
+        """
+        Queue new events to be summarized and get the latest completed summary.
+
+        Args:
+            current_memory: The summary currently used in the context.
+            new_events (List[Dict]): The events trimmed from the context since the
+                last call.
+
+        Returns:
+            dict: The latest completed summary message.
+        """
+        self._pending_events.extend(new_events)
+
+        if self._future is not None:
+            if not self._future.done():
+                return create_summary_message(current_memory)
+            future, self._future = self._future, None
+            # The chat completion quits on some API errors, which must not stop
+            # the agent from a background update
+            try:
+                current_memory = future.result()
+            except (Exception, SystemExit) as e:
+                logger.warn(f"Failed to update the running summary: {e}")
+                self._pending_events[:0] = self._running_events
+            self._running_events = []
+
+        if self._pending_events:
+            self._running_events, self._pending_events = self._pending_events, []
+            self._future = self._executor.submit(
+                update_running_summary,
+                current_memory=current_memory,
+                new_events=self._running_events,
+                priority=Priority.BACKGROUND,
+            )
+
+        return create_summary_message(current_memory)
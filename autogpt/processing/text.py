@@ -1,28 +1,61 @@
 """Text processing functions"""
-from typing import Dict, Generator, Optional
+import asyncio
+import functools
+from typing import Dict, Generator, Iterable, Iterator, List, Optional
 
 import spacy
 from selenium.webdriver.remote.webdriver import WebDriver
 
 from autogpt.config import Config
-from autogpt.llm import count_message_tokens, create_chat_completion
+from autogpt.llm import (
+    acreate_chat_completion,
+    count_message_tokens,
+    count_string_tokens,
+    openai_aiosession,
+)
 from autogpt.logs import logger
 from autogpt.memory import get_memory
 
 CFG = Config()
 
 
+# Maximum number of characters parsed at once when streaming sentences
+STREAM_BLOCK_SIZE = 10_000
+
+
+@functools.lru_cache(maxsize=None)
+def get_spacy_pipeline(model_name: str) -> spacy.Language:
+    """Load a spaCy pipeline with a sentencizer, once per process
+
+    Args:
+        model_name (str): The name of the spaCy language model
+
+    Returns:
+        spacy.Language: The pipeline
+    """
+    nlp = spacy.load(model_name)
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
 def split_text(
     text: str,
     max_length: int = CFG.browse_chunk_max_length,
     model: str = CFG.fast_llm_model,
     question: str = "",
+    stream: bool = False,
 ) -> Generator[str, None, None]:
     """Split text into chunks of a maximum length
 
+    The tokens of each sentence are counted once, and the length of the current
+    chunk is kept as a running total.
+
     Args:
         text (str): The text to split
         max_length (int, optional): The maximum length of each chunk. Defaults to 8192.
+        stream (bool, optional): Parse the text in blocks of lines, so that chunks
+            are yielded while the rest of the text is still being parsed. Sentences
+            then never span two blocks. Defaults to False.
 
     Yields:
         str: The next chunk of text
@@ -30,44 +63,65 @@ def split_text(
     Raises:
         ValueError: If the text is longer than the maximum length
     """
-    flatened_paragraphs = " ".join(text.split("\n"))
-    nlp = spacy.load(CFG.browse_spacy_language_model)
-    nlp.add_pipe("sentencizer")
-    doc = nlp(flatened_paragraphs)
-    sentences = [sent.text.strip() for sent in doc.sents]
+    message_overhead = (
+        count_message_tokens(messages=[create_message("", question)], model=model) + 1
+    )
 
     current_chunk = []
+    current_chunk_length = message_overhead
 
-    for sentence in sentences:
-        message_with_additional_sentence = [
-            create_message(" ".join(current_chunk) + " " + sentence, question)
-        ]
-
-        expected_token_usage = (
-            count_message_tokens(messages=message_with_additional_sentence, model=model)
-            + 1
-        )
-        if expected_token_usage <= max_length:
+    for sentence in _iter_sentences(text, stream):
+        # Sentences are joined with a space, which is merged into their first token
+        sentence_length = count_string_tokens(" " + sentence, model)
+        if current_chunk_length + sentence_length <= max_length:
             current_chunk.append(sentence)
+            current_chunk_length += sentence_length
         else:
-            yield " ".join(current_chunk)
+            if current_chunk:
+                yield " ".join(current_chunk)
             current_chunk = [sentence]
-            message_this_sentence_only = [
-                create_message(" ".join(current_chunk), question)
-            ]
-            expected_token_usage = (
-                count_message_tokens(messages=message_this_sentence_only, model=model)
-                + 1
-            )
-            if expected_token_usage > max_length:
+            current_chunk_length = message_overhead + sentence_length
+            if current_chunk_length > max_length:
                 raise ValueError(
-                    f"Sentence is too long in webpage: {expected_token_usage} tokens."
+                    f"Sentence is too long in webpage: {current_chunk_length} tokens."
                 )
 
     if current_chunk:
         yield " ".join(current_chunk)
 
 
+def _iter_sentences(text: str, stream: bool) -> Iterator[str]:
+    """Split text into sentences with the configured spaCy pipeline."""
+    nlp = get_spacy_pipeline(CFG.browse_spacy_language_model)
+    if stream:
+        # Blocks are large enough to be parsed one by one, without waiting for a
+        # whole batch of them
+        docs = nlp.pipe(_iter_text_blocks(text, STREAM_BLOCK_SIZE), batch_size=1)
+    else:
+        flatened_paragraphs = " ".join(text.split("\n"))
+        docs = [nlp(flatened_paragraphs)]
+    for doc in docs:
+        for sent in doc.sents:
+            sentence = sent.text.strip()
+            if sentence:
+                yield sentence
+
+
+def _iter_text_blocks(text: str, block_size: int) -> Iterator[str]:
+    """Join the lines of a text into blocks of about block_size characters."""
+    block = []
+    block_length = 0
+    for line in text.split("\n"):
+        if block and block_length + len(line) > block_size:
+            yield " ".join(block)
+            block = []
+            block_length = 0
+        block.append(line)
+        block_length += len(line) + 1
+    if block:
+        yield " ".join(block)
+
+
 def summarize_text(
     url: str, text: str, question: str, driver: Optional[WebDriver] = None
 ) -> str:
@@ -89,52 +143,250 @@ def summarize_text(
     text_length = len(text)
     logger.info(f"Text length: {text_length} characters")
 
+    return asyncio.run(_summarize_and_reduce(url, text, question, model, driver))
+
+
+async def _summarize_and_reduce(
+    url: str,
+    text: str,
+    question: str,
+    model: str,
+    driver: Optional[WebDriver],
+) -> str:
+    """Summarize the chunks of a text while it is being split, store them in
+    memory, then combine the summaries, in one event loop and connection pool."""
+    chunks = []
+
+    def stream_chunks() -> Iterator[str]:
+        for chunk in split_text(
+            text,
+            max_length=CFG.browse_chunk_max_length,
+            model=model,
+            question=question,
+            stream=True,
+        ):
+            chunks.append(chunk)
+            yield chunk
+
+    async with openai_aiosession(limit=CFG.browse_summary_concurrency):
+        summaries = await summarize_chunks(
+            stream_chunks(), question, model, driver=driver, text_length=len(text)
+        )
+
+        memories_to_add = []
+        for i, (chunk, summary) in enumerate(zip(chunks, summaries)):
+            memories_to_add.append(
+                f"Source: {url}\n" f"Raw content part#{i + 1}: {chunk}"
+            )
+            memories_to_add.append(
+                f"Source: {url}\n" f"Content summary part#{i + 1}: {summary}"
+            )
+
+        logger.info(f"Adding {len(chunks)} chunks and their summaries to memory")
+        get_memory(CFG).add_many(memories_to_add)
+
+        logger.info(f"Summarized {len(chunks)} chunks.")
+
+        return await reduce_summaries(summaries, question, model)
+
+
+async def summarize_chunks(
+    chunks: Iterable[str],
+    question: str,
+    model: str,
+    driver: Optional[WebDriver] = None,
+    text_length: Optional[int] = None,
+) -> List[str]:
+    """Summarize chunks of text concurrently
+
+    At most `browse_summary_concurrency` chunks are summarized at the same time,
+    sharing one connection pool. Rate limited requests are retried with a backoff.
+    The chunks are taken from their iterable in a worker thread, so that the
+    chunks of a streaming split_text are summarized while the next ones are still
+    being parsed.
+
+    Args:
+        chunks (Iterable[str]): The chunks of text to summarize
+        question (str): The question to ask the model
+        model (str): The model to use
+        driver (WebDriver): The webdriver to use to scroll the page
+        text_length (int, optional): The length of the text the chunks are taken
+            from, to scroll the page. Defaults to the length of the chunks, which
+            are then read at once.
+
+    Returns:
+        List[str]: The summaries of the chunks, in the same order
+    """
+    semaphore = asyncio.Semaphore(max(1, CFG.browse_summary_concurrency))
+    if text_length is None:
+        chunks = list(chunks)
+        text_length = sum(len(chunk) for chunk in chunks)
+    chunk_iterator = iter(chunks)
+
+    async def summarize_chunk(i: int, chunk: str, position: int) -> str:
+        async with semaphore:
+            if driver:
+                scroll_to_percentage(driver, min(position / text_length, 1))
+
+            messages = [create_message(chunk, question)]
+            tokens_for_chunk = count_message_tokens(messages, model)
+            logger.info(
+                f"Summarizing chunk {i + 1} of length {len(chunk)} characters, or {tokens_for_chunk} tokens"
+            )
+
+            summary = await acreate_chat_completion(
+                model=model,
+                messages=messages,
+                cache=True,
+            )
+            logger.info(
+                f"Summarized chunk {i + 1}, summary of length {len(summary)} characters"
+            )
+            return summary
+
     summaries = []
-    chunks = list(
-        split_text(
-            text, max_length=CFG.browse_chunk_max_length, model=model, question=question
-        ),
-    )
-    scroll_ratio = 1 / len(chunks)
+    position = 0
+    async with openai_aiosession(limit=CFG.browse_summary_concurrency):
+        try:
+            while chunk := await asyncio.to_thread(next, chunk_iterator, None):
+                summaries.append(
+                    asyncio.create_task(
+                        summarize_chunk(len(summaries), chunk, position)
+                    )
+                )
+                position += len(chunk)
+            return await asyncio.gather(*summaries)
+        finally:
+            for summary in summaries:
+                summary.cancel()
+
+
+async def reduce_summaries(
+    summaries: List[str],
+    question: str,
+    model: str,
+    max_length: Optional[int] = None,
+) -> str:
+    """Combine summaries into one summary, level by level
+
+    The summaries are grouped so that each group fits in a single message of at
+    most `max_length` tokens, and each group is summarized into one summary (a
+    group of one summary is carried over as is). The groups of a level are
+    summarized concurrently, and levels are repeated until
+    all the summaries fit in one message, which gets the final summary. The number
+    of levels, and so the sequential latency, grows logarithmically with the number
+    of summaries.
 
-    for i, chunk in enumerate(chunks):
-        if driver:
-            scroll_to_percentage(driver, scroll_ratio * i)
-        logger.info(f"Adding chunk {i + 1} / {len(chunks)} to memory")
+    Args:
+        summaries (List[str]): The summaries to combine
+        question (str): The question to ask the model
+        model (str): The model to use
+        max_length (int, optional): The maximum number of tokens of a message.
+            Defaults to `browse_chunk_max_length`.
 
-        memory_to_add = f"Source: {url}\n" f"Raw content part#{i + 1}: {chunk}"
+    Returns:
+        str: The combined summary
+    """
+    if max_length is None:
+        max_length = CFG.browse_chunk_max_length
+    semaphore = asyncio.Semaphore(max(1, CFG.browse_summary_concurrency))
+
+    async def summarize_group(group: List[str]) -> str:
+        async with semaphore:
+            return await acreate_chat_completion(
+                model=model,
+                messages=[create_message("\n".join(group), question)],
+                cache=True,
+            )
 
-        memory = get_memory(CFG)
-        memory.add(memory_to_add)
+    async def combine_group(group: List[str]) -> str:
+        if len(group) == 1:
+            # Carry a lone summary over to the next level as is
+            return group[0]
+        return await summarize_group(group)
+
+    async with openai_aiosession(limit=CFG.browse_summary_concurrency):
+        level = 0
+        groups = group_summaries(summaries, question, model, max_length)
+        while len(groups) > 1:
+            level += 1
+            logger.info(
+                f"Combining {len(summaries)} summaries into {len(groups)}, level {level}"
+            )
+            summaries = await asyncio.gather(*map(combine_group, groups))
+            groups = group_summaries(summaries, question, model, max_length)
+        return await summarize_group(groups[0] if groups else [])
 
-        messages = [create_message(chunk, question)]
-        tokens_for_chunk = count_message_tokens(messages, model)
-        logger.info(
-            f"Summarizing chunk {i + 1} / {len(chunks)} of length {len(chunk)} characters, or {tokens_for_chunk} tokens"
-        )
 
-        summary = create_chat_completion(
-            model=model,
-            messages=messages,
-        )
-        summaries.append(summary)
-        logger.info(
-            f"Added chunk {i + 1} summary to memory, of length {len(summary)} characters"
-        )
+def group_summaries(
+    summaries: List[str], question: str, model: str, max_length: int
+) -> List[List[str]]:
+    """Group consecutive summaries so that each group fits in one message
 
-        memory_to_add = f"Source: {url}\n" f"Content summary part#{i + 1}: {summary}"
+    The size of a group is estimated from the token counts of its summaries, each
+    counted once. A summary too long for a message on its own is truncated to fit.
+    If no summaries fit together, they are truncated to half a message and paired,
+    so that every level of reduce_summaries reduces the number of summaries.
 
-        memory.add(memory_to_add)
+    Args:
+        summaries (List[str]): The summaries to group
+        question (str): The question the message asks about the summaries
+        model (str): The model used to count tokens
+        max_length (int): The maximum number of tokens of a message
 
-    logger.info(f"Summarized {len(chunks)} chunks.")
+    Returns:
+        List[List[str]]: The groups of summaries, in order
+    """
+    message_overhead = count_message_tokens([create_message("", question)], model)
 
-    combined_summary = "\n".join(summaries)
-    messages = [create_message(combined_summary, question)]
+    def summary_length(summary: str) -> int:
+        # + 1 for the newline joining the summaries
+        return (
+            count_message_tokens([create_message(summary, question)], model)
+            - message_overhead
+            + 1
+        )
 
-    return create_chat_completion(
-        model=model,
-        messages=messages,
-    )
+    def truncate(summary: str, length: int, budget: int) -> tuple[str, int]:
+        # Nothing fits in a message shorter than its overhead
+        if length <= budget or budget < 1:
+            return summary, length
+        logger.warn(f"Truncating a summary of {length} tokens to {budget} tokens")
+        # The longest prefix that fits, found by bisection
+        low, high = 0, len(summary)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if summary_length(summary[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return summary[:low].rstrip(), budget
+
+    budget = max_length - message_overhead
+    sized_summaries = [
+        truncate(summary, summary_length(summary), budget) for summary in summaries
+    ]
+
+    groups = []
+    group = []
+    group_length = message_overhead
+    for summary, length in sized_summaries:
+        if group and group_length + length > max_length:
+            groups.append(group)
+            group = []
+            group_length = message_overhead
+        group.append(summary)
+        group_length += length
+    if group:
+        groups.append(group)
+
+    if len(groups) > 1 and len(groups) == len(summaries):
+        summaries = [
+            truncate(summary, length, budget // 2)[0]
+            for summary, length in sized_summaries
+        ]
+        groups = [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+    return groups
 
 
 def scroll_to_percentage(driver: WebDriver, ratio: float) -> None:
@@ -0,0 +1,325 @@
+"""
+====================
+Workspace file index
+====================
+
+An in-memory index of the files in a workspace, so that listing them does not walk
+the whole tree on every call.
+
+The index is kept current with inotify where it is available: the pending events
+are read before each query, without a background thread. Elsewhere, or when the
+inotify watch limit is reached, the index polls the modification times of its
+directories before each query, and lists again the ones that changed.
+
+"""
+from __future__ import annotations
+
+import atexit
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import functools
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from autogpt.logs import logger
+
+# inotify event flags, from <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+# A directory modified less than this many nanoseconds before it was listed may
+# change again without its modification time changing, so it is listed again on
+# the next poll
+RACY_INTERVAL_NS = 2_000_000_000
+
+
+@dataclass
+class _Directory:
+    """The listing of a directory of the index."""
+
+    inode: int
+    # -1 if the directory must be listed again on the next poll
+    mtime_ns: int
+    # The names of the files that are not hidden
+    files: Set[str] = field(default_factory=set)
+    # The names and inodes of the subdirectories, without symbolic links
+    subdirs: Dict[str, int] = field(default_factory=dict)
+
+
+class _Inotify:
+    """A minimal non-blocking inotify instance, through the C library."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            inotify_init1 = self._libc.inotify_init1
+        except (OSError, AttributeError, TypeError) as e:
+            raise OSError(errno.ENOSYS, "inotify is not available") from e
+        self.fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self._raise_errno()
+
+    def add_watch(self, path: Path) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            self._raise_errno(path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # Fails if the watch was already removed with its directory
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[tuple[int, int, str]]:
+        """Read the pending events as (watch descriptor, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    @staticmethod
+    def _raise_errno(path: Optional[Path] = None) -> None:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), path)
+
+
+class WorkspaceFileIndex:
+    """An in-memory index of the files under a root directory.
+
+    Hidden files are not indexed, and symbolic links to directories are not
+    followed, like the os.walk listing it replaces.
+    """
+
+    def __init__(self, root: str | Path, use_inotify: bool = True) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._directories: Dict[str, _Directory] = {}
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._directory_watches: Dict[str, int] = {}
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except OSError as e:
+                logger.debug(f"Polling the workspace for changes: {e}")
+        self._scan("")
+
+    @property
+    def watching(self) -> bool:
+        """Whether the index is kept current with inotify rather than polling."""
+        return self._inotify is not None
+
+    def list_files(
+        self,
+        directory: str = "",
+        pattern: Optional[str] = None,
+        max_depth: Optional[int] = None,
+    ) -> List[str]:
+        """List the files under a directory of the index.
+
+        Args:
+            directory (str): The directory, relative to the root of the index.
+            pattern (str, optional): A glob pattern, matched against the paths
+                relative to the directory. `*` also matches `/`.
+            max_depth (int, optional): The number of directory levels to list;
+                1 lists only the files directly in the directory.
+
+        Returns:
+            List[str]: The sorted paths of the files, relative to the root.
+        """
+        directory = os.path.normpath(directory)
+        directory = "" if directory == os.curdir else directory
+        # The length of the prefix to remove to match paths against the pattern
+        prefix_length = len(directory) + 1 if directory else 0
+        with self._lock:
+            self._update()
+            found_files = []
+            stack = [(directory, 1)] if directory in self._directories else []
+            while stack:
+                path, depth = stack.pop()
+                entry = self._directories[path]
+                for name in entry.files:
+                    file_path = os.path.join(path, name)
+                    if pattern and not fnmatch.fnmatch(
+                        file_path[prefix_length:], pattern
+                    ):
+                        continue
+                    found_files.append(file_path)
+                if max_depth is None or depth < max_depth:
+                    stack.extend(
+                        (os.path.join(path, name), depth + 1) for name in entry.subdirs
+                    )
+        return sorted(found_files)
+
+    def close(self) -> None:
+        """Stop watching the directories."""
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def _update(self) -> None:
+        """Apply the changes made since the last query."""
+        if self._inotify is None:
+            self._poll()
+            return
+
+        changed = set()
+        for wd, mask, _ in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                logger.debug("Too many workspace changes, polling the workspace")
+                self._poll()
+            elif wd in self._watches:
+                changed.add(self._watches[wd])
+        # Parents first, so that the removed subtrees are not listed again
+        for path in sorted(changed, key=_depth):
+            self._refresh(path)
+
+    def _poll(self) -> None:
+        """List again the directories whose modification time changed."""
+        for path in sorted(self._directories, key=_depth):
+            entry = self._directories.get(path)
+            if entry is None:
+                continue
+            try:
+                stat = os.stat(self.root / path)
+            except OSError:
+                self._drop(path)
+                continue
+            if stat.st_ino != entry.inode or stat.st_mtime_ns != entry.mtime_ns:
+                self._refresh(path)
+
+    def _refresh(self, path: str) -> None:
+        """List a directory again, and scan its new subdirectories."""
+        entry = self._directories.get(path)
+        if entry is None:
+            return
+        listing = self._list_directory(path)
+        if listing is None:
+            self._drop(path)
+            return
+        for name, inode in entry.subdirs.items():
+            if listing.subdirs.get(name) != inode:
+                self._drop(os.path.join(path, name))
+        self._directories[path] = listing
+        for name, inode in listing.subdirs.items():
+            if entry.subdirs.get(name) != inode:
+                self._scan(os.path.join(path, name))
+
+    def _scan(self, path: str) -> None:
+        """Index a directory and all its subdirectories."""
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            self._watch(path)
+            listing = self._list_directory(path)
+            if listing is None:
+                continue
+            self._directories[path] = listing
+            stack.extend(os.path.join(path, name) for name in listing.subdirs)
+
+    def _drop(self, path: str) -> None:
+        """Remove a directory and all its subdirectories from the index."""
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            entry = self._directories.pop(path, None)
+            wd = self._directory_watches.pop(path, None)
+            # The watch is kept if the directory was moved to a path indexed since
+            if wd is not None and self._watches.get(wd) == path:
+                del self._watches[wd]
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+            if entry is not None:
+                stack.extend(os.path.join(path, name) for name in entry.subdirs)
+
+    def _watch(self, path: str) -> None:
+        """Watch a directory before listing it, so no change is missed."""
+        if self._inotify is None:
+            return
+        try:
+            wd = self._inotify.add_watch(self.root / path)
+        except OSError as e:
+            if e.errno not in (errno.ENOSPC, errno.ENOMEM):
+                # The directory is gone or unreadable, listing it will tell
+                return
+            logger.warn(
+                f"Cannot watch more directories ({e}), polling the workspace instead"
+            )
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._directory_watches.clear()
+            return
+        self._watches[wd] = path
+        self._directory_watches[path] = wd
+
+    def _list_directory(self, path: str) -> Optional[_Directory]:
+        """List a directory, or return None if it cannot be listed."""
+        full_path = self.root / path
+        try:
+            # Taken before listing, so that a change during the listing is
+            # seen on the next poll
+            stat = os.stat(full_path)
+            entries = list(os.scandir(full_path))
+        except OSError:
+            return None
+        mtime_ns = stat.st_mtime_ns
+        if time.time_ns() - mtime_ns < RACY_INTERVAL_NS:
+            mtime_ns = -1
+        listing = _Directory(stat.st_ino, mtime_ns)
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink():
+                    listing.subdirs[entry.name] = entry.inode()
+            elif not entry.name.startswith("."):
+                listing.files.add(entry.name)
+        return listing
+
+
+def _depth(path: str) -> int:
+    """The depth of a directory of the index, 0 for the root."""
+    return path.count(os.sep) + 1 if path else 0
+
+
+@functools.lru_cache(maxsize=None)
+def get_workspace_file_index(root: Path) -> WorkspaceFileIndex:
+    """Get the file index of a workspace, indexing it on the first call.
+
+    Args:
+        root (Path): The resolved root directory of the workspace.
+    """
+    index = WorkspaceFileIndex(root)
+    atexit.register(index.close)
+    return index
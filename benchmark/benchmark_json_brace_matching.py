@@ -0,0 +1,64 @@
+import json
+import sys
+import time
+
+from regex import regex
+
+from autogpt.json_utils.json_fix_general import find_outermost_braces
+
+REPLY = json.dumps(
+    {
+        "thoughts": {
+            "text": "I will write the function.",
+            "reasoning": "The user asked for it.",
+            "plan": "- write the code\n- test it",
+            "criticism": "None",
+            "speak": "Writing the function.",
+        },
+        "command": {
+            "name": "write_to_file",
+            "args": {"filename": "main.c", "text": "int main() { return 0; }"},
+        },
+    }
+)
+SIZES = (100, 1_000, 2_000)
+
+
+def large_replies(size: int) -> dict[str, str]:
+    """Replies of about `size` lines, in the shapes that contain many braces."""
+    return {
+        "code in strings": json.dumps(
+            {"command": {"args": {"text": "if (x) { y(); }\n" * size}}}
+        ),
+        "many objects": "Candidates: " + " ".join([REPLY] * (size // 10 or 1)),
+        "truncated code": "Here is the code:\n" + "void f() { int x = 1;\n" * size,
+    }
+
+
+def recursive_pattern_spans(text: str) -> list[tuple[int, int]]:
+    """The previous implementation, compiling the recursive pattern on every call."""
+    pattern = regex.compile(r"\{(?:[^{}]|(?R))*\}")
+    return [match.span() for match in pattern.finditer(text)]
+
+
+def measure(function, text: str) -> float:
+    start = time.perf_counter()
+    function(text)
+    return time.perf_counter() - start
+
+
+def benchmark_json_brace_matching():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'reply':>16} {'lines':>7} {'regex (ms)':>12} {'scanner (ms)':>13}")
+    for size in sizes:
+        for name, reply in large_replies(size).items():
+            regex_time = measure(recursive_pattern_spans, reply)
+            scanner_time = measure(find_outermost_braces, reply)
+            print(
+                f"{name:>16} {size:>7} {regex_time * 1000:12.2f}"
+                f" {scanner_time * 1000:13.2f}"
+            )
+
+
+if __name__ == "__main__":
+    benchmark_json_brace_matching()
@@ -0,0 +1,80 @@
+import contextlib
+import json
+import time
+from unittest import mock
+
+from autogpt.json_utils import json_fix_llm
+
+REPLY = {
+    "thoughts": {
+        "text": "I need to find the latest Auto-GPT release notes.",
+        "reasoning": "The user asked for a summary of the new features.",
+        "plan": "- search the web\n- read the release page\n- write a summary",
+        "criticism": "I should not browse more pages than needed.",
+        "speak": "I will search for the latest release notes.",
+    },
+    "command": {"name": "google", "args": {"input": "Auto-GPT latest release"}},
+}
+VALID_REPLY = json.dumps(REPLY, indent=4)
+
+# Malformed replies in the shapes LLM models actually produce
+CORPUS = {
+    "valid": VALID_REPLY,
+    "code fence": f"```json\n{VALID_REPLY}\n```",
+    "leading text": f"Here is my response:\n{VALID_REPLY}\nLet me know!",
+    "trailing commas": VALID_REPLY.replace('"\n', '",\n').replace("}\n", "},\n"),
+    "single quotes": VALID_REPLY.replace('"', "'"),
+    "unescaped newlines": VALID_REPLY.replace("\\n", "\n"),
+    "unescaped quotes": VALID_REPLY.replace("new features", '"new" features'),
+    "python literals": VALID_REPLY.replace('"google"', "None"),
+    "unquoted names": VALID_REPLY.replace('"thoughts"', "thoughts"),
+    "truncated": VALID_REPLY[: len(VALID_REPLY) // 2],
+    "missing commas": VALID_REPLY.replace(",\n", "\n"),
+    "prose": "I'm sorry, I cannot help with that.",
+}
+ROUNDS = 20
+
+
+def benchmark_json_fix(use_repair: bool) -> None:
+    """Fix each reply of the corpus and print the tier that fixed it.
+
+    The LLM fix is stubbed out to fail, so the replies it would have been asked to
+    fix are counted as "failed".
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(
+            mock.patch.object(json_fix_llm, "auto_fix_json", return_value="failed")
+        )
+        stack.enter_context(
+            mock.patch.object(json_fix_llm, "json_fix_counts", json_fix_llm.Counter())
+        )
+        if not use_repair:
+            stack.enter_context(
+                mock.patch.object(json_fix_llm, "repair_json", return_value=None)
+            )
+
+        print(f"{'with' if use_repair else 'without'} the repair tier:")
+        total_elapsed = 0.0
+        for name, reply in CORPUS.items():
+            before = dict(json_fix_llm.json_fix_counts)
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                json_fix_llm.fix_json_using_multiple_techniques(reply)
+            elapsed = (time.perf_counter() - start) / ROUNDS
+            total_elapsed += elapsed
+            tier = next(
+                tier
+                for tier, count in json_fix_llm.json_fix_counts.items()
+                if count != before.get(tier, 0)
+            )
+            print(f"{name:>20}: {tier:>8} {elapsed * 1e6:10.1f} us/reply")
+        stats = json_fix_llm.get_json_fix_stats()
+        print(
+            f"{'total':>20}: {stats['failed'] // ROUNDS} replies left to the LLM,"
+            f" {total_elapsed / len(CORPUS) * 1e6:.1f} us/reply on average\n"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_json_fix(use_repair=False)
+    benchmark_json_fix(use_repair=True)
@@ -0,0 +1,48 @@
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+
+from autogpt.config import Config
+from autogpt.memory.local import EMBED_DIM, LocalCache
+
+ROW_COUNTS = (1_000, 10_000, 100_000)
+
+
+def benchmark_local_cache_add(num_rows: int) -> float:
+    """Add `num_rows` memories to an empty LocalCache and return the adds per second.
+
+    The embedding call is stubbed out, so this measures the matrix append and the
+    writes to the backing files only.
+    """
+    cfg = Config()
+    embedding = np.random.default_rng(0).random(EMBED_DIM, dtype=np.float32)
+
+    with (
+        tempfile.TemporaryDirectory() as workspace_path,
+        mock.patch("autogpt.memory.local.get_ada_embedding", return_value=embedding),
+    ):
+        cfg.workspace_path = workspace_path
+        LocalCache._instances.pop(LocalCache, None)
+        cache = LocalCache(cfg)
+
+        start = time.perf_counter()
+        for i in range(num_rows):
+            cache.add(f"memory #{i}")
+        elapsed = time.perf_counter() - start
+
+        LocalCache._instances.pop(LocalCache, None)
+    return num_rows / elapsed
+
+
+def benchmark_local_cache():
+    row_counts = [int(arg) for arg in sys.argv[1:]] or ROW_COUNTS
+    for num_rows in row_counts:
+        adds_per_second = benchmark_local_cache_add(num_rows)
+        print(f"{num_rows:>8} rows: {adds_per_second:10.0f} adds/s")
+
+
+if __name__ == "__main__":
+    benchmark_local_cache()
@@ -1,12 +1,29 @@
 import argparse
+import collections
+import hashlib
+import json
 import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
-from autogpt.commands.file_operations import ingest_file, list_files
+from autogpt.commands.file_operations import (
+    file_memories,
+    ingest_file,
+    list_files,
+    stream_file,
+)
 from autogpt.config import Config
+from autogpt.llm import get_ada_embeddings
+from autogpt.llm.rate_limiter import Priority
 from autogpt.memory import get_memory
 
 cfg = Config()
 
+MANIFEST_FILE = "ingestion-manifest.jsonl"
+HASH_BLOCK_SIZE = 1024 * 1024
+
 
 def configure_logging():
     logging.basicConfig(
@@ -21,20 +38,207 @@ def configure_logging():
     return logging.getLogger("AutoGPT-读取")
 
 
+logger = logging.getLogger("AutoGPT-读取")
+
+
+@dataclass
+class FileMemories:
+    """The memories read from a file, and the manifest entry of the file."""
+
+    path: str
+    mtime: float
+    sha256: str
+    max_length: int
+    overlap: int
+    # None if the file is unchanged since it was last ingested
+    memories: Optional[List[str]] = field(default=None)
+    error: Optional[str] = field(default=None)
+
+    def manifest_entry(self, stored: int) -> Dict:
+        """The manifest entry of the file once its first `stored` memories are
+        stored."""
+        return {
+            "path": self.path,
+            "mtime": self.mtime,
+            "sha256": self.sha256,
+            "max_length": self.max_length,
+            "overlap": self.overlap,
+            "chunks": len(self.memories),
+            "stored": stored,
+        }
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict]:
+    """
+    Load the manifest of the files already ingested.
+
+    The manifest is a JSON lines file, appended to after each ingested file; the
+    last entry of a path wins. A truncated last line (from an interrupted run) is
+    ignored.
+
+    :param manifest_path: The path of the manifest file
+    :return: A dictionary mapping paths to their manifest entries
+    """
+    manifest = {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                manifest[entry["path"]] = entry
+    except FileNotFoundError:
+        pass
+    return manifest
+
+
+def file_sha256(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def read_file_memories(
+    path: str, max_length: int, overlap: int, known_sha256: Optional[str] = None
+) -> FileMemories:
+    """
+    Read a file and split it into memories, unless its content hash is known.
+    Runs in the reader processes.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+        sha256 = file_sha256(path)
+        if sha256 == known_sha256:
+            return FileMemories(path, mtime, sha256, max_length, overlap)
+        memories = file_memories(path, stream_file(path), max_length, overlap)
+        return FileMemories(path, mtime, sha256, max_length, overlap, memories)
+    except Exception as e:
+        return FileMemories(path, 0, "", max_length, overlap, error=str(e))
+
+
+def is_same_chunking(entry: Dict, max_length: int, overlap: int) -> bool:
+    """Whether a manifest entry was ingested with the same chunk parameters."""
+    return entry.get("max_length") == max_length and entry.get("overlap") == overlap
+
+
+def is_complete(entry: Dict) -> bool:
+    """Whether all the memories of a manifest entry were stored."""
+    return entry.get("stored") == entry.get("chunks")
+
+
+def bounded_map(
+    executor: Executor,
+    fn: Callable,
+    items: Iterable[tuple],
+    max_in_flight: int,
+) -> Iterator:
+    """
+    Like executor.map, but submits at most max_in_flight items ahead of the consumer,
+    so that a fast stage does not pile up results in memory for a slow one.
+    Results are yielded in order.
+    """
+    in_flight = collections.deque()
+    for item in items:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(executor.submit(fn, *item))
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
 def ingest_directory(directory, memory, args):
     """
-    Ingest all files in a directory by calling the ingest_file function for each file.
+    Ingest all files in a directory with a pipeline: files are read and chunked in a
+    process pool, chunks are embedded in a bounded number of concurrent batches, and
+    stored in memory batch by batch.
+
+    A manifest of (path, mtime, content hash, chunk parameters, stored memories) is
+    appended to after each batch is stored, so re-runs skip unchanged files, and
+    resume a partly stored file after its last stored batch.
 
     :param directory: The directory containing the files to ingest
-    :param memory: An object with an add() method to store the chunks in memory
+    :param memory: An object with an add_many() method to store the chunks in memory
     """
-    global logger
     try:
         files = list_files(directory)
-        for file in files:
-            ingest_file(file, memory, args.max_length, args.overlap)
     except Exception as e:
         logger.error(f"读取目录时出错 '{directory}': {str(e)}")
+        return
+
+    manifest = load_manifest(args.manifest)
+    batch_size = cfg.embedding_batch_max_items
+
+    def files_to_read():
+        for path in files:
+            entry = manifest.get(path)
+            if entry and not is_same_chunking(entry, args.max_length, args.overlap):
+                entry = None
+            known_sha256 = entry["sha256"] if entry and is_complete(entry) else None
+            if known_sha256:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError as e:
+                    logger.error(f"读取文件时出错 '{path}': {str(e)}")
+                    continue
+                if entry["mtime"] == mtime:
+                    logger.info(f"跳过未更改的文件 '{path}'")
+                    continue
+            yield path, args.max_length, args.overlap, known_sha256
+
+    def batches_to_embed(read_files):
+        for file in read_files:
+            if file.error is not None:
+                logger.error(f"读取文件时出错 '{file.path}': {file.error}")
+                continue
+            entry = manifest.get(file.path)
+            if file.memories is None:
+                logger.info(f"跳过未更改的文件 '{file.path}'")
+                yield [], {**entry, "mtime": file.mtime}
+                continue
+            start = 0
+            if (
+                entry
+                and entry["sha256"] == file.sha256
+                and is_same_chunking(entry, file.max_length, file.overlap)
+            ):
+                # Resume after the batches stored by an interrupted run
+                start = entry["stored"]
+                logger.info(f"恢复读取 '{file.path}'，已存储 {start} 块")
+            logger.info(f"读取 {len(file.memories)} 块 '{file.path}'")
+            if start == len(file.memories):
+                yield [], file.manifest_entry(start)
+            for start in range(start, len(file.memories), batch_size):
+                batch = file.memories[start : start + batch_size]
+                yield batch, file.manifest_entry(start + len(batch))
+
+    def embed_batch(batch, entry):
+        embeddings = []
+        if batch:
+            embeddings = get_ada_embeddings(batch, priority=Priority.BACKGROUND)
+        return batch, embeddings, entry
+
+    with (
+        ProcessPoolExecutor(args.workers) as readers,
+        ThreadPoolExecutor(args.embedding_workers) as embedders,
+        open(args.manifest, "a", encoding="utf-8") as manifest_file,
+    ):
+        read_files = bounded_map(
+            readers, read_file_memories, files_to_read(), 2 * args.workers
+        )
+        embedded_batches = bounded_map(
+            embedders,
+            embed_batch,
+            batches_to_embed(read_files),
+            args.embedding_workers,
+        )
+        for batch, embeddings, entry in embedded_batches:
+            if batch:
+                memory.add_many(batch, embeddings)
+            manifest_file.write(json.dumps(entry) + "\n")
+            manifest_file.flush()
 
 
 def main() -> None:
@@ -45,9 +249,7 @@ def main() -> None:
     )
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--file", type=str, help="要读取的文件。")
-    group.add_argument(
-        "--dir", type=str, help="包含要读取的文件的目录。"
-    )
+    group.add_argument("--dir", type=str, help="包含要读取的文件的目录。")
     parser.add_argument(
         "--init",
         action="store_true",
@@ -57,17 +259,38 @@ def main() -> None:
     parser.add_argument(
         "--overlap",
         type=int,
-        help="读取文件时块之间的重叠大小（默认值：200）",
-        default=200,
+        help="读取文件时块之间重叠的 token 数（默认值：50）",
+        default=50,
     )
     parser.add_argument(
         "--max_length",
         type=int,
-        help="读取文件时每个块的最大长度（默认值：4000）",
-        default=4000,
+        help="读取文件时每个块的最大 token 数（默认值：1000）",
+        default=1000,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="读取目录时用于读取和分块文件的进程数（默认值：CPU 数量）",
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--embedding_workers",
+        type=int,
+        help="读取目录时并发的嵌入请求数（默认值：4）",
+        default=4,
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help=f"记录已读取文件的清单，用于跳过未更改的文件和恢复中断的读取（默认值：{MANIFEST_FILE}）",
+        default=MANIFEST_FILE,
     )
     args = parser.parse_args()
 
+    if args.init and os.path.exists(args.manifest):
+        os.remove(args.manifest)
+
     # Initialize memory
     memory = get_memory(cfg, init=args.init)
     logger.debug("使用类型的内存: " + memory.__class__.__name__)
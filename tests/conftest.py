@@ -1,6 +1,7 @@
 from pathlib import Path
 
 import pytest
+import tiktoken
 from pytest_mock import MockerFixture
 
 from autogpt.config import Config
@@ -34,6 +35,19 @@ def config(mocker: MockerFixture, workspace: Workspace) -> Config:
     yield config
 
 
+@pytest.fixture()
+def byte_tokenizer(mocker: MockerFixture) -> tiktoken.Encoding:
+    """A tokenizer with a token per byte, used instead of the downloaded ones."""
+    encoding = tiktoken.Encoding(
+        "bytes",
+        pat_str=r"\s*[\r\n]+|\s+(?!\S)|\s+|[^\s\p{L}\p{N}]+| ?\p{L}+|\p{N}+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={"<|endoftext|>": 256},
+    )
+    mocker.patch("tiktoken.get_encoding", return_value=encoding)
+    return encoding
+
+
 @pytest.fixture()
 def api_manager() -> ApiManager:
     if ApiManager in ApiManager._instances:
@@ -2,11 +2,13 @@
 """Tests for LocalCache class"""
 import unittest
 
+import numpy as np
 import orjson
 import pytest
 
 from autogpt.memory.local import EMBED_DIM, SAVE_OPTIONS
 from autogpt.memory.local import LocalCache as LocalCache_
+from autogpt.memory.local import top_k_indices
 from tests.utils import requires_api_key
 
 
@@ -55,9 +57,53 @@ def test_init_with_backing_file(LocalCache, config, workspace):
         f.write(data)
 
     assert cache_file.exists()
-    LocalCache(config)
+    cache = LocalCache(config)
     assert cache_file.exists()
     assert cache_file.read_text() == "{}"
+    # texts without embeddings cannot be migrated
+    assert cache.data.texts == []
+
+
+def test_init_migrates_legacy_json_file(LocalCache, config, workspace):
+    cache_file = workspace.root / f"{config.memory_index}.json"
+    raw_data = {"texts": ["test"], "embeddings": [[0.1] * EMBED_DIM]}
+    cache_file.write_bytes(orjson.dumps(raw_data, option=SAVE_OPTIONS))
+
+    cache = LocalCache(config)
+    assert cache.data.texts == ["test"]
+    assert cache.data.embeddings.shape == (1, EMBED_DIM)
+    assert cache_file.read_text() == "{}"
+
+
+def test_init_reopens_existing_data(LocalCache, config, mock_embed_with_ada):
+    cache = LocalCache(config)
+    cache.add("test 1")
+    cache.add("test\n2")
+
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+    assert cache.data.texts == ["test 1", "test\n2"]
+    assert cache.data.embeddings.shape == (2, EMBED_DIM)
+    assert np.allclose(cache.data.embeddings, 0.1)
+
+
+def test_init_drops_torn_tail(LocalCache, config, mock_embed_with_ada):
+    cache = LocalCache(config)
+    cache.add("test 1")
+    cache.add("test 2")
+
+    # Simulate a crash after the vector of a third entry was written
+    with cache.vectors_filename.open("ab") as f:
+        f.write(np.zeros(EMBED_DIM, dtype=np.float32).tobytes())
+    with cache.texts_filename.open("ab") as f:
+        f.write(b'"test')
+
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+    assert cache.data.texts == ["test 1", "test 2"]
+    assert cache.data.embeddings.shape == (2, EMBED_DIM)
+    assert cache.vectors_filename.stat().st_size == 2 * EMBED_DIM * 4
+    assert cache.texts_filename.read_bytes().count(b"\n") == 2
 
 
 def test_add(LocalCache, config, mock_embed_with_ada):
@@ -79,6 +125,8 @@ def test_clear(LocalCache, config, mock_embed_with_ada):
     cache.clear()
     assert cache.data.texts == []
     assert cache.data.embeddings.shape == (0, EMBED_DIM)
+    assert cache.vectors_filename.stat().st_size == 0
+    assert cache.texts_filename.stat().st_size == 0
 
 
 def test_get(LocalCache, config, mock_embed_with_ada):
@@ -108,3 +156,64 @@ def test_get_stats(LocalCache, config, mock_embed_with_ada) -> None:
     cache.add(text)
     stats = cache.get_stats()
     assert stats == (1, cache.data.embeddings.shape)
+
+
+def test_add_grows_embeddings_buffer(LocalCache, config, mock_embed_with_ada):
+    cache = LocalCache(config)
+    capacities = set()
+    for i in range(100):
+        cache.add(f"test {i}")
+        capacities.add(len(cache.data.embeddings_buffer))
+
+    assert cache.data.embeddings.shape == (100, EMBED_DIM)
+    assert capacities == {16, 32, 64, 128}
+    assert cache.get_stats() == (100, (100, EMBED_DIM))
+
+
+def test_top_k_indices():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 4, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+    batch_scores = np.stack([scores, -scores])
+    assert top_k_indices(batch_scores, 2).tolist() == [[1, 3], [0, 4]]
+
+
+def test_get_relevant_many(LocalCache, config, mocker):
+    embeddings = {text: np.eye(EMBED_DIM)[i] for i, text in enumerate(["a", "b", "c"])}
+    mocker.patch(
+        "autogpt.memory.local.get_ada_embedding", side_effect=embeddings.__getitem__
+    )
+    get_ada_embeddings = mocker.patch(
+        "autogpt.memory.local.get_ada_embeddings",
+        side_effect=lambda texts: [embeddings[text] for text in texts],
+    )
+    cache = LocalCache(config)
+    for text in embeddings:
+        cache.add(text)
+
+    assert cache.get_relevant_many(["c", "a"], 1) == [["c"], ["a"]]
+    # The queries are embedded in one batched call
+    get_ada_embeddings.assert_called_once_with(["c", "a"])
+    assert cache.get_relevant_many([], 1) == []
+    assert cache.get_relevant("b", 1) == ["b"]
+
+
+def test_add_many(LocalCache, config, mocker):
+    get_ada_embeddings = mocker.patch(
+        "autogpt.memory.local.get_ada_embeddings",
+        side_effect=lambda texts: [[0.1] * EMBED_DIM for _ in texts],
+    )
+    cache = LocalCache(config)
+
+    result = cache.add_many(["test 1", "Command Error: failed", "test 2"])
+
+    assert result == ["test 1", "", "test 2"]
+    get_ada_embeddings.assert_called_once_with(["test 1", "test 2"])
+    assert cache.data.texts == ["test 1", "test 2"]
+    assert cache.data.embeddings.shape == (2, EMBED_DIM)
+
+    del LocalCache._instances[LocalCache]
+    cache = LocalCache(config)
+    assert cache.data.texts == ["test 1", "test 2"]
@@ -0,0 +1,131 @@
+"""Tests for LocalIVFCache class"""
+
+import numpy as np
+import pytest
+
+from autogpt.memory.local import EMBED_DIM
+from autogpt.memory.local_ivf import LocalIVFCache as LocalIVFCache_
+from autogpt.memory.local_ivf import train_centroids
+
+NUM_CLUSTERS = 8
+NUM_TEXTS = 400
+
+
+@pytest.fixture
+def LocalIVFCache(mocker):
+    # Hack, real gross. Singletons are not good times.
+    if LocalIVFCache_ in LocalIVFCache_._instances:
+        del LocalIVFCache_._instances[LocalIVFCache_]
+    mocker.patch.object(LocalIVFCache_, "min_train_size", 100)
+    return LocalIVFCache_
+
+
+@pytest.fixture
+def embeddings():
+    """Normalized random vectors around NUM_CLUSTERS random directions"""
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(NUM_CLUSTERS, EMBED_DIM))
+    vectors = centers[rng.integers(NUM_CLUSTERS, size=NUM_TEXTS)]
+    vectors += 0.5 * rng.normal(size=vectors.shape)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return {f"text {i}": vector for i, vector in enumerate(vectors)}
+
+
+@pytest.fixture
+def mock_embed_with_ada(mocker, embeddings):
+    mocker.patch(
+        "autogpt.memory.local.get_ada_embedding", side_effect=embeddings.__getitem__
+    )
+    mocker.patch(
+        "autogpt.memory.local.get_ada_embeddings",
+        side_effect=lambda texts: [embeddings[text] for text in texts],
+    )
+
+
+@pytest.fixture
+def ivf_config(config, mocker):
+    mocker.patch.multiple(
+        config, memory_ivf_nlist=NUM_CLUSTERS, memory_ivf_nprobe=NUM_CLUSTERS
+    )
+    return config
+
+
+def test_train_centroids():
+    rng = np.random.default_rng(0)
+    vectors = np.repeat(np.eye(4, EMBED_DIM), 10, axis=0)
+    vectors = vectors[rng.permutation(len(vectors))]
+
+    centroids = train_centroids(vectors, 4)
+
+    assert centroids.shape == (4, EMBED_DIM)
+    matches = np.argmax(centroids @ np.eye(4, EMBED_DIM).T, axis=1)
+    assert sorted(matches) == [0, 1, 2, 3]
+    assert np.allclose(centroids, np.eye(4, EMBED_DIM)[matches])
+
+
+def test_brute_force_until_trained(LocalIVFCache, ivf_config, mock_embed_with_ada):
+    cache = LocalIVFCache(ivf_config)
+    for i in range(50):
+        cache.add(f"text {i}")
+
+    assert cache.get_index_stats()["trained"] is False
+    assert cache.get_relevant("text 3", 1) == ["text 3"]
+
+
+def test_search_with_all_lists_probed_is_exact(
+    LocalIVFCache, ivf_config, mock_embed_with_ada, embeddings
+):
+    cache = LocalIVFCache(ivf_config)
+    for text in embeddings:
+        cache.add(text)
+
+    stats = cache.get_index_stats()
+    assert stats["trained"] is True
+    assert stats["lists"] == NUM_CLUSTERS
+    assert sum(len(rows) for rows in cache.inverted_lists) == NUM_TEXTS
+
+    queries = ["text 0", "text 123", "text 399"]
+    results = cache.get_relevant_many(queries, 5)
+    expected = [
+        [cache.data.texts[i] for i in indices]
+        for indices in super(LocalIVFCache, cache)._search(
+            np.array([embeddings[q] for q in queries], dtype=np.float32), 5
+        )
+    ]
+    assert results == expected
+    assert [result[0] for result in results] == queries
+
+
+def test_search_with_one_probe(
+    LocalIVFCache, ivf_config, mock_embed_with_ada, embeddings
+):
+    ivf_config.memory_ivf_nprobe = 1
+    cache = LocalIVFCache(ivf_config)
+    for text in embeddings:
+        cache.add(text)
+
+    assert cache.get_relevant("text 42", 3)[0] == "text 42"
+
+
+def test_index_is_persisted(LocalIVFCache, ivf_config, mock_embed_with_ada, embeddings):
+    cache = LocalIVFCache(ivf_config)
+    for text in embeddings:
+        cache.add(text)
+    assert cache.index_filename.exists()
+    inverted_lists = cache.inverted_lists
+
+    del LocalIVFCache._instances[LocalIVFCache]
+    cache = LocalIVFCache(ivf_config)
+    assert cache.get_index_stats()["trained"] is True
+    assert cache.inverted_lists == inverted_lists
+
+
+def test_clear(LocalIVFCache, ivf_config, mock_embed_with_ada, embeddings):
+    cache = LocalIVFCache(ivf_config)
+    for text in embeddings:
+        cache.add(text)
+
+    cache.clear()
+    assert cache.get_index_stats()["trained"] is False
+    assert not cache.index_filename.exists()
+    assert cache.get_relevant("text 1", 1) == []
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+
+import pytest
+
+import data_ingestion
+
+
+@pytest.fixture
+def ingestion_dir(config, workspace, monkeypatch):
+    monkeypatch.chdir(workspace.root)
+    directory = workspace.root / "docs"
+    directory.mkdir()
+    (directory / "a.txt").write_text("a" * 25)
+    (directory / "b.txt").write_text("b" * 5)
+    return directory
+
+
+@pytest.fixture
+def args(workspace):
+    return argparse.Namespace(
+        max_length=10,
+        overlap=0,
+        workers=2,
+        embedding_workers=2,
+        manifest=str(workspace.root / "manifest.jsonl"),
+    )
+
+
+@pytest.fixture
+def memory(mocker):
+    mocker.patch.object(
+        data_ingestion,
+        "get_ada_embeddings",
+        side_effect=lambda texts, **_: [[float(len(text))] for text in texts],
+    )
+    return mocker.Mock()
+
+
+def stored_memories(memory):
+    return [text for call in memory.add_many.call_args_list for text in call.args[0]]
+
+
+def test_ingest_directory(ingestion_dir, args, memory, config, byte_tokenizer, mocker):
+    mocker.patch.object(config, "embedding_batch_max_items", 2)
+
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+
+    memories = stored_memories(memory)
+    assert len(memories) == 4
+    assert (
+        sum(
+            m.startswith(f"Filename: {os.path.join('docs', 'a.txt')}\n")
+            for m in memories
+        )
+        == 3
+    )
+    # batches of at most 2 memories, with their embeddings
+    assert sorted(len(call.args[0]) for call in memory.add_many.call_args_list) == [
+        1,
+        1,
+        2,
+    ]
+    texts, embeddings = memory.add_many.call_args_list[0].args
+    assert embeddings == [[float(len(text))] for text in texts]
+
+    manifest = data_ingestion.load_manifest(args.manifest)
+    assert sorted(manifest) == [os.path.join("docs", f) for f in ("a.txt", "b.txt")]
+
+
+def test_ingest_directory_skips_unchanged_files(
+    ingestion_dir, args, memory, byte_tokenizer
+):
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+    memory.reset_mock()
+
+    # Same content with a new mtime, and new content
+    (ingestion_dir / "a.txt").write_text("a" * 25)
+    os.utime(ingestion_dir / "a.txt", (0, 0))
+    (ingestion_dir / "b.txt").write_text("c" * 5)
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+
+    assert stored_memories(memory) == [
+        f"Filename: {os.path.join('docs', 'b.txt')}\nContent part#1/1: ccccc"
+    ]
+    manifest = data_ingestion.load_manifest(args.manifest)
+    assert manifest[os.path.join("docs", "a.txt")]["mtime"] == 0
+
+
+def test_ingest_directory_reingests_files_with_new_chunk_parameters(
+    ingestion_dir, args, memory, byte_tokenizer
+):
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+    memory.reset_mock()
+
+    args.max_length = 50
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+
+    assert len(stored_memories(memory)) == 2
+    manifest = data_ingestion.load_manifest(args.manifest)
+    assert manifest[os.path.join("docs", "a.txt")]["max_length"] == 50
+
+
+def test_ingest_directory_resumes_partly_stored_file(
+    ingestion_dir, args, memory, config, byte_tokenizer, mocker
+):
+    mocker.patch.object(config, "embedding_batch_max_items", 2)
+    memory.add_many.side_effect = [None, RuntimeError("memory is down")]
+    with pytest.raises(RuntimeError):
+        data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+    first_run = stored_memories(memory)[:2]
+    memory.reset_mock(side_effect=True)
+
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+
+    # The batch stored before the interruption is not stored again
+    memories = first_run + stored_memories(memory)
+    assert len(memories) == len(set(memories)) == 4
+    manifest = data_ingestion.load_manifest(args.manifest)
+    assert manifest[os.path.join("docs", "a.txt")]["stored"] == 3
+
+
+def test_ingest_directory_skips_deleted_files(
+    ingestion_dir, args, memory, byte_tokenizer, mocker
+):
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+    memory.reset_mock()
+    files = data_ingestion.list_files(str(ingestion_dir))
+    mocker.patch.object(data_ingestion, "list_files", return_value=files)
+
+    (ingestion_dir / "b.txt").unlink()
+    data_ingestion.ingest_directory(str(ingestion_dir), memory, args)
+
+    assert stored_memories(memory) == []
+
+
+def test_load_manifest_ignores_truncated_line(tmp_path):
+    manifest_path = tmp_path / "manifest.jsonl"
+    entry = {"path": "a.txt", "mtime": 1.0, "sha256": "abc"}
+    manifest_path.write_text(json.dumps(entry) + '\n{"path": "b.t')
+
+    assert data_ingestion.load_manifest(str(manifest_path)) == {"a.txt": entry}
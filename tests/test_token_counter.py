@@ -1,6 +1,8 @@
 import pytest
 
 from autogpt.llm import count_message_tokens, count_string_tokens
+from autogpt.llm.chat import fit_message_history
+from autogpt.llm.token_counter import get_encoding
 
 
 def test_count_message_tokens():
@@ -70,3 +72,48 @@ def test_count_string_tokens_gpt_4():
 
     string = "Hello, world!"
     assert count_string_tokens(string, model_name="gpt-4-0314") == 4
+
+
+def test_count_message_tokens_caches_encoding(mocker):
+    """The encoding is loaded once per model"""
+    encoding = mocker.Mock()
+    encoding.encode.side_effect = lambda text: text.split()
+    encoding_for_model = mocker.patch(
+        "tiktoken.encoding_for_model", return_value=encoding
+    )
+    get_encoding.cache_clear()
+    messages = [
+        {"role": "user", "content": "Hello there"},
+        {"role": "assistant", "content": "General Kenobi"},
+    ]
+
+    try:
+        first = count_message_tokens(messages, model="gpt-4-0314")
+        messages.append({"role": "user", "content": "You are a bold one"})
+        second = count_message_tokens(messages, model="gpt-4-0314")
+    finally:
+        get_encoding.cache_clear()
+
+    assert first == 3 + 2 * 3 + 1 + 2 + 1 + 2
+    assert second == first + 3 + 1 + 5
+    encoding_for_model.assert_called_once_with("gpt-4-0314")
+
+
+def test_fit_message_history_tokenizes_messages_once(byte_tokenizer, mocker):
+    """Re-fitting an unchanged long history does not tokenize it again"""
+    mocker.patch("tiktoken.encoding_for_model", return_value=byte_tokenizer)
+    get_encoding.cache_clear()
+    history = [{"role": "user", "content": f"message {i}"} for i in range(10_000)]
+
+    try:
+        fit_message_history(history, "gpt-4-0314", 10**9)
+        encode = mocker.spy(byte_tokenizer, "encode")
+        fit_message_history(history, "gpt-4-0314", 10**9)
+        assert encode.call_count == 0
+
+        # Only the new message is tokenized, its role and its content
+        history.append({"role": "assistant", "content": "new"})
+        fit_message_history(history, "gpt-4-0314", 10**9)
+        assert encode.call_count == 2
+    finally:
+        get_encoding.cache_clear()
@@ -3,6 +3,7 @@ import time
 from unittest.mock import patch
 
 from autogpt.llm import create_chat_message, generate_context
+from autogpt.llm.chat import fit_message_history
 
 
 def test_happy_path_role_content():
@@ -76,3 +77,38 @@ def test_generate_context_valid_inputs():
     assert result[1] >= 0
     assert len(result[3]) >= 2  # current_context should have at least 2 messages
     assert result[1] <= 2048  # token limit for GPT-3.5-turbo-0301 is 2048 tokens
+
+
+def test_fit_message_history(mocker):
+    """Test that the most recent messages that fit in the token budget are kept."""
+    mocker.patch(
+        "autogpt.llm.chat.count_history_message_tokens",
+        side_effect=lambda message, model: len(message["content"]),
+    )
+    full_message_history = [
+        create_chat_message("user", "a" * 10),
+        create_chat_message("assistant", "b" * 20),
+        create_chat_message("user", "c" * 30),
+    ]
+
+    assert fit_message_history(full_message_history, "model", 100) == (0, 60)
+    assert fit_message_history(full_message_history, "model", 50) == (1, 50)
+    assert fit_message_history(full_message_history, "model", 49) == (2, 30)
+    assert fit_message_history(full_message_history, "model", 0) == (3, 0)
+    assert fit_message_history([], "model", 100) == (0, 0)
+
+
+def test_fit_message_history_stops_at_cut_point(mocker):
+    """Test that the messages older than the cut point are not counted."""
+    count_history_message_tokens = mocker.patch(
+        "autogpt.llm.chat.count_history_message_tokens",
+        side_effect=lambda message, model: len(message["content"]),
+    )
+    full_message_history = [
+        create_chat_message("user", f"{i:010}") for i in range(1000)
+    ]
+
+    assert fit_message_history(full_message_history, "model", 35) == (997, 30)
+    # The 3 messages that fit, and the one that does not
+    counted = [call.args[0] for call in count_history_message_tokens.call_args_list]
+    assert counted == full_message_history[:-5:-1]
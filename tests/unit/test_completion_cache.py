@@ -0,0 +1,132 @@
+import pytest
+
+from autogpt.commands.analyze_code import analyze_code
+from autogpt.llm import llm_utils
+from autogpt.llm.completion_cache import CompletionCache
+from tests.unit.test_llm_utils import chat_completion_response
+
+MODEL = "gpt-3.5-turbo"
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompletionCache(tmp_path / "cache.sqlite3", max_entries=10)
+
+
+def test_get_missing(cache):
+    assert cache.get(MODEL, MESSAGES, 0, None) is None
+    assert cache.get_stats() == {
+        "entries": 0,
+        "hits": 0,
+        "misses": 1,
+        "hit_rate": 0.0,
+    }
+
+
+def test_put_and_get(cache):
+    cache.put(MODEL, MESSAGES, 0, None, "Hi!")
+
+    assert cache.get(MODEL, MESSAGES, 0, None) == "Hi!"
+    assert cache.get(MODEL, MESSAGES, 0, 100) is None
+    assert cache.get("gpt-4", MESSAGES, 0, None) is None
+    assert cache.get(MODEL, [{"role": "user", "content": "Bye"}], 0, None) is None
+    assert cache.get_stats()["hit_rate"] == 0.25
+
+
+def test_expired_entries(tmp_path, mocker):
+    cache = CompletionCache(tmp_path / "cache.sqlite3", max_entries=10, ttl=60)
+    time = mocker.patch("autogpt.llm.sqlite_cache.time.time", return_value=1000)
+    cache.put(MODEL, MESSAGES, 0, None, "Hi!")
+
+    time.return_value = 1060
+    assert cache.get(MODEL, MESSAGES, 0, None) == "Hi!"
+    time.return_value = 1061
+    assert cache.get(MODEL, MESSAGES, 0, None) is None
+    assert len(cache) == 0
+
+
+def test_evicts_expired_then_least_recently_used(tmp_path, mocker):
+    cache = CompletionCache(tmp_path / "cache.sqlite3", max_entries=10, ttl=60)
+    time = mocker.patch("autogpt.llm.sqlite_cache.time.time", return_value=1000)
+    cache.put(MODEL, MESSAGES, 0, None, "Old")
+    time.return_value = 1100
+    for i in range(9):
+        cache.put(MODEL, MESSAGES, 0, i, f"Completion {i}")
+
+    cache.put(MODEL, MESSAGES, 0, 9, "Completion 9")
+    assert len(cache) == 10
+    assert cache.get(MODEL, MESSAGES, 0, None) is None
+
+    cache.put(MODEL, MESSAGES, 0, 10, "Completion 10")
+    # 1 entry over the limit, plus 10% of the limit
+    assert len(cache) == 9
+    assert cache.get(MODEL, MESSAGES, 0, 0) is None
+    assert cache.get(MODEL, MESSAGES, 0, 1) is None
+    assert cache.get(MODEL, MESSAGES, 0, 2) == "Completion 2"
+
+
+def test_persists_entries(tmp_path, cache):
+    cache.put(MODEL, MESSAGES, 0, None, "Hi!")
+
+    reopened = CompletionCache(tmp_path / "cache.sqlite3", max_entries=10)
+    assert len(reopened) == 1
+    assert reopened.get(MODEL, MESSAGES, 0, None) == "Hi!"
+
+
+def test_create_chat_completion_uses_cache(config, api_manager, mocker):
+    mocker.patch.object(config, "completion_cache", True)
+    create = mocker.patch(
+        "openai.ChatCompletion.create", return_value=chat_completion_response("Hi!")
+    )
+    mocker.patch.object(llm_utils, "count_message_tokens", return_value=10)
+
+    for _ in range(2):
+        assert llm_utils.create_chat_completion(MESSAGES, MODEL, 0, cache=True) == "Hi!"
+    llm_utils.create_chat_completion(MESSAGES, MODEL, 0.5, cache=True)
+
+    assert create.call_count == 2
+    stats = api_manager.get_completion_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_analyze_code_uses_cache(config, api_manager, mocker):
+    mocker.patch.object(config, "completion_cache", True)
+    create = mocker.patch(
+        "openai.ChatCompletion.create",
+        return_value=chat_completion_response("['Add docstrings']"),
+    )
+    mocker.patch.object(llm_utils, "count_message_tokens", return_value=10)
+
+    for _ in range(2):
+        assert analyze_code("def f(): pass") == "['Add docstrings']"
+
+    assert create.call_count == 1
+    assert api_manager.get_completion_cache_stats()["hits"] == 1
+
+
+def test_create_chat_completion_not_opted_in(config, api_manager, mocker):
+    mocker.patch.object(config, "completion_cache", True)
+    create = mocker.patch(
+        "openai.ChatCompletion.create", return_value=chat_completion_response("Hi!")
+    )
+    mocker.patch.object(llm_utils, "count_message_tokens", return_value=10)
+
+    for _ in range(2):
+        llm_utils.create_chat_completion(MESSAGES, MODEL, 0)
+
+    assert create.call_count == 2
+    assert api_manager.get_completion_cache_stats()["misses"] == 0
+
+
+def test_create_chat_completion_cache_disabled(config, api_manager, mocker):
+    create = mocker.patch(
+        "openai.ChatCompletion.create", return_value=chat_completion_response("Hi!")
+    )
+    mocker.patch.object(llm_utils, "count_message_tokens", return_value=10)
+
+    for _ in range(2):
+        llm_utils.create_chat_completion(MESSAGES, MODEL, 0, cache=True)
+
+    assert create.call_count == 2
+    assert api_manager.get_completion_cache_stats() is None
@@ -0,0 +1,89 @@
+import pytest
+
+from autogpt.llm import llm_utils
+from autogpt.llm.embedding_cache import EmbeddingCache, get_embedding_cache
+
+MODEL = "text-embedding-ada-002"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=10)
+
+
+def test_get_missing(cache):
+    assert cache.get(MODEL, "text") is None
+    assert cache.get_stats() == {"entries": 0, "hits": 0, "misses": 1}
+
+
+def test_put_and_get(cache):
+    cache.put(MODEL, "text", [0.5, 0.25])
+
+    assert cache.get(MODEL, "text") == [0.5, 0.25]
+    assert cache.get("other-model", "text") is None
+    assert cache.get_stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_put_existing_key(cache):
+    cache.put(MODEL, "text", [0.5])
+    cache.put(MODEL, "text", [0.25])
+
+    assert cache.get(MODEL, "text") == [0.25]
+    assert len(cache) == 1
+
+
+def test_evicts_least_recently_used(cache):
+    for i in range(10):
+        cache.put(MODEL, f"text {i}", [float(i)])
+    # Use the oldest entry, so that it is kept
+    assert cache.get(MODEL, "text 0") == [0.0]
+
+    cache.put(MODEL, "text 10", [10.0])
+
+    # 1 entry over the limit, plus 10% of the limit
+    assert len(cache) == 9
+    assert cache.get(MODEL, "text 0") == [0.0]
+    assert cache.get(MODEL, "text 1") is None
+    assert cache.get(MODEL, "text 2") is None
+    assert cache.get(MODEL, "text 3") == [3.0]
+
+
+def test_persists_entries(tmp_path, cache):
+    cache.put(MODEL, "text", [0.5])
+
+    reopened = EmbeddingCache(tmp_path / "cache.sqlite3", max_entries=10)
+    assert len(reopened) == 1
+    assert reopened.get(MODEL, "text") == [0.5]
+
+
+def test_clear(cache):
+    cache.put(MODEL, "text", [0.5])
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get(MODEL, "text") is None
+
+
+def test_get_ada_embedding_uses_cache(config, mocker):
+    create_embedding = mocker.patch.object(
+        llm_utils, "create_embedding", return_value=[0.5, 0.25]
+    )
+
+    assert llm_utils.get_ada_embedding("some\ntext") == [0.5, 0.25]
+    assert llm_utils.get_ada_embedding("some text") == [0.5, 0.25]
+
+    create_embedding.assert_called_once()
+    assert get_embedding_cache().get_stats()["hits"] == 1
+
+
+def test_get_ada_embedding_cache_disabled(config, mocker):
+    mocker.patch.object(config, "embedding_cache", False)
+    create_embedding = mocker.patch.object(
+        llm_utils, "create_embedding", return_value=[0.5, 0.25]
+    )
+
+    llm_utils.get_ada_embedding("text")
+    llm_utils.get_ada_embedding("text")
+
+    assert get_embedding_cache() is None
+    assert create_embedding.call_count == 2
@@ -104,7 +104,7 @@ def test_is_duplicate_operation(config, mocker: MockerFixture):
         "path/to/file1.txt": "checksum1",
         "path/to/file2.txt": "checksum2",
     }
-    mocker.patch.object(file_ops, "file_operations_state", lambda _: state)
+    mocker.patch.object(file_ops.FileOperationsIndex, "get_state", lambda _: state)
 
     # Test cases with write operations
     assert (
@@ -129,6 +129,49 @@ def test_is_duplicate_operation(config, mocker: MockerFixture):
     assert file_ops.is_duplicate_operation("delete", "path/to/file3.txt") is True
 
 
+def test_file_operations_index_is_updated_in_place(config, mocker: MockerFixture):
+    file_ops.log_operation("write", "path/to/file1.txt", "checksum1")
+    index = file_ops.get_file_operations_index(config.file_logger_path)
+    apply_log = mocker.spy(index, "_apply_log")
+
+    file_ops.log_operation("write", "path/to/file2.txt", "checksum2")
+    file_ops.log_operation("delete", "path/to/file1.txt")
+
+    assert index.get_state() == {"path/to/file2.txt": "checksum2"}
+    assert index.get_state() == file_ops.file_operations_state(config.file_logger_path)
+    apply_log.assert_not_called()
+
+
+def test_file_operations_index_follows_log_changes(config):
+    file_ops.log_operation("write", "path/to/file1.txt", "checksum1")
+    index = file_ops.get_file_operations_index(config.file_logger_path)
+
+    with open(config.file_logger_path, "a", encoding="utf-8") as f:
+        f.write("write: path/to/file2.txt #checksum2\n")
+    assert index.get_state() == {
+        "path/to/file1.txt": "checksum1",
+        "path/to/file2.txt": "checksum2",
+    }
+
+    with open(config.file_logger_path, "w", encoding="utf-8") as f:
+        f.write("write: path/to/file3.txt #checksum3\n")
+    assert index.get_state() == {"path/to/file3.txt": "checksum3"}
+
+
+def test_file_operations_index_snapshot(config, mocker: MockerFixture):
+    file_ops.log_operation("write", "path/to/file1.txt", "checksum1")
+    file_ops.get_file_operations_index(config.file_logger_path).save()
+    with open(config.file_logger_path, "a", encoding="utf-8") as f:
+        f.write("append: path/to/file1.txt #checksum2\n")
+
+    parse_operation = mocker.spy(file_ops, "parse_operation")
+    index = file_ops.FileOperationsIndex(config.file_logger_path)
+
+    # Only the operation logged after the snapshot is parsed
+    assert parse_operation.call_count == 1
+    assert index.get_state() == {"path/to/file1.txt": "checksum2"}
+
+
 # Test logging a file operation
 def test_log_operation(config: Config):
     file_ops.log_operation("log_test", "path/to/test")
@@ -159,11 +202,172 @@ def test_split_file():
     assert chunks == expected
 
 
+@pytest.mark.parametrize(
+    "max_tokens, overlap, expected",
+    [
+        (4, 1, ["abcd", "defg", "ghij"]),
+        (4, 0, ["abcd", "efgh", "ij"]),
+        (10, 2, ["abcdefghij"]),
+    ],
+)
+def test_split_file_by_tokens(byte_tokenizer, max_tokens, overlap, expected):
+    chunks = list(file_ops.split_file_by_tokens("abcdefghij", max_tokens, overlap))
+
+    assert chunks == expected
+
+
+def test_split_file_by_tokens_on_character_boundaries(byte_tokenizer):
+    # Each of these characters is 3 tokens long
+    chunks = list(file_ops.split_file_by_tokens("你好世界", max_tokens=7, overlap=3))
+
+    assert chunks == ["你好", "好世", "世界"]
+
+
+def test_split_file_by_tokens_streamed(byte_tokenizer):
+    content = "第一行。\nSecond line, longer than a block\n" * 20
+    blocks = [content[i : i + 7] for i in range(0, len(content), 7)]
+
+    chunks = list(file_ops.split_file_by_tokens(blocks, max_tokens=50, overlap=10))
+
+    assert chunks == list(
+        file_ops.split_file_by_tokens(content, max_tokens=50, overlap=10)
+    )
+    assert all(len(byte_tokenizer.encode(chunk)) <= 50 for chunk in chunks)
+
+
+def test_split_file_by_tokens_invalid_overlap(byte_tokenizer):
+    with pytest.raises(ValueError):
+        list(file_ops.split_file_by_tokens("abc", max_tokens=2, overlap=2))
+
+
+def test_ingest_file(
+    test_file_with_content_path: Path,
+    file_content,
+    byte_tokenizer,
+    mocker: MockerFixture,
+):
+    memory = mocker.Mock()
+    file_ops.ingest_file(str(test_file_with_content_path), memory, 10, 2)
+
+    memory.add_many.assert_called_once()
+    (memories,) = memory.add_many.call_args.args
+    chunks = ["This is a ", "a test fil", "ile.\n"]
+    assert memories == [
+        f"Filename: {test_file_with_content_path}\nContent part#{i + 1}: {chunk}"
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def test_ingest_file_in_batches(
+    test_file_with_content_path: Path,
+    config: Config,
+    byte_tokenizer,
+    mocker: MockerFixture,
+):
+    mocker.patch.object(config, "embedding_batch_max_items", 2)
+    memory = mocker.Mock()
+    file_ops.ingest_file(str(test_file_with_content_path), memory, 10, 2)
+
+    assert [len(call.args[0]) for call in memory.add_many.call_args_list] == [2, 1]
+
+
+def test_ingest_file_respects_embedding_token_limit(
+    test_file_path: Path,
+    config: Config,
+    byte_tokenizer,
+    mocker: MockerFixture,
+):
+    test_file_path.write_text("a" * 1000, encoding="utf-8")
+    mocker.patch.object(config, "embedding_token_limit", 200)
+    memory = mocker.Mock()
+    file_ops.ingest_file(str(test_file_path), memory, 1000, 0)
+
+    (memories,) = memory.add_many.call_args.args
+    assert len(memories) > 5
+    assert all(len(byte_tokenizer.encode(memory)) <= 200 for memory in memories)
+
+
 def test_read_file(test_file_with_content_path: Path, file_content):
     content = file_ops.read_file(test_file_with_content_path)
     assert content == file_content
 
 
+def test_read_file_range(test_file_path: Path):
+    test_file_path.write_text("line 1\nline 2\r\nline 3\nline 4", encoding="utf-8")
+
+    assert file_ops.read_file(test_file_path, offset=1, limit=2) == (
+        "line 2\r\nline 3\n"
+    )
+    assert file_ops.read_file(test_file_path, offset="3", limit="") == "line 4"
+    assert file_ops.read_file(test_file_path, offset=10) == ""
+    assert file_ops.read_file(test_file_path, limit=-1).startswith("Error:")
+
+
+def test_read_file_detects_encoding_from_sample(test_file_path: Path, mocker):
+    content = "你好，世界。这是一个测试文件。\n" * 10000
+    test_file_path.write_bytes(content.encode("gb18030"))
+    mocker.patch.object(file_ops, "ENCODING_SAMPLE_SIZE", 1000)
+    from_bytes = mocker.spy(file_ops.charset_normalizer, "from_bytes")
+
+    assert file_ops.read_file(test_file_path) == content
+    (sample,) = from_bytes.call_args.args
+    assert len(sample) <= 1000
+
+
+def test_read_file_binary(test_file_path: Path):
+    test_file_path.write_bytes(bytes(range(256)) * 4)
+
+    assert file_ops.read_file(test_file_path).startswith("Error:")
+
+
+def test_read_file_detects_utf_8_after_ascii_sample(test_file_path: Path):
+    content = "ASCII line\n" * (file_ops.ENCODING_SAMPLE_SIZE // 10) + "中文结尾。\n"
+    test_file_path.write_text(content, encoding="utf-8")
+
+    assert file_ops.read_file(test_file_path) == content
+    assert "".join(file_ops.stream_file(test_file_path)) == content
+
+
+def test_read_file_detects_encoding_from_sample_only(test_file_path: Path, mocker):
+    content = "ASCII line\n" * (file_ops.ENCODING_SAMPLE_SIZE // 10) + "中文结尾。\n"
+    test_file_path.write_text(content, encoding="utf-8")
+    from_path = mocker.spy(file_ops.charset_normalizer, "from_path")
+
+    assert file_ops.read_file(test_file_path, limit=1) == "ASCII line\n"
+    assert file_ops.read_file(test_file_path, offset=1, limit=1) == "ASCII line\n"
+    # Neither detecting the encoding nor reading the first lines reads it whole
+    from_path.assert_not_called()
+
+
+def test_read_file_falls_back_to_whole_file_detection(test_file_path: Path, mocker):
+    content = "ASCII line\n" * 200 + "中文结尾。\n" * 200
+    test_file_path.write_bytes(content.encode("gb18030"))
+    mocker.patch.object(file_ops, "ENCODING_SAMPLE_SIZE", 1000)
+    from_path = mocker.spy(file_ops.charset_normalizer, "from_path")
+
+    assert file_ops.read_file(test_file_path) == content
+    assert "".join(file_ops.stream_file(test_file_path, block_size=100)) == content
+    from_path.assert_called_once()
+
+
+def test_read_file_bytes(test_file_path: Path):
+    test_file_path.write_text("abc\n你好\n", encoding="utf-8")
+
+    assert file_ops.read_file(test_file_path, 2, 3, unit="bytes") == "c\n"
+    # The second character is cut by the end of the range
+    assert file_ops.read_file(test_file_path, 4, 5, unit="bytes") == "你"
+    assert file_ops.read_file(test_file_path, "4", "", unit="bytes") == "你好\n"
+    assert file_ops.read_file(test_file_path, unit="pages").startswith("Error:")
+
+
+def test_stream_file(test_file_path: Path, file_content):
+    test_file_path.write_text(file_content * 3, encoding="utf-8")
+
+    blocks = list(file_ops.stream_file(test_file_path, block_size=len(file_content)))
+
+    assert blocks == [file_content] * 3
+
+
 def test_write_to_file(test_file_path: Path):
     new_content = "This is new content.\n"
     file_ops.write_to_file(str(test_file_path), new_content)
@@ -230,6 +434,30 @@ def test_append_to_file_uses_checksum_from_appended_file(
     )
 
 
+def test_append_to_file_hashes_appended_text_only(config: Config, test_file_path):
+    file_ops.append_to_file(test_file_path, "first\n")
+    index = file_ops.get_file_operations_index(config.file_logger_path)
+    digest, _ = index._file_hashes[str(test_file_path)]
+
+    file_ops.append_to_file(test_file_path, "second\n")
+
+    assert index._file_hashes[str(test_file_path)][0] is digest
+    assert index.get_state()[str(test_file_path)] == file_ops.text_checksum(
+        "first\nsecond\n"
+    )
+
+
+def test_append_to_file_rehashes_modified_file(config: Config, test_file_path):
+    file_ops.append_to_file(test_file_path, "first\n")
+    with open(test_file_path, "w", encoding="utf-8") as f:
+        f.write("rewritten\n")
+
+    file_ops.append_to_file(test_file_path, "second\n")
+
+    state = file_ops.get_file_operations_index(config.file_logger_path).get_state()
+    assert state[str(test_file_path)] == file_ops.text_checksum("rewritten\nsecond\n")
+
+
 def test_delete_file(test_file_with_content_path: Path):
     result = file_ops.delete_file(str(test_file_with_content_path))
     assert result == "File deleted successfully."
@@ -283,6 +511,37 @@ def test_list_files(workspace: Workspace, test_directory: Path):
     assert non_existent_file not in files
 
 
+def test_list_files_filters(config, workspace: Workspace):
+    for name in ["a.py", "b.txt", "src/c.py", "src/lib/d.py"]:
+        path = workspace.get_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    root = str(workspace.root)
+
+    assert file_ops.list_files(root, pattern="*.py", max_depth=2) == [
+        "a.py",
+        os.path.join("src", "c.py"),
+    ]
+    assert file_ops.list_files(str(workspace.get_path("src")), pattern="lib/*") == [
+        os.path.join("src", "lib", "d.py")
+    ]
+    assert file_ops.list_files(root, offset="1", limit="2") == [
+        "b.txt",
+        os.path.join("src", "c.py"),
+    ]
+
+
+def test_list_files_outside_workspace(config, tmp_path: Path):
+    outside = tmp_path / "outside"
+    (outside / "sub").mkdir(parents=True)
+    (outside / "a.txt").write_text("a")
+    (outside / "sub" / "b.txt").write_text("b")
+
+    files = file_ops.list_files(str(outside), max_depth=1)
+
+    assert files == [os.path.relpath(outside / "a.txt", config.workspace_path)]
+
+
 def test_download_file(config, workspace: Workspace):
     url = "https://github.com/Significant-Gravitas/Auto-GPT/archive/refs/tags/v0.2.2.tar.gz"
     local_name = workspace.get_path("auto-gpt.tar.gz")
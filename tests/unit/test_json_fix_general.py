@@ -0,0 +1,72 @@
+import json
+import random
+
+import pytest
+from regex import regex
+
+from autogpt.json_utils.json_fix_general import find_outermost_braces
+
+# The recursive pattern find_outermost_braces replaced
+RECURSIVE_BRACES_PATTERN = regex.compile(r"\{(?:[^{}]|(?R))*\}")
+
+
+def spans(text):
+    return [text[start:end] for start, end in find_outermost_braces(text)]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("", []),
+        ("no braces", []),
+        ('{"a": 1}', ['{"a": 1}']),
+        ('Reply: {"a": {"b": 2}} and {"c": 3}.', ['{"a": {"b": 2}}', '{"c": 3}']),
+        ('{"code": "if (x) { y(); }"}', ['{"code": "if (x) { y(); }"}']),
+        ('{"code": "}\\"{"}', ['{"code": "}\\"{"}']),
+        ('{"a": {"b": 2} {"c": 3}', ['{"b": 2}', '{"c": 3}']),
+        ('} {"a": 1} }', ['{"a": 1}']),
+        ('It\'s "quoted" {"a": "b"}', ['{"a": "b"}']),
+    ],
+)
+def test_find_outermost_braces(text, expected):
+    assert spans(text) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_outermost_braces_matches_recursive_pattern(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("{{}}x ") for _ in range(rng.randint(0, 300)))
+
+    assert find_outermost_braces(text) == [
+        match.span() for match in RECURSIVE_BRACES_PATTERN.finditer(text)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_find_outermost_braces_finds_embedded_json(seed):
+    rng = random.Random(seed)
+
+    def random_value(depth):
+        kind = rng.choice(["object", "array", "string", "number"] if depth else ["x"])
+        if kind == "object":
+            return {
+                "".join(rng.choices("{}\"'\\ab", k=3)): random_value(depth - 1)
+                for _ in range(rng.randint(0, 3))
+            }
+        if kind == "array":
+            return [random_value(depth - 1) for _ in range(rng.randint(0, 3))]
+        if kind == "number":
+            return rng.random()
+        return "".join(rng.choices("{}[]\"'\\\n ab", k=rng.randint(0, 8)))
+
+    objects = [{"value": random_value(4)} for _ in range(rng.randint(1, 3))]
+    texts = [json.dumps(o) for o in objects]
+    reply = "Here it is: " + " and ".join(texts) + " -- don't forget }"
+
+    assert spans(reply) == texts
+
+
+def test_find_outermost_braces_linear_on_unclosed_braces():
+    text = "{ a " * 100_000 + '{"a": 1}'
+
+    assert spans(text) == ['{"a": 1}']
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from autogpt.json_utils.json_fix_tolerant import repair_json
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+        ("{'a': 'it\\'s', 'b': True, 'c': None}", {"a": "it's", "b": True, "c": None}),
+        ('{"text": "line 1\nline 2\ttab"}', {"text": "line 1\nline 2\ttab"}),
+        ('{"speak": "say "hi" now"}', {"speak": 'say "hi" now'}),
+        ('{"path": "C:\\Users\\me"}', {"path": "C:\\Users\\me"}),
+        ('{command: {name: "google"}}', {"command": {"name": "google"}}),
+        ('{"a": 1\n"b": 2}', {"a": 1, "b": 2}),
+        ('```json\n{"a": 1}\n```', {"a": 1}),
+        ('Here you go:\n```\n{"a": 1}\n```\nAnything else?', {"a": 1}),
+        ('I will search.\n{"a": [1, 2]} Done.', {"a": [1, 2]}),
+        ('{"a": [1, {"b": 2]}', {"a": [1, {"b": 2}]}),
+        ('Options [1] and [2] considered. My reply: {"a": 1}', {"a": 1}),
+    ],
+)
+def test_repair_json(reply, expected):
+    assert json.loads(repair_json(reply)) == expected
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ('{"thoughts": {"text": "thin', {"thoughts": {"text": "thin"}}),
+        ('{"thoughts": {"text": "a", "plan":', {"thoughts": {"text": "a"}}),
+        ('{"thoughts": {"text": "a", "pla', {"thoughts": {"text": "a"}}),
+        ('{"thoughts": {"text": "a"},', {"thoughts": {"text": "a"}}),
+        ('{"args": {}', {"args": {}}),
+        ('{"a": ["b", "c', {"a": ["b", "c"]}),
+    ],
+)
+def test_repair_truncated_json(reply, expected):
+    assert json.loads(repair_json(reply)) == expected
+
+
+@pytest.mark.parametrize(
+    "reply", ["", "This is not a JSON string", '{"a": #}', '["a", "b"]']
+)
+def test_repair_json_fails(reply):
+    assert repair_json(reply) is None
+
+
+def test_repair_valid_json_is_unchanged():
+    reply = {
+        "command": {"name": "write_to_file", "args": {"text": 'a\n"b"\\c'}},
+        "thoughts": {"text": "ü", "plan": "- a\n- b"},
+    }
+    assert json.loads(repair_json(json.dumps(reply, indent=4))) == reply
@@ -0,0 +1,103 @@
+import pytest
+
+from autogpt.json_utils.utilities import (
+    LLM_DEFAULT_RESPONSE_FORMAT,
+    JSONSchema,
+    compile_structural_check,
+    load_schema,
+    validate_json,
+)
+
+VALID_REPLY = {
+    "thoughts": {
+        "text": "thought",
+        "reasoning": "reasoning",
+        "plan": "- plan",
+        "criticism": "criticism",
+        "speak": "speak",
+    },
+    "command": {"name": "google", "args": {"input": "query"}},
+}
+
+
+def with_changes(**changes):
+    reply = {key: dict(value) for key, value in VALID_REPLY.items()}
+    for path, value in changes.items():
+        section, key = path.split("__")
+        if value is None:
+            del reply[section][key]
+        else:
+            reply[section][key] = value
+    return reply
+
+
+@pytest.mark.parametrize(
+    "json_object",
+    [
+        VALID_REPLY,
+        with_changes(command__name=None),
+        with_changes(command__name=1),
+        with_changes(command__args="input"),
+        with_changes(command__extra="value"),
+        with_changes(thoughts__plan=["- plan"]),
+        with_changes(thoughts__speak=True),
+        {"command": VALID_REPLY["command"]},
+        [],
+        "reply",
+    ],
+)
+def test_structural_check_agrees_with_validator(json_object):
+    schema = load_schema(LLM_DEFAULT_RESPONSE_FORMAT)
+
+    assert schema.check_structure(json_object) == (
+        not list(schema.validator.iter_errors(json_object))
+    )
+
+
+def test_load_schema_is_cached():
+    assert load_schema(LLM_DEFAULT_RESPONSE_FORMAT) is load_schema(
+        LLM_DEFAULT_RESPONSE_FORMAT
+    )
+
+
+def test_structural_check_types():
+    check = compile_structural_check(
+        {"type": "array", "items": {"type": ["number", "null"]}}
+    )
+
+    assert check([1, 2.5, None])
+    assert not check([True])
+    assert not check(["1"])
+    assert not check({})
+
+
+def test_structural_check_unsupported_keywords():
+    assert compile_structural_check({"type": "string", "minLength": 1}) is None
+    assert (
+        compile_structural_check(
+            {"properties": {"name": {"type": "string", "pattern": "^a"}}}
+        )
+        is None
+    )
+
+    schema = JSONSchema({"type": "string", "minLength": 1})
+    assert schema.check_structure is None
+    assert len(schema.iter_errors("")) == 1
+
+
+def test_validate_json_valid_reply_skips_validator(mocker):
+    schema = load_schema(LLM_DEFAULT_RESPONSE_FORMAT)
+    validator = mocker.patch.object(schema, "validator")
+
+    assert validate_json(VALID_REPLY, LLM_DEFAULT_RESPONSE_FORMAT) == VALID_REPLY
+    validator.iter_errors.assert_not_called()
+
+
+def test_validate_json_invalid_reply_reports_errors(config, mocker):
+    mocker.patch.object(config, "debug_mode", True)
+    logger = mocker.patch("autogpt.json_utils.utilities.logger")
+
+    validate_json(with_changes(command__name=None), LLM_DEFAULT_RESPONSE_FORMAT)
+
+    messages = [call.args[0] for call in logger.error.call_args_list]
+    assert "Error: 'name' is a required property" in messages
@@ -2,9 +2,11 @@
 import pytest
 from loguru import logger
 
+from autogpt.json_utils import json_fix_llm
 from autogpt.json_utils.json_fix_llm import (
     fix_and_parse_json,
     fix_json_using_multiple_techniques,
+    get_json_fix_stats,
 )
 from tests.utils import requires_api_key
 
@@ -115,3 +117,41 @@ class TestFixJsonUsingMultipleTechniques:
             "person": {"name": "John", "age": 30},
             "hobbies": ["reading", "swimming"],
         }
+
+    # Tests that malformed replies are repaired without asking the AI model, and that the tiers are counted.
+    def test_fix_json_tiers(self, mocker):
+        mocker.patch.object(json_fix_llm, "json_fix_counts", json_fix_llm.Counter())
+        auto_fix_json = mocker.patch(
+            "autogpt.json_utils.json_fix_llm.auto_fix_json", return_value="failed"
+        )
+
+        assert fix_json_using_multiple_techniques('{"a": 1}') == {"a": 1}
+        assert fix_json_using_multiple_techniques("{'a': 1,}") == {"a": 1}
+        assert fix_json_using_multiple_techniques('{"a": "b') == {"a": "b"}
+        assert fix_json_using_multiple_techniques("Not JSON") == {}
+        assert fix_json_using_multiple_techniques("I can't do that. {") == {}
+        assert fix_json_using_multiple_techniques(
+            'Options [1] and [2] considered. {"a": 1,}'
+        ) == {"a": 1}
+
+        assert get_json_fix_stats() == {
+            "parse": 1,
+            "repair": 3,
+            "general": 0,
+            "brackets": 0,
+            "llm": 0,
+            "failed": 2,
+        }
+        assert auto_fix_json.call_count == 2
+
+    # Tests that a reply fixed by the LLM is counted once, by the LLM tier.
+    def test_fix_json_llm_tier(self, mocker):
+        mocker.patch.object(json_fix_llm, "json_fix_counts", json_fix_llm.Counter())
+        auto_fix_json = mocker.patch(
+            "autogpt.json_utils.json_fix_llm.auto_fix_json", return_value='{"a": 1}'
+        )
+
+        assert fix_json_using_multiple_techniques("Not JSON") == {"a": 1}
+
+        assert get_json_fix_stats()["llm"] == 1
+        auto_fix_json.assert_called_once()
@@ -1,5 +1,10 @@
+import asyncio
+import math
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from openai.error import APIError, RateLimitError
+from openai.openai_object import OpenAIObject
 
 from autogpt.llm import llm_utils
 
@@ -131,3 +136,182 @@ def test_chunked_tokens():
     ]
     output = list(llm_utils.chunked_tokens(text, "cl100k_base", 8191))
     assert output == expected_output
+
+
+def test_batched_by_budget():
+    chunks = [(1,) * 3, (2,) * 3, (3,) * 5, (4,) * 1, (5,) * 1, (6,) * 1]
+    batches = list(llm_utils.batched_by_budget(chunks, max_items=2, max_tokens=6))
+    assert batches == [
+        [(1,) * 3, (2,) * 3],
+        [(3,) * 5, (4,)],
+        [(5,), (6,)],
+    ]
+
+
+def test_batched_by_budget_oversized_chunk():
+    chunks = [(1,) * 10, (2,) * 1]
+    batches = list(llm_utils.batched_by_budget(chunks, max_items=5, max_tokens=4))
+    assert batches == [[(1,) * 10], [(2,)]]
+
+
+def test_create_embeddings_batches_chunks(config, mocker):
+    mocker.patch.multiple(
+        config, embedding_batch_max_items=2, embedding_batch_max_tokens=100
+    )
+    # "long" is split into two chunks of different lengths
+    text_chunks = {"short": [(1,)], "long": [(2, 2, 2), (3,)], "other": [(4,)]}
+    mocker.patch.object(
+        llm_utils,
+        "chunked_tokens",
+        side_effect=lambda text, **_: iter(text_chunks[text]),
+    )
+    vectors = {1: [1.0, 0.0], 2: [0.0, 1.0], 3: [1.0, 0.0], 4: [0.0, 1.0]}
+
+    def create(input, **kwargs):
+        data = [
+            {"index": i, "embedding": vectors[chunk[0]]}
+            for i, chunk in reversed(list(enumerate(input)))
+        ]
+        response = MagicMock(usage=MagicMock(prompt_tokens=1))
+        response.__getitem__.side_effect = {"data": data}.__getitem__
+        return response
+
+    create_mock = mocker.patch("openai.Embedding.create", side_effect=create)
+
+    embeddings = llm_utils.create_embeddings(["short", "long", "other"], model="m")
+
+    assert create_mock.call_count == 2
+    assert [len(call.kwargs["input"]) for call in create_mock.call_args_list] == [2, 2]
+    assert embeddings[0] == pytest.approx([1.0, 0.0])
+    # weighted average of [0, 1] (3 tokens) and [1, 0] (1 token), normalized
+    assert embeddings[1] == pytest.approx([1 / math.sqrt(10), 3 / math.sqrt(10)])
+    assert embeddings[2] == pytest.approx([0.0, 1.0])
+
+
+def test_get_ada_embeddings_deduplicates_and_uses_cache(config, mocker):
+    create_embeddings = mocker.patch.object(
+        llm_utils,
+        "create_embeddings",
+        side_effect=lambda texts, **_: [[float(len(text))] for text in texts],
+    )
+
+    assert llm_utils.get_ada_embeddings(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert llm_utils.get_ada_embeddings(["bb", "ccc"]) == [[2.0], [3.0]]
+
+    assert [call.args[0] for call in create_embeddings.call_args_list] == [
+        ["a", "bb"],
+        ["ccc"],
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error_count, retry_count, failure",
+    [(2, 10, False), (3, 2, True)],
+    ids=["passing", "failing"],
+)
+async def test_retry_open_api_async(error, error_count, retry_count, failure):
+    count = 0
+
+    @llm_utils.retry_openai_api(num_retries=retry_count, backoff_base=0.001)
+    async def f():
+        nonlocal count
+        count += 1
+        if count <= error_count:
+            raise error
+        return count
+
+    if failure:
+        with pytest.raises(type(error)):
+            await f()
+    else:
+        assert await f() == error_count + 1
+    assert count == min(error_count, retry_count) + 1
+
+
+def chat_completion_response(content, prompt_tokens=10, completion_tokens=5):
+    return OpenAIObject.construct_from(
+        {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_acreate_chat_completion(config, api_manager, mocker):
+    acreate = mocker.patch(
+        "openai.ChatCompletion.acreate",
+        new_callable=AsyncMock,
+        side_effect=[RateLimitError("Error"), chat_completion_response("Hi!")],
+    )
+    sleep = mocker.patch("asyncio.sleep", new_callable=AsyncMock)
+    mocker.patch.object(llm_utils, "count_message_tokens", return_value=10)
+    plugin = MagicMock()
+    plugin.can_handle_chat_completion.return_value = False
+    plugin.can_handle_on_response.return_value = True
+    plugin.on_response.side_effect = lambda response: response.upper()
+    mocker.patch.object(config, "plugins", [plugin])
+
+    messages = [{"role": "user", "content": "Hello"}]
+    response = await llm_utils.acreate_chat_completion(messages, model="gpt-4")
+
+    assert response == "HI!"
+    assert acreate.call_count == 2
+    assert acreate.call_args.kwargs["messages"] == messages
+    sleep.assert_awaited_once()
+    assert api_manager.get_total_prompt_tokens() == 10
+    assert api_manager.get_total_completion_tokens() == 5
+
+
+@pytest.mark.asyncio
+async def test_acreate_chat_completion_handled_by_plugin(config, mocker):
+    acreate = mocker.patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+    plugin = MagicMock()
+    plugin.can_handle_chat_completion.return_value = True
+    plugin.handle_chat_completion.return_value = "From plugin"
+    mocker.patch.object(config, "plugins", [plugin])
+
+    response = await llm_utils.acreate_chat_completion([], model="gpt-4")
+
+    assert response == "From plugin"
+    acreate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_acreate_embeddings_requests_batches_concurrently(
+    config, api_manager, mocker
+):
+    mocker.patch.multiple(
+        config, embedding_batch_max_items=1, embedding_batch_max_tokens=100
+    )
+    mocker.patch.object(
+        llm_utils, "chunked_tokens", side_effect=lambda text, **_: iter([(len(text),)])
+    )
+    in_flight = 0
+    max_in_flight = 0
+
+    async def acreate(input, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return OpenAIObject.construct_from(
+            {
+                "data": [{"index": 0, "embedding": [float(input[0][0]), 0.0]}],
+                "usage": {"prompt_tokens": 1},
+            }
+        )
+
+    mocker.patch("openai.Embedding.acreate", side_effect=acreate)
+
+    embeddings = await llm_utils.acreate_embeddings(["a", "bb", "ccc"], model="m")
+
+    assert embeddings == [[1.0, 0.0]] * 3
+    assert max_in_flight == 3
+    assert api_manager.get_total_prompt_tokens() == 3
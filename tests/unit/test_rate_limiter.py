@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from openai.error import RateLimitError
+
+from autogpt.llm.rate_limiter import (
+    POLL_INTERVAL,
+    Priority,
+    RateLimiter,
+    RequestScheduler,
+    TokenBucket,
+    parse_duration,
+)
+
+
+@pytest.fixture
+def scheduler(config, mocker):
+    mocker.patch.multiple(
+        config, openai_requests_per_minute=60, openai_tokens_per_minute=6000
+    )
+    if RequestScheduler in RequestScheduler._instances:
+        del RequestScheduler._instances[RequestScheduler]
+    yield RequestScheduler()
+    del RequestScheduler._instances[RequestScheduler]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("20", 20.0), ("1.5", 1.5), ("20ms", 0.02), ("6m0s", 360.0), ("1h2m3s", 3723.0)],
+)
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+def test_parse_duration_invalid():
+    assert parse_duration("soon") is None
+
+
+def test_token_bucket():
+    bucket = TokenBucket(per_minute=60)
+    bucket.updated = 0.0
+
+    assert bucket.wait_time(60, now=0.0) == 0
+    bucket.take(60)
+    # Refilled at one unit per second
+    assert bucket.wait_time(10, now=0.0) == pytest.approx(10)
+    assert bucket.wait_time(10, now=4.0) == pytest.approx(6)
+    # A request larger than the bucket waits for a full bucket
+    assert bucket.wait_time(1000, now=4.0) == pytest.approx(56)
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(per_minute=0)
+    bucket.take(1_000_000)
+
+    assert bucket.wait_time(1_000_000, now=bucket.updated) == 0
+
+
+def test_rate_limiter_serves_agent_before_background():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=0)
+    limiter.requests.level = 0
+    background = limiter._enqueue(Priority.BACKGROUND)
+    agent = limiter._enqueue(Priority.AGENT)
+
+    assert limiter._try_acquire(background, 1) == POLL_INTERVAL
+    assert 0 < limiter._try_acquire(agent, 1) <= 1
+
+    limiter.requests.level = 2
+    assert limiter._try_acquire(background, 1) == POLL_INTERVAL
+    assert limiter._try_acquire(agent, 1) == 0
+    assert limiter._try_acquire(background, 1) == 0
+
+
+def test_rate_limiter_update_from_headers():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=0)
+
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "3500",
+            "x-ratelimit-limit-tokens": "90000",
+            "x-ratelimit-remaining-requests": "3499",
+            "x-ratelimit-remaining-tokens": "100",
+            "Retry-After": "2",
+        }
+    )
+
+    assert limiter.requests.per_minute == 3500
+    assert limiter.tokens.per_minute == 90000
+    assert limiter.tokens.level == pytest.approx(100, abs=1)
+    ticket = limiter._enqueue(Priority.AGENT)
+    assert 1 < limiter._try_acquire(ticket, 10) <= 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_cancelled_request_leaves_queue():
+    limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=0)
+    limiter.requests.level = 0
+
+    task = asyncio.create_task(limiter.aacquire(1))
+    await asyncio.sleep(0)
+    assert len(limiter._queue) == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert limiter._queue == []
+
+
+def test_scheduler_reserve_settles_and_learns_from_errors(scheduler):
+    with scheduler.reserve("gpt-4", 1000) as reservation:
+        reservation.settle(400)
+    limiter = scheduler.get_limiter("gpt-4")
+    assert limiter.tokens.level == pytest.approx(5600, abs=1)
+
+    error = RateLimitError(
+        "Rate limit reached", headers={"x-ratelimit-remaining-tokens": "0"}
+    )
+    with pytest.raises(RateLimitError):
+        with scheduler.reserve("gpt-4", 100):
+            raise error
+    assert limiter.tokens.level == pytest.approx(0, abs=1)
+    # Other models have their own limits
+    assert scheduler.get_limiter("gpt-3.5-turbo").tokens.level == 6000
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from autogpt.llm import create_chat_message
+from autogpt.memory_management.summary_memory import (
+    BackgroundSummaryUpdater,
+    create_summary_message,
+    get_newly_trimmed_messages,
+)
+
+
+def test_get_newly_trimmed_messages():
+    full_message_history = [create_chat_message("user", str(i)) for i in range(6)]
+
+    # Messages 2 to 3 have been trimmed since message 1 was summarized
+    new_messages, new_index = get_newly_trimmed_messages(
+        full_message_history, context_start_index=4, last_memory_index=1
+    )
+    assert new_messages == full_message_history[2:4]
+    assert new_index == 3
+
+    # Nothing has been trimmed since
+    new_messages, new_index = get_newly_trimmed_messages(
+        full_message_history, context_start_index=4, last_memory_index=3
+    )
+    assert new_messages == []
+    assert new_index == 3
+
+
+def test_get_newly_trimmed_messages_with_identical_messages():
+    """Trimmed messages are found by position, even if the context has equal ones"""
+    full_message_history = [create_chat_message("user", "next")] * 4
+
+    new_messages, new_index = get_newly_trimmed_messages(
+        full_message_history, context_start_index=3, last_memory_index=0
+    )
+    assert len(new_messages) == 2
+    assert new_index == 2
+
+
+def test_background_summary_updater(mocker):
+    """The latest completed summary is used while new events are summarized"""
+    release = threading.Event()
+
+    def fake_update_running_summary(current_memory, new_events, priority):
+        release.wait(timeout=5)
+        events = ", ".join(event["content"] for event in new_events)
+        return create_summary_message(f"{current_memory['content']} + {events}")
+
+    update_running_summary = mocker.patch(
+        "autogpt.memory_management.summary_memory.update_running_summary",
+        side_effect=fake_update_running_summary,
+    )
+    updater = BackgroundSummaryUpdater()
+    initial = create_summary_message("I was created.")
+
+    # The update runs in the background, so the current summary is returned
+    summary = updater.update(initial, [create_chat_message("system", "a")])
+    assert summary == initial
+    # Events trimmed in the meantime are queued for the next update
+    summary = updater.update(summary, [create_chat_message("system", "b")])
+    assert summary == initial
+    assert update_running_summary.call_count == 1
+
+    release.set()
+    updater._future.result()
+    summary = updater.update(summary, [])
+    assert summary["content"].endswith("I was created. + a")
+    updater._future.result()
+    assert update_running_summary.call_count == 2
+    assert update_running_summary.call_args.kwargs["new_events"] == [
+        create_chat_message("system", "b")
+    ]
+
+
+@pytest.mark.parametrize("error", [RuntimeError("API error"), SystemExit(1)])
+def test_background_summary_updater_retries_failed_events(mocker, error):
+    mocker.patch(
+        "autogpt.memory_management.summary_memory.update_running_summary",
+        side_effect=error,
+    )
+    updater = BackgroundSummaryUpdater()
+    events = [create_chat_message("system", "a")]
+
+    summary = updater.update("I was created.", events)
+    updater._future.exception()
+    assert updater.update(summary, []) == create_summary_message("I was created.")
+    assert updater._running_events == events
+
+
+def test_background_summary_updater_close():
+    updater = BackgroundSummaryUpdater()
+
+    updater.close()
+
+    with pytest.raises(RuntimeError):
+        updater._executor.submit(print)
@@ -0,0 +1,219 @@
+import asyncio
+import threading
+
+import pytest
+import spacy
+
+from autogpt.processing import text
+
+
+@pytest.fixture
+def fake_acreate_chat_completion(mocker):
+    """Summarize a message by echoing its text, tracking the concurrent calls"""
+    stats = {"in_flight": 0, "max_in_flight": 0}
+
+    async def acreate_chat_completion(model, messages, cache=False):
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        content = messages[0]["content"]
+        chunk = content[3 : content.index('"""', 3)]
+        # Finish the calls out of order
+        await asyncio.sleep(0.01 / len(chunk))
+        stats["in_flight"] -= 1
+        return f"summary of {chunk}"
+
+    mocker.patch.object(
+        text, "acreate_chat_completion", side_effect=acreate_chat_completion
+    )
+    mocker.patch.object(text, "count_message_tokens", return_value=1)
+    return stats
+
+
+@pytest.mark.asyncio
+async def test_summarize_chunks(config, mocker, fake_acreate_chat_completion):
+    mocker.patch.object(config, "browse_summary_concurrency", 2)
+    chunks = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    summaries = await text.summarize_chunks(chunks, "question", "gpt-3.5-turbo")
+
+    assert summaries == [f"summary of {chunk}" for chunk in chunks]
+    assert fake_acreate_chat_completion["max_in_flight"] == 2
+
+
+def test_summarize_text_adds_memories_at_once(
+    config, mocker, fake_acreate_chat_completion
+):
+    mocker.patch.object(text, "split_text", return_value=iter(["a", "bb"]))
+    memory = mocker.Mock()
+    mocker.patch.object(text, "get_memory", return_value=memory)
+    run = mocker.spy(asyncio, "run")
+
+    summary = text.summarize_text("https://example.com", "a bb", "question")
+
+    assert summary == "summary of summary of a\nsummary of bb"
+    # Summarizing and reducing share one event loop
+    run.assert_called_once()
+    memory.add_many.assert_called_once_with(
+        [
+            "Source: https://example.com\nRaw content part#1: a",
+            "Source: https://example.com\nContent summary part#1: summary of a",
+            "Source: https://example.com\nRaw content part#2: bb",
+            "Source: https://example.com\nContent summary part#2: summary of bb",
+        ]
+    )
+
+
+def test_summarize_text_summarizes_while_splitting(
+    config, mocker, fake_acreate_chat_completion
+):
+    summarized = threading.Event()
+    fake = text.acreate_chat_completion.side_effect
+
+    async def acreate_chat_completion(**kwargs):
+        summary = await fake(**kwargs)
+        summarized.set()
+        return summary
+
+    mocker.patch.object(
+        text, "acreate_chat_completion", side_effect=acreate_chat_completion
+    )
+    waited = []
+
+    def split_text(*args, **kwargs):
+        yield "a"
+        # The first chunk is summarized before the rest of the text is parsed
+        waited.append(summarized.wait(timeout=5))
+        yield "bb"
+
+    mocker.patch.object(text, "split_text", side_effect=split_text)
+    mocker.patch.object(text, "get_memory")
+
+    summary = text.summarize_text("https://example.com", "a bb", "question")
+
+    assert summary == "summary of summary of a\nsummary of bb"
+    assert waited == [True]
+
+
+def count_words(messages, model):
+    return len(messages[0]["content"].replace('"""', ' """ ').split())
+
+
+def test_group_summaries(mocker):
+    mocker.patch.object(text, "count_message_tokens", side_effect=count_words)
+    overhead = count_words([text.create_message("", "question")], None)
+    # Each summary counts for its words plus a newline
+    summaries = ["one two", "three", "four five six", "seven", "eight nine"]
+
+    groups = text.group_summaries(summaries, "question", "model", overhead + 5)
+
+    assert groups == [["one two", "three"], ["four five six"], ["seven", "eight nine"]]
+
+
+def test_group_summaries_pairs_summaries_that_do_not_fit(mocker):
+    mocker.patch.object(text, "count_message_tokens", side_effect=count_words)
+    summaries = ["a b c", "d e f", "g h i"]
+
+    groups = text.group_summaries(summaries, "question", "model", max_length=1)
+
+    assert groups == [["a b c", "d e f"], ["g h i"]]
+
+
+def test_group_summaries_truncates_summaries_over_budget(mocker):
+    mocker.patch.object(text, "count_message_tokens", side_effect=count_words)
+    overhead = count_words([text.create_message("", "question")], None)
+    summaries = ["one", "two", "three four five six seven eight"]
+
+    groups = text.group_summaries(summaries, "question", "model", overhead + 4)
+
+    assert groups == [["one", "two"], ["three four five"]]
+
+
+def test_group_summaries_truncates_paired_summaries_to_half(mocker):
+    mocker.patch.object(text, "count_message_tokens", side_effect=count_words)
+    overhead = count_words([text.create_message("", "question")], None)
+    summaries = ["a b c", "d e f", "g h i"]
+
+    groups = text.group_summaries(summaries, "question", "model", overhead + 6)
+
+    assert groups == [["a b", "d e"], ["g h"]]
+    for group in groups:
+        message = text.create_message("\n".join(group), "question")
+        assert count_words([message], None) <= overhead + 6
+
+
+@pytest.mark.asyncio
+async def test_reduce_summaries(config, mocker, fake_acreate_chat_completion):
+    mocker.patch.object(config, "browse_summary_concurrency", 3)
+    # Two summaries per group
+    mocker.patch.object(
+        text,
+        "group_summaries",
+        side_effect=lambda summaries, *_: [
+            summaries[i : i + 2] for i in range(0, len(summaries), 2)
+        ],
+    )
+    summaries = ["a", "b", "c", "d", "e"]
+
+    summary = await text.reduce_summaries(summaries, "question", "model")
+
+    # a b c d e -> (a b) (c d) e -> ((a b) (c d)) e -> final
+    assert text.acreate_chat_completion.call_count == 4
+    assert summary == ("summary of summary of summary of a\nb\nsummary of c\nd\ne")
+
+
+@pytest.fixture
+def blank_spacy_pipeline(mocker):
+    load = mocker.patch("spacy.load", side_effect=lambda _: spacy.blank("en"))
+    text.get_spacy_pipeline.cache_clear()
+    yield load
+    text.get_spacy_pipeline.cache_clear()
+
+
+@pytest.fixture
+def word_token_counts(mocker):
+    mocker.patch.object(text, "count_message_tokens", return_value=0)
+    mocker.patch.object(
+        text, "count_string_tokens", side_effect=lambda string, _: len(string.split())
+    )
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_split_text(blank_spacy_pipeline, word_token_counts, stream):
+    content = "One two three. Four five.\nSix seven eight nine. Ten."
+
+    chunks = list(text.split_text(content, max_length=6, stream=stream))
+
+    # 1 token of overhead for each message
+    assert chunks == ["One two three. Four five.", "Six seven eight nine. Ten."]
+
+
+def test_split_text_loads_pipeline_once(blank_spacy_pipeline, word_token_counts):
+    list(text.split_text("One. Two.", max_length=10))
+    list(text.split_text("Three. Four.", max_length=10))
+
+    blank_spacy_pipeline.assert_called_once()
+
+
+def test_split_text_sentence_too_long(blank_spacy_pipeline, word_token_counts):
+    with pytest.raises(ValueError):
+        list(text.split_text("One. Two three four five six.", max_length=4))
+
+
+def test_split_text_streams_chunks(blank_spacy_pipeline, word_token_counts, mocker):
+    mocker.patch.object(text, "STREAM_BLOCK_SIZE", 10)
+    parsed = []
+    nlp = text.get_spacy_pipeline(text.CFG.browse_spacy_language_model)
+    pipe = nlp.pipe
+
+    def tracking_pipe(blocks, **kwargs):
+        for doc in pipe(blocks, **kwargs):
+            parsed.append(doc.text)
+            yield doc
+
+    mocker.patch.object(nlp, "pipe", side_effect=tracking_pipe)
+    chunks = text.split_text("One two.\nThree four.\nFive six.", 3, stream=True)
+
+    assert next(chunks) == "One two."
+    # Only the blocks needed for the first chunk have been parsed
+    assert parsed == ["One two.", "Three four."]
+    assert list(chunks) == ["Three four.", "Five six."]
@@ -0,0 +1,109 @@
+import errno
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from autogpt.workspace import file_index
+from autogpt.workspace.file_index import WorkspaceFileIndex
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def use_inotify(request):
+    return request.param
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    for path in ["a.txt", ".hidden", "src/b.py", "src/lib/c.py", ".git/HEAD"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    return tmp_path
+
+
+@pytest.fixture
+def index(root: Path, use_inotify):
+    index = WorkspaceFileIndex(root, use_inotify=use_inotify)
+    yield index
+    index.close()
+
+
+def path(*parts):
+    return os.path.join(*parts)
+
+
+def test_list_files(index: WorkspaceFileIndex):
+    assert index.list_files() == [
+        path(".git", "HEAD"),
+        "a.txt",
+        path("src", "b.py"),
+        path("src", "lib", "c.py"),
+    ]
+
+
+def test_list_files_filters(index: WorkspaceFileIndex):
+    assert index.list_files("src") == [path("src", "b.py"), path("src", "lib", "c.py")]
+    assert index.list_files("src", max_depth=1) == [path("src", "b.py")]
+    assert index.list_files("", pattern="*.py") == [
+        path("src", "b.py"),
+        path("src", "lib", "c.py"),
+    ]
+    assert index.list_files("src", pattern="lib/*") == [path("src", "lib", "c.py")]
+    assert index.list_files("missing") == []
+
+
+def test_list_files_sees_changes(index: WorkspaceFileIndex, root: Path):
+    index.list_files()
+
+    (root / "new.txt").write_text("new")
+    (root / "src" / "b.py").unlink()
+    (root / "src" / "lib").rename(root / "lib")
+    (root / "docs" / "api").mkdir(parents=True)
+    (root / "docs" / "api" / "d.md").write_text("d")
+
+    assert index.list_files() == [
+        path(".git", "HEAD"),
+        "a.txt",
+        path("docs", "api", "d.md"),
+        path("lib", "c.py"),
+        "new.txt",
+    ]
+
+    shutil.rmtree(root / "docs")
+    (root / "lib").rename(root / "src" / "lib")
+    (root / "src" / "lib" / "e.py").write_text("e")
+
+    assert index.list_files("src") == [
+        path("src", "lib", "c.py"),
+        path("src", "lib", "e.py"),
+    ]
+    assert index.list_files("docs") == []
+
+
+def test_list_files_only_lists_changed_directories(
+    index: WorkspaceFileIndex, root: Path, mocker
+):
+    mocker.patch.object(file_index, "RACY_INTERVAL_NS", 0)
+    index.list_files()
+    list_directory = mocker.spy(index, "_list_directory")
+
+    index.list_files()
+    assert list_directory.call_count == 0
+
+    (root / "src" / "lib" / "e.py").write_text("e")
+    assert path("src", "lib", "e.py") in index.list_files()
+    assert [call.args[0] for call in list_directory.call_args_list] == [
+        path("src", "lib")
+    ]
+
+
+def test_watch_limit_falls_back_to_polling(root: Path, mocker):
+    add_watch = mocker.patch.object(file_index._Inotify, "add_watch")
+    add_watch.side_effect = [1, OSError(errno.ENOSPC, "No space left on device")]
+
+    index = WorkspaceFileIndex(root)
+    (root / "src" / "lib" / "e.py").write_text("e")
+
+    assert not index.watching
+    assert path("src", "lib", "e.py") in index.list_files()